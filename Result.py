@@ -1,3 +1,5 @@
+from resource_usage import ResourceUsage
+
 class Result:
     def __init__(self, name, status, reason , prev_status = "FAIL",  prev_status_reason= ""):
         '''
@@ -13,10 +15,71 @@ class Result:
         self.reason = reason
         self.preservation_status = prev_status
         self.preservation_status_reason = prev_status_reason
+        self.run_time = None
+        self.phase_events = []
+        self.resource_usage = {}
+        self.from_cache = False
 
     def set_preservation_status(self, status, reason):
         '''
         status True if the minimized program preserve the target behavior
         '''
         self.preservation_status = status
-        self.preservation_status_reason = reason
\ No newline at end of file
+        self.preservation_status_reason = reason
+
+    def set_run_time(self, duration):
+        '''
+        duration (int): seconds Specimin took to minimize the target
+        '''
+        self.run_time = duration
+
+    def set_phase_events(self, events):
+        '''
+        events ([{}]): Chrome trace events of the evaluation phases (see phase_trace.PhaseTracer)
+        '''
+        self.phase_events = events
+
+    def add_resource_usage(self, phase, usage: ResourceUsage):
+        '''
+        Record the CPU, memory and I/O of a child process of 'phase' (specimin, pull_dependencies, compile_minimized).
+        Usage of several processes of the same phase is combined.
+        '''
+        if usage is None:
+            return
+        if phase in self.resource_usage:
+            usage = self.resource_usage[phase].add(usage)
+        self.resource_usage[phase] = usage
+
+    def total_resource_usage(self) -> ResourceUsage:
+        '''
+        Usage of all the child processes of the evaluation, None if nothing was measured
+        '''
+        total = None
+        for usage in self.resource_usage.values():
+            total = usage if total is None else total.add(usage)
+        return total
+
+    def to_dict(self):
+        '''
+        json serializable representation of the result
+        '''
+        return {
+            "name": self.name,
+            "status": self.status,
+            "reason": self.reason,
+            "preservation_status": self.preservation_status,
+            "preservation_status_reason": self.preservation_status_reason,
+            "run_time": self.run_time,
+            "resource_usage": {phase: usage.to_dict() for phase, usage in self.resource_usage.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        '''
+        Build a result from the output of to_dict
+        '''
+        result = cls(data["name"], data["status"], data["reason"], data["preservation_status"], data["preservation_status_reason"])
+        result.set_run_time(data.get("run_time"))
+        for phase, usage in data.get("resource_usage", {}).items():
+            result.add_resource_usage(phase, ResourceUsage.from_dict(usage))
+        return result
\ No newline at end of file
@@ -2,8 +2,44 @@ import unittest
 import main
 import shutil
 import os
+import tempfile
+import specimin_distribution
+import scheduler
+import re
+import log_matcher
+import sys
+import compile_server
+from specimin_worker import WorkerTimeout
+import gzip
+import time
+import output_sink
+import code_line
+import json
+import run_history
+import sqlite3
+import run_journal
+import pipeline
+import phase_trace
+import result_cache
+from contextlib import closing
+from ashe_scripts import specimin_exception_rank
+from ashe_scripts import specimin_statistics
+from Result import Result
 from Keyvalue import JsonKeys
 
+# stage functions of test_pipeline: top-level, so that the worker processes can unpickle them
+def _stage_fetch(item):
+    return item % 5 == 0, item # multiples of 5 finish early, e.g. a failed clone
+
+def _stage_minimize(item):
+    if item == 7:
+        os._exit(1) # the worker dies, as if killed by the OOM killer
+    time.sleep(0.02)
+    return False, item * 10
+
+def _stage_verify(item):
+    return True, item + 1
+
 class TestMain(unittest.TestCase):
 
     @classmethod
@@ -103,6 +139,19 @@ class TestMain(unittest.TestCase):
         result = main.run_specimin(issue_name, command, self.specimin_dir)
         self.assertEqual(result.status, "PASS")
  
+    def test_build_specimin_args(self):
+        targets = [{
+                    "method": "getMode(ColumnMetadata, Map<String, String>)",
+                    "file": "IndexMode.java",
+                    "package": 'org.apache.cassandra.index.sasi.conf'
+                   }]
+        args = main.build_specimin_args('cassandra', '/user/ISSUES/cf-6077', 'src/java', targets, '/user/libs')
+        self.assertEqual(args, ['--root', '/user/ISSUES/cf-6077/input/cassandra/src/java/',
+                                '--outputDirectory', '/user/ISSUES/cf-6077/output/cassandra/src/main/java',
+                                '--targetFile', 'org/apache/cassandra/index/sasi/conf/IndexMode.java',
+                                '--targetMethod', 'org.apache.cassandra.index.sasi.conf.IndexMode#getMode(ColumnMetadata, Map<String, String>)',
+                                '--jarPath', '/user/libs'])
+
     def test_run_specimin(self):
         proj_name = 'test_proj'
         root = ''
@@ -118,7 +167,563 @@ class TestMain(unittest.TestCase):
         self.assertEqual(result.status, "PASS")
 
 
+    def test_read_start_script(self):
+        # java command line of the start scripts generated by Gradle 7+ and by older versions
+        scripts = ["CLASSPATH=$APP_HOME/lib/specimin.jar:$APP_HOME/lib/javaparser-core-3.25.jar\n"
+                   "set -- \\\n"
+                   "        \"-Dorg.gradle.appname=$APP_BASE_NAME\" \\\n"
+                   "        -classpath \"$CLASSPATH\" \\\n"
+                   "        org.checkerframework.specimin.SpeciminRunner \\\n"
+                   "        \"$@\"\n",
+                   "CLASSPATH=$APP_HOME/lib/specimin.jar:$APP_HOME/lib/javaparser-core-3.25.jar\n"
+                   "eval set -- $DEFAULT_JVM_OPTS $JAVA_OPTS $SPECIMIN_OPTS -classpath \"\\\"$CLASSPATH\\\"\" org.checkerframework.specimin.SpeciminRunner \"$APP_ARGS\"\n"]
+        with tempfile.TemporaryDirectory() as directory:
+            start_script = os.path.join(directory, "specimin")
+            for script in scripts:
+                with open(start_script, 'w') as file:
+                    file.write(script)
+                self.assertEqual(specimin_distribution._read_main_class(start_script), "org.checkerframework.specimin.SpeciminRunner")
+                self.assertEqual(specimin_distribution._read_classpath(start_script), ["lib/specimin.jar", "lib/javaparser-core-3.25.jar"])
+            self.assertIsNone(specimin_distribution._read_main_class(os.path.join(directory, "missing")))
+            self.assertEqual(specimin_distribution.get_classpath("/dist", {"classpath": ["lib/a.jar", "lib/b.jar"]}), os.pathsep.join(["/dist/lib/a.jar", "/dist/lib/b.jar"]))
+            self.assertEqual(specimin_distribution.get_classpath("/dist", {}), "/dist/lib/*")
+
+
+    def test_percentile(self):
+        self.assertEqual(scheduler.percentile([3], 0.95), 3)
+        self.assertEqual(scheduler.percentile([5, 1, 4, 2, 3], 0.5), 3)
+        self.assertEqual(scheduler.percentile(list(range(1, 21)), 0.95), 19)
+        self.assertEqual(scheduler.percentile(list(range(1, 21)), 1.0), 20)
+
+    def test_plan_issue(self):
+        issue = {"issue_id": "cf-1", "url": "git@github.com:typetools/checker-framework.git", "root_dir": "src"}
+        with tempfile.TemporaryDirectory() as directory:
+            plan = scheduler.plan_issue(issue, {}, directory)
+            self.assertFalse(plan.has_history)
+            self.assertEqual(plan.expected_runtime, scheduler.estimate_base)
+            self.assertEqual(plan.timeout, scheduler.default_timeout)
+            plan = scheduler.plan_issue(issue, {"cf-1": [10, 12, 11]}, directory)
+            self.assertTrue(plan.has_history)
+            self.assertEqual((plan.expected_runtime, plan.timeout), (12, 60)) # floor
+            plan = scheduler.plan_issue(issue, {"cf-1": [700, 800]}, directory)
+            self.assertEqual(plan.timeout, scheduler.timeout_ceiling)
+            self.assertEqual(scheduler.plan_issue(issue, {"jar:cf-1": [30]}, directory, isJarMode=True).timeout, 90)
+
+    def test_timeout_raises_next_timeout(self):
+        # an issue that used to crash after 5s gets the 60s floor; once it times out, the next run gets longer
+        issue = {"issue_id": "cf-1", "url": "git@github.com:typetools/checker-framework.git", "root_dir": "src"}
+        with tempfile.TemporaryDirectory() as cache_dir:
+            quick_failures = []
+            for _ in range(10):
+                result = Result("cf-1", "FAIL", "crash")
+                result.set_run_time(5)
+                quick_failures.append(result)
+            scheduler.record_runtimes(cache_dir, quick_failures)
+            plan = scheduler.plan_issue(issue, scheduler.load_history(cache_dir), cache_dir)
+            self.assertEqual(plan.timeout, scheduler.timeout_floor)
+
+            timed_out = Result("cf-1", "FAIL", "Timeout")
+            timed_out.set_run_time(plan.timeout)
+            scheduler.record_runtimes(cache_dir, [timed_out])
+            plan = scheduler.plan_issue(issue, scheduler.load_history(cache_dir), cache_dir)
+            self.assertEqual(plan.timeout, scheduler.timeout_multiplier * scheduler.timeout_floor)
+
+            cached = Result("cf-1", "PASS", "")
+            cached.set_run_time(1000)
+            cached.from_cache = True
+            scheduler.record_runtimes(cache_dir, [cached]) # not a runtime of this run
+            self.assertEqual(len(scheduler.load_history(cache_dir)["cf-1"]), 11)
+
+    def test_schedule(self):
+        plans = [scheduler.IssuePlan({"issue_id": issue_id}, runtime, 60, True) for issue_id, runtime in (("a", 10), ("b", 30), ("c", 20), ("d", 40))]
+        ordered, skipped = scheduler.schedule(plans)
+        self.assertEqual([plan.issue_id for plan in ordered], ["d", "b", "c", "a"])
+        self.assertEqual(skipped, [])
+        ordered, _ = scheduler.schedule(plans, is_priority=lambda plan: plan.issue_id in ("a", "c"))
+        self.assertEqual([plan.issue_id for plan in ordered], ["c", "a", "d", "b"])
+        # two slots, 45s: d (0-40) and b (0-30) start, c would end at 50 on the second slot, a ends at 40
+        ordered, skipped = scheduler.schedule(plans, jobs=2, time_budget=45)
+        self.assertEqual([plan.issue_id for plan in ordered], ["d", "b", "a"])
+        self.assertEqual([plan.issue_id for plan in skipped], ["c"])
+
+
+    def _write_log(self, directory, name, content):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write(content)
+        return path
+
+    def _baseline_compare_pattern_data(self, expected_log_path, actual_log_path, bug_pattern_data):
+        # compare_pattern_data before log_matcher: re.findall over the whole log
+        with open(expected_log_path, "r") as file:
+            expected_log_file_content = file.read()
+        with open(actual_log_path, "r") as file:
+            actual_log_file_content = file.read()
+        for key, pattern in bug_pattern_data.items():
+            expected_content = re.search(pattern, expected_log_file_content).group(1)
+            actual_content = re.findall(pattern, actual_log_file_content)
+            if key == "file_pattern":
+                expected_content = os.path.basename(expected_content)
+                actual_content = [os.path.basename(item) for item in actual_content]
+            if expected_content not in actual_content:
+                return False
+        return True
+
+    def test_log_contains_expected(self):
+        expected_log = "/target/src/Foo.java:12: error: [argument] incompatible argument\n  found   : @Nullable String\n  required: @NonNull String\n"
+        bug_patterns = [
+            {"file_pattern": r"([\w/]+\.java):\d+: error", "error_pattern": r"error: \[(\w+)\]"},
+            {"error_pattern": r"error: \[(\w+)\] incompatible argument\n\s+found\s*:"}, # spans lines
+            {"found_pattern": r"found\s*:\s*(.*)"},
+            {"error_pattern": r"^/\S+: error: \[(\w+)\]"},
+        ]
+        actual_logs = [
+            "warning: unrelated\n/min/src/Foo.java:3: error: [argument] incompatible argument\n  found   : @Nullable String\n  required: @NonNull String\n1 error\n",
+            "/min/src/Foo.java:3: error: [assignment] incompatible types\n  found   : @Nullable String\n",
+            "/min/src/Foo.java:3: error: [argument] incompatible argument\r\n  found   : @Nullable String\r\n", # CRLF
+            "",
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            expected_path = self._write_log(directory, "expected_log.txt", expected_log)
+            for index, actual_log in enumerate(actual_logs):
+                actual_path = self._write_log(directory, f"build_log_{index}.txt", actual_log)
+                for bug_pattern in bug_patterns:
+                    log_matcher.compile_patterns.cache_clear()
+                    self.assertEqual(log_matcher.log_contains_expected(bug_pattern, expected_path, actual_path),
+                                     self._baseline_compare_pattern_data(expected_path, actual_path, bug_pattern), (actual_log, bug_pattern))
+            self.assertTrue(log_matcher.log_contains_expected(bug_patterns[1], expected_path, self._write_log(directory, "a.txt", actual_logs[0])))
+            self.assertFalse(log_matcher.log_contains_expected(bug_patterns[0], expected_path, self._write_log(directory, "b.txt", actual_logs[1])))
+            with self.assertRaises(ValueError):
+                log_matcher.log_contains_expected({"error_pattern": r"error: \[(nomatch)\]"}, expected_path, expected_path)
+
+    def test_log_contains_expected_unicode(self):
+        # patterns matched on the whole log keep the str semantics of \w, \s, non-ASCII classes and \u escapes
+        with tempfile.TemporaryDirectory() as directory:
+            expected_path = self._write_log(directory, "expected_log.txt", "error: été résumé fin\n")
+            actual_path = self._write_log(directory, "build_log.txt", "note\nerror: été résumé fin\n")
+            for pattern in (r"error: é(\w+)\s", r"error: \u00e9(\w+)\s", r"error: (\w+)\s\w+", r"error: ([ét]+)\s", r"error: \S+ (r[à-ÿ\w]+)", r"(r\w+\sfin)"):
+                log_matcher.compile_patterns.cache_clear()
+                self.assertFalse(log_matcher.LogPattern("error_pattern", pattern).line_local, pattern)
+                self.assertTrue(log_matcher.log_contains_expected({"error_pattern": pattern}, expected_path, actual_path), pattern)
+                self.assertEqual(log_matcher.log_contains_expected({"error_pattern": pattern}, expected_path, actual_path),
+                                 self._baseline_compare_pattern_data(expected_path, actual_path, {"error_pattern": pattern}))
+
+
+    def test_compile_server_timeout(self):
+        # a server whose compilation never ends is killed and replaced by a new one for the next job
+        with tempfile.TemporaryDirectory() as directory:
+            command = [sys.executable, "-c", "import sys, time; sys.stdin.readline(); time.sleep(60)"]
+            server = compile_server.CompileServer(command, dict(os.environ), os.path.join(directory, "server.log"))
+            key = (os.path.join(directory, "jdk"), None, ())
+            compile_server._servers[key] = server
+            try:
+                with self.assertRaises(WorkerTimeout):
+                    compile_server.compile_with_server(directory, key[0], ["Foo.java"], os.path.join(directory, "build_log.txt"), timeout=1)
+                self.assertFalse(server.is_alive())
+                self.assertNotIn(key, compile_server._servers)
+                self.assertNotIn(key, compile_server._unavailable)
+            finally:
+                compile_server._servers.pop(key, None)
+                server.close(force=True)
+
+
+    def _ashe_exception(self, name, message, line):
+        return (f'Exception in thread "main" {name}: {message} at Line {line}\n'
+                f"\tat org.checkerframework.specimin.SpeciminRunner.performMinimization(SpeciminRunner.java:{line})\n")
+
+    def test_exception_rank_index(self):
+        banner = "ASHE dryrun: RepositoryAutomationEngine started with the default configuration\n" * 100 # no timestamp, over 4 KB
+        first_run = banner + self._ashe_exception("java.lang.RuntimeException", "no type", 1) * 2 + self._ashe_exception("java.lang.IllegalStateException", "bad state", 2)
+        appended = self._ashe_exception("java.lang.RuntimeException", "no type", 3)
+        second_log = banner + self._ashe_exception("java.lang.UnsupportedOperationException", "not supported", 4)
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, "app.log")
+            index_path = os.path.join(directory, "rank.sqlite")
+            connection = specimin_exception_rank.open_index(index_path)
+            try:
+                with open(log_path, 'w') as file:
+                    file.write(first_run)
+                self.assertEqual(specimin_exception_rank.index_log(connection, log_path), len(first_run))
+                with open(log_path, 'a') as file:
+                    file.write(appended + "Exception in thread \"main\" java.lang.Runtime") # last line still being written
+                self.assertEqual(specimin_exception_rank.index_log(connection, log_path), len(appended))
+                rest = "Exception: partial\n"
+                with open(log_path, 'a') as file:
+                    file.write(rest)
+                self.assertEqual(specimin_exception_rank.index_log(connection, log_path), len("Exception in thread \"main\" java.lang.Runtime" + rest))
+                with open(log_path, 'rb') as source, gzip.open(log_path + ".1.gz", 'wb') as rotated: # rotation
+                    rotated.write(source.read())
+                self.assertEqual(specimin_exception_rank.index_log(connection, log_path + ".1.gz"), 0)
+                with open(log_path, 'w') as file: # a new log with the same banner is parsed from its start
+                    file.write(second_log)
+                self.assertEqual(specimin_exception_rank.index_log(connection, log_path), len(second_log))
+                self.assertEqual(specimin_exception_rank.index_log(connection, log_path), 0)
+                counts = {(name, message): count for name, message, count in connection.execute("SELECT name, message, count FROM signatures")}
+                self.assertEqual(counts, {("java.lang.RuntimeException", "no type at"): 3, ("java.lang.RuntimeException", "partial"): 1,
+                                          ("java.lang.IllegalStateException", "bad state at"): 1, ("java.lang.UnsupportedOperationException", "not supported at"): 1})
+            finally:
+                connection.close()
+            specimin_exception_rank.analyze_logs([log_path], index_path)
+            with open(os.path.join(directory, "specimin_exception_rank.txt"), 'r') as file:
+                ranking = file.read()
+            self.assertIn("Rank: 1,\nCount: 3,\nException: java.lang.RuntimeException,\nMessage: no type at,", ranking)
+            self.assertEqual(ranking.count("Rank: 2,"), 3) # tie
+
+    def _baseline_exception_data(self, log_file, require_stack):
+        # get_exception_data before crash_log_parser: every crash line parsed in its own windows
+        with open(log_file, "r") as file:
+            lines_of_logs = file.read().split('\n')
+        return_data = []
+        for line_no in [line_no for line_no, line in enumerate(lines_of_logs) if line.lstrip().startswith('; The Checker Framework crashed.')]:
+            unit_line = next((i for i in range(line_no, min(line_no + 5, len(lines_of_logs))) if lines_of_logs[i].strip().startswith("Compilation unit:")), -1)
+            if unit_line == -1:
+                continue
+            crashed_class_name = os.path.basename(lines_of_logs[unit_line].split(" ")[-1])
+            exception_line = next((i for i in range(unit_line, min(unit_line + 5, len(lines_of_logs))) if lines_of_logs[i].strip().startswith("Exception:")), -1)
+            if exception_line == -1:
+                continue
+            exception_line_str = lines_of_logs[exception_line]
+            exception_cause = re.sub(r'^[^a-zA-Z]+|[^a-zA-Z]+$', '', exception_line_str[exception_line_str.index("Exception:") + 10:].split()[0])
+            if not require_stack:
+                return_data.append((crashed_class_name, exception_cause, []))
+                continue
+            exception_stack = [lines_of_logs[i].split()[-1].strip() for i in range(exception_line + 1, min(exception_line + 6, len(lines_of_logs))) if lines_of_logs[i].lstrip().startswith("at")]
+            if exception_stack:
+                return_data.append((crashed_class_name, exception_cause, exception_stack))
+        return return_data
+
+    def test_parse_crash_log(self):
+        def crash(unit, cause, frames, gap = 0):
+            return ["; The Checker Framework crashed. Please report the crash."] + ["  ..."] * gap + [f"Compilation unit: /tmp/src/{unit}", f"Exception: {cause}; {cause}"] + [f"  at {frame}" for frame in frames]
+        logs = {
+            "single": crash("Foo.java", "java.lang.NullPointerException", ["a.A.f(A.java:1)", "b.B.g(B.java:2)"]),
+            "two": crash("Foo.java", "java.lang.NullPointerException", ["a.A.f(A.java:1)"]) + ["other output"] * 8 + crash("Bar.java", "java.lang.ClassCastException", ["c.C.h(C.java:3)"]),
+            # the second crash starts inside the stack window of the first one
+            "overlap": crash("Foo.java", "java.lang.NullPointerException", ["a.A.f(A.java:1)"]) + crash("Bar.java", "java.lang.ClassCastException", ["c.C.h(C.java:3)", "d.D.i(D.java:4)"]),
+            # the first crash is still looking for its exception when the second one is complete
+            "slow_first": ["; The Checker Framework crashed.", "Compilation unit: /tmp/src/Foo.java", "; The Checker Framework crashed.", "Compilation unit: /tmp/src/Bar.java", "Exception: java.lang.AssertionError", "  at e.E.j(E.java:5)"],
+            "unit_too_far": crash("Foo.java", "java.lang.NullPointerException", ["a.A.f(A.java:1)"], gap=4) + crash("Bar.java", "java.lang.ClassCastException", ["c.C.h(C.java:3)"], gap=3),
+            "no_stack": crash("Foo.java", "java.lang.NullPointerException", []) + ["done"],
+            "truncated": ["; The Checker Framework crashed.", "Compilation unit: /tmp/src/Foo.java"],
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            for name, lines in logs.items():
+                path = self._write_log(directory, name + ".log", "\n".join(lines) + "\n")
+                for require_stack in (False, True):
+                    parsed = [(data.exception_class, data.exception, data.stack_trace) for data in main.get_exception_data(path, require_stack)]
+                    self.assertEqual(parsed, self._baseline_exception_data(path, require_stack), f"{name}, require_stack={require_stack}")
+            overlap = main.get_exception_data(os.path.join(directory, "overlap.log"), True)
+            self.assertEqual([data.exception_class for data in overlap], ["Foo.java", "Bar.java"])
+            self.assertEqual(overlap[0].stack_trace, ["a.A.f(A.java:1)", "c.C.h(C.java:3)"])
+            self.assertEqual(overlap[1].stack_trace, ["c.C.h(C.java:3)", "d.D.i(D.java:4)"])
+            self.assertEqual([data.exception_class for data in main.get_exception_data(os.path.join(directory, "slow_first.log"))], ["Foo.java", "Bar.java"])
+            expected = self._write_log(directory, "expected.log", "\n".join(crash("Bar.java", "java.lang.ClassCastException", ["c.C.h(C.java:3)", "d.D.i(D.java:4)"])) + "\n")
+            self.assertTrue(main.compare_crash_log(expected, os.path.join(directory, "overlap.log")))
+
+    def test_run_streaming_cleanup(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sink = output_sink.OutputSink(os.path.join(directory, "missing.log"))
+            with self.assertRaises(FileNotFoundError):
+                output_sink.run_streaming([os.path.join(directory, "no_such_command")], stderr_sink=sink)
+            self.assertIsNone(sink._file)
+
+            # the shell starts a grandchild in the background: an interrupt must kill the whole group
+            pid_file = os.path.join(directory, "grandchild.pid")
+            sink = output_sink.OutputSink(os.path.join(directory, "interrupted.log"))
+            wait_with_usage = output_sink._wait_with_usage
+            def interrupt(process, timeout):
+                while not os.path.exists(pid_file) or not open(pid_file).read().strip():
+                    time.sleep(0.01)
+                raise KeyboardInterrupt()
+            output_sink._wait_with_usage = interrupt
+            try:
+                with self.assertRaises(KeyboardInterrupt):
+                    output_sink.run_streaming(f"sleep 60 & echo $! > {pid_file}; wait", stderr_sink=sink, shell=True)
+            finally:
+                output_sink._wait_with_usage = wait_with_usage
+            self.assertIsNone(sink._file)
+            grandchild = int(open(pid_file).read())
+            for _ in range(100): # killed, possibly a zombie until init reaps it
+                try:
+                    with open(f"/proc/{grandchild}/stat") as file:
+                        if file.read().rsplit(")", 1)[1].split()[0] == "Z":
+                            break
+                except FileNotFoundError:
+                    break
+                time.sleep(0.05)
+            else:
+                self.fail("grandchild still running")
+
+    def test_ashe_statistics(self):
+        def repository(path, minimized, failed, compiled):
+            lines = [f"INFO Processing repository at: {path} for branch: main"]
+            lines += ["INFO Minimizing source file...", "INFO BUILD SUCCESSFUL"] * minimized
+            lines += ["INFO Minimizing source file...", "ERROR BUILD FAILED"] * failed
+            lines += ["INFO Compiling Java files", "INFO Minimized files compiled successfully."] * compiled
+            lines += ["INFO Compiling Java files", "ERROR Minimized files failed to compile."] * (minimized - compiled)
+            return lines + [f"INFO Completed processing repository at: {path}"]
+        expected = [
+            ("/repos/a", "main", dict(minimization_attempts=3, successful_minimization=2, failed_minimization=1, compilation_attempts=2,
+                                      successful_compilation=1, failed_compilation=1, full_success=1)),
+            ("/repos/b", "main", dict(minimization_attempts=4, successful_minimization=4, failed_minimization=0, compilation_attempts=4,
+                                      successful_compilation=4, failed_compilation=0, full_success=4)),
+        ]
+        lines = repository("/repos/a", 2, 1, 1) + repository("/repos/b", 4, 0, 4)
+        with tempfile.TemporaryDirectory() as directory:
+            single = self._write_log(directory, "app.log", "\n".join(lines) + "\n")
+            self.assertEqual(specimin_statistics.analyze_logs([single], jobs=1), expected)
+            with open(os.path.join(directory, "specimin_statistics.txt")) as file:
+                summary = file.read()
+            self.assertIn("Running Specimin on repository: /repos/a for branch: main\nAttempted minimization - 3:\n"
+                          "Successfully minimized 2 (66.67%) target methods.", summary)
+            self.assertIn("Fully successful from minimization to compilation: 4 (100.00%)", summary)
+
+            # the same log rotated in the middle of the first repository: app.log.2.gz is the oldest part
+            rotated = os.path.join(directory, "rotated")
+            os.makedirs(rotated)
+            parts = [lines[:3], lines[3:9], lines[9:]]
+            paths = [os.path.join(rotated, "app.log.2.gz"), os.path.join(rotated, "app.log.1"), os.path.join(rotated, "app.log")]
+            with gzip.open(paths[0], "wt") as file:
+                file.write("\n".join(parts[0]) + "\n")
+            self._write_log(rotated, "app.log.1", "\n".join(parts[1]) + "\n")
+            self._write_log(rotated, "app.log", "\n".join(parts[2]) + "\n")
+            for age, path in enumerate(reversed(paths)):
+                os.utime(path, (1000000 - age, 1000000 - age))
+            csv_path = os.path.join(directory, "stats.csv")
+            self.assertEqual(specimin_statistics.analyze_logs(list(reversed(paths)), csv_path=csv_path, jobs=2), expected)
+            with open(csv_path) as file:
+                self.assertEqual(file.read().splitlines()[1], "/repos/a,main,3,2,1,2,1,1,1")
+
+            # two logs of the same repository are merged; a log without the repository engine is reported per project root
+            other = self._write_log(directory, "other.log", "\n".join(repository("/repos/a", 1, 0, 0)) + "\n")
+            root = self._write_log(directory, "root.log", "Project root path: /projects/c\nProcessing Java file: C.java\n"
+                                   "Minimizing source file...\nBUILD SUCCESSFUL\n")
+            records = specimin_statistics.analyze_logs([single, other, root], jobs=2)
+            self.assertEqual([(path, branch, stats["minimization_attempts"], stats["failed_compilation"]) for path, branch, stats in records],
+                             [("/repos/a", "main", 4, 2), ("/repos/b", "main", 4, 0), ("/projects/c", "N/A", 1, 0)])
+
+    def test_count_java_lines(self):
+        source = '\n'.join([
+            'package a; // trailing comment',
+            '',
+            '/* block',
+            '',
+            '   comment */',
+            'class A { /* inline */ }',
+            '    // only a comment',
+            '  String s = "// not a comment /* either";',
+            "  char c = '\"';",
+            '  String t = """',
+            '',
+            '      /* text */',
+            '      """;',
+            '/* a */ int x; /* b */',
+            '   ',
+        ])
+        self.assertEqual(code_line.count_java_lines(source), (9, 4, 2))
+        self.assertEqual(code_line.count_java_lines(""), (0, 0, 0))
+
+    def test_count_trees(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tree = os.path.join(directory, "tree")
+            os.makedirs(os.path.join(tree, "pkg"))
+            os.makedirs(os.path.join(tree, ".git"))
+            self._write_log(tree, "A.java", "class A {}\n// comment\n")
+            self._write_log(os.path.join(tree, "pkg"), "B.java", "class B {\n\n}\n")
+            self._write_log(os.path.join(tree, ".git"), "C.java", "class C {}\n")
+            self._write_log(tree, "notes.txt", "text\n")
+            previous = os.environ.get(main.cache_env_var)
+            os.environ[main.cache_env_var] = os.path.join(directory, "cache")
+            try:
+                trees = {"tree": tree, "pkg": os.path.join(tree, "pkg"), "missing": os.path.join(directory, "missing")}
+                self.assertEqual(code_line.count_trees(trees, jobs=1), {"tree": (3, 1, 1), "pkg": (2, 0, 1), "missing": None})
+
+                # unchanged files are taken from the cache, changed ones are counted again
+                cache_file = os.path.join(directory, "cache", code_line.loc_cache_file_name)
+                with open(cache_file) as file:
+                    cache = json.load(file)
+                a_path = os.path.abspath(os.path.join(tree, "A.java"))
+                cache[a_path][2:] = [100, 0, 0]
+                with open(cache_file, "w") as file:
+                    json.dump(cache, file)
+                self.assertEqual(code_line.count_trees({"tree": tree}, jobs=1), {"tree": (102, 0, 1)})
+                self._write_log(os.path.join(tree, "pkg"), "B.java", "class B {}\n")
+                self.assertEqual(code_line.count_trees({"tree": tree}, jobs=1), {"tree": (101, 0, 0)})
+            finally:
+                if previous is None:
+                    del os.environ[main.cache_env_var]
+                else:
+                    os.environ[main.cache_env_var] = previous
+
+    def test_is_regression(self):
+        self.assertFalse(run_history.is_regression(None, ("FAIL", "FAIL", 10)))
+        self.assertFalse(run_history.is_regression(("FAIL", "FAIL", 10), None))
+        self.assertTrue(run_history.is_regression(("PASS", "FAIL", 10), None))
+        self.assertTrue(run_history.is_regression(("FAIL", "PASS", 10), None))
+        self.assertTrue(run_history.is_regression(("PASS", "PASS", 10), ("PASS", "FAIL", 10)))
+        self.assertTrue(run_history.is_regression(("PASS", "FAIL", 10), ("FAIL", "FAIL", 10)))
+        self.assertFalse(run_history.is_regression(("FAIL", "FAIL", 10), ("PASS", "PASS", 50000)))
+        self.assertFalse(run_history.is_regression(("PASS", "PASS", 10), ("PASS", "PASS", 50000)))
+
+    def test_run_history_diff(self):
+        def result(name, status, preservation_status, run_time):
+            result = Result(name, status, "", preservation_status)
+            result.set_run_time(run_time)
+            return result
+        with tempfile.TemporaryDirectory() as directory:
+            history_file = os.path.join(directory, "history", "runs.sqlite")
+            self.assertEqual(run_history.get_baseline(history_file, False), {})
+            base_run = run_history.record_run(history_file, [result("cf-1", "PASS", "PASS", 2), result("cf-2", "PASS", "FAIL", 3),
+                                                             result("cf-3", "FAIL", "FAIL", None)], False, 0.0, 10.0)
+            jar_run = run_history.record_run(history_file, [result("cf-1", "FAIL", "FAIL", 1)], True, 11.0, 12.0)
+            head_run = run_history.record_run(history_file, [result("cf-1", "PASS", "FAIL", 1.5), result("cf-4", "PASS", "PASS", 4)], False, 20.0, 30.0,
+                                              carried_over={"cf-2": ("PASS", "FAIL", 3)})
+
+            self.assertEqual(run_history.get_baseline(history_file, True), {"cf-1": ("FAIL", "FAIL", 1000)})
+            self.assertEqual(run_history.get_baseline(history_file, False),
+                             {"cf-1": ("PASS", "FAIL", 1500), "cf-2": ("PASS", "FAIL", 3000), "cf-4": ("PASS", "PASS", 4000)})
+            with closing(run_history.connect(history_file)) as connection:
+                self.assertEqual(run_history.latest_runs(connection, False), [base_run, head_run])
+                self.assertEqual(run_history.latest_runs(connection, True), [jar_run])
+                differences = run_history.diff_runs(connection, base_run, head_run)
+                self.assertEqual(differences, [
+                    ("cf-1", ("PASS", "PASS", 2000), ("PASS", "FAIL", 1500), -500),
+                    ("cf-2", ("PASS", "FAIL", 3000), ("PASS", "FAIL", 3000), 0),
+                    ("cf-3", ("FAIL", "FAIL", None), None, None),
+                    ("cf-4", None, ("PASS", "PASS", 4000), None),
+                ])
+                self.assertEqual([issue_id for issue_id, before, after, _ in differences if run_history.is_regression(before, after)], ["cf-1"])
+                self.assertEqual(run_history.count_passing(run_history.issue_results(connection, head_run)), 3)
+
+    def test_load_resume_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            journal_file = run_journal.get_journal_file(directory, True)
+            self.assertTrue(journal_file.endswith("jar_run_journal.jsonl"))
+            self.assertIsNone(run_journal.load_resume_state(journal_file))
+
+            journal = run_journal.RunJournal(journal_file)
+            journal.start_run(["cf-1", "cf-2", "cf-3", "cf-4"], {"jobs": 2})
+            journal.issue_started("cf-1")
+            journal.phase_completed("cf-1", "clone", path="ISSUES/cf-1")
+            done = Result("cf-1", "PASS", "", "PASS")
+            done.set_run_time(3)
+            done.set_phase_events([{"name": "specimin", "ph": "X", "ts": 0, "dur": 3000000}])
+            journal.issue_completed(done)
+            journal.issue_started("cf-2")
+            journal.phase_completed("cf-2", "clone", path="ISSUES/cf-2")
+            journal.issue_completed(Result("cf-2", "FAIL", "Worker process failed: killed")) # says nothing about cf-2
+            journal.issue_started("cf-3")
+            journal.phase_completed("cf-3", "clone", path="ISSUES/cf-3")
+            journal.phase_completed("cf-3", "specimin", status="PASS")
+            with open(journal_file, "a") as file: # the process died while writing the result of cf-3
+                file.write('{"type": "result", "issue": "cf-3", "resu')
+
+            state = run_journal.load_resume_state(journal_file)
+            self.assertEqual(state.issue_ids, ["cf-1", "cf-2", "cf-3", "cf-4"])
+            self.assertEqual(state.options, {"jobs": 2})
+            self.assertEqual(list(state.results), ["cf-1"])
+            self.assertEqual((state.results["cf-1"].status, state.results["cf-1"].preservation_status), ("PASS", "PASS"))
+            self.assertEqual(len(state.results["cf-1"].phase_events), 1)
+            self.assertEqual(sorted(state.durable_phases), ["cf-2", "cf-3"])
+            self.assertEqual(sorted(state.durable_phases["cf-3"]), ["clone", "specimin"])
+
+            resumed = run_journal.RunJournal(journal_file, state.durable_phases)
+            self.assertEqual(resumed.get_phase("cf-2", "clone")["path"], "ISSUES/cf-2")
+            self.assertIsNone(resumed.get_phase("cf-2", "specimin"))
+            self.assertTrue(resumed.was_started("cf-3"))
+            self.assertFalse(resumed.was_started("cf-4"))
+
+            # the truncated line does not swallow the records appended after it
+            resumed.issue_completed(Result("cf-3", "FAIL", "crash"))
+            self.assertEqual(sorted(run_journal.load_resume_state(journal_file).results), ["cf-1", "cf-3"])
+            resumed.finish_run()
+            self.assertIsNone(run_journal.load_resume_state(journal_file))
+
+    def test_pipeline(self):
+        stages = [pipeline.Stage("fetch", _stage_fetch, 4), pipeline.Stage("minimize", _stage_minimize, 1), pipeline.Stage("verify", _stage_verify, 2)]
+        runner = pipeline.Pipeline(stages, queue_size=2)
+        finished = []
+        errors = []
+        def on_error(stage_name, item, exception):
+            errors.append((stage_name, item))
+            return -item
+        runner.run(range(1, 13), finished.append, on_error)
+
+        self.assertEqual(errors, [("minimize", 7)])
+        self.assertEqual(sorted(finished), sorted([5, 10, -7] + [item * 10 + 1 for item in (1, 2, 3, 4, 6, 8, 9, 11, 12)]))
+        stats = runner.stats()
+        self.assertEqual([stats["stages"][name]["tasks"] for name in ("fetch", "minimize", "verify")], [12, 10, 9])
+        self.assertLessEqual(stats["stages"]["minimize"]["max_queue"], 2)
+        self.assertLessEqual(stats["stages"]["verify"]["max_queue"], 2)
+        self.assertEqual(stats["bottleneck"], "minimize")
+        self.assertIn("bottleneck: minimize", pipeline.format_stats(stats))
+
+        # with one worker per stage, the items leave the pipeline in the order they were given
+        ordered = []
+        pipeline.Pipeline([pipeline.Stage(stage.name, stage.function, 1) for stage in stages], queue_size=1).run([1, 2, 3, 4, 6, 8], ordered.append, on_error)
+        self.assertEqual(ordered, [11, 21, 31, 41, 61, 81])
+
+    def test_write_chrome_trace(self):
+        def event(issue_id, name, pid, tid):
+            return {"name": name, "cat": "phase", "ph": "X", "ts": 0, "dur": 1000, "pid": pid, "tid": tid, "args": {"issue": issue_id}}
+        first = Result("cf-1", "PASS", "")
+        first.set_phase_events([event("cf-1", "clone", 101, 1), event("cf-1", "specimin", 202, 2), event("cf-1", "compile", 303, 3)]) # fetch, minimize and verify pools
+        second = Result("cf-2", "PASS", "")
+        second.set_phase_events([event("cf-2", "clone", 102, 4), event("cf-2", "specimin", 101, 1)])
+        with tempfile.TemporaryDirectory() as directory:
+            trace_file = os.path.join(directory, "trace.json")
+            phase_trace.write_chrome_trace([first, Result("cf-3", "FAIL", "no events"), second], trace_file)
+            with open(trace_file) as file:
+                trace_events = json.load(file)["traceEvents"]
+        self.assertEqual({trace_event["pid"] for trace_event in trace_events}, {phase_trace.trace_pid})
+        track_names = {trace_event["tid"]: trace_event["args"]["name"] for trace_event in trace_events if trace_event["name"] == "thread_name"}
+        self.assertEqual(track_names, {1: "cf-1", 3: "cf-2"})
+        spans = [(trace_event["tid"], trace_event["name"], trace_event["args"]["pid"], trace_event["args"]["issue"]) for trace_event in trace_events if trace_event["ph"] == "X"]
+        self.assertEqual(spans, [(1, "clone", 101, "cf-1"), (1, "specimin", 202, "cf-1"), (1, "compile", 303, "cf-1"), (3, "clone", 102, "cf-2"), (3, "specimin", 101, "cf-2")])
+        self.assertEqual(first.phase_events[1]["pid"], 202) # the events of the result are not modified
+
+    def test_result_cache_key_harness_version(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for copy in ("before", "after"):
+                os.makedirs(os.path.join(directory, copy))
+                for module in result_cache.harness_modules:
+                    shutil.copy2(module, os.path.join(directory, copy))
+            with open(os.path.join(directory, "after", "log_matcher.py"), "a") as file:
+                file.write("\n# fixed the matcher\n")
+            version = result_cache.get_harness_version(os.path.join(directory, "before"))
+            self.assertEqual(version, result_cache.get_harness_version(os.path.dirname(os.path.abspath(main.__file__))))
+            fixed = result_cache.get_harness_version(os.path.join(directory, "after"))
+            self.assertNotEqual(version, fixed)
+
+        key_arguments = ("abc123", "def456", {"issue_id": "cf-1"}, False, "")
+        key = result_cache.compute_key(*key_arguments)
+        self.assertEqual(key, result_cache.compute_key(*key_arguments))
+        get_harness_version = result_cache.get_harness_version
+        result_cache.get_harness_version = lambda: fixed
+        try:
+            self.assertNotEqual(key, result_cache.compute_key(*key_arguments))
+        finally:
+            result_cache.get_harness_version = get_harness_version
+        self.assertIsNone(result_cache.compute_key("", "def456", {"issue_id": "cf-1"}, False, ""))
 
+    def test_run_history_partial_run(self):
+        full = [Result("cf-1", "PASS", "", "PASS"), Result("cf-2", "PASS", "", "FAIL"), Result("cf-3", "FAIL", "crash")]
+        with tempfile.TemporaryDirectory() as directory:
+            history_file = os.path.join(directory, "runs.sqlite")
+            with closing(sqlite3.connect(history_file)) as connection, connection: # a history written before partial runs were marked
+                connection.execute("CREATE TABLE runs (id INTEGER PRIMARY KEY, started REAL NOT NULL, finished REAL NOT NULL, jar_mode INTEGER NOT NULL, "
+                                   "specimin_commit TEXT NOT NULL, harness_commit TEXT NOT NULL, host TEXT NOT NULL, options TEXT NOT NULL)")
+                connection.execute("INSERT INTO runs VALUES (1, 0.0, 1.0, 0, '', '', 'host', '{}')")
+            first_run = run_history.record_run(history_file, full, False, 10.0, 20.0)
+            debug_run = run_history.record_run(history_file, [Result("cf-3", "FAIL", "crash")], False, 30.0, 31.0, options={"debug": "cf-3"}, partial=True)
+            self.assertEqual(run_history.get_baseline(history_file, False)["cf-1"][0], "PASS")
+            with closing(run_history.connect(history_file)) as connection:
+                self.assertEqual(run_history.latest_runs(connection, False), [1, first_run])
+                self.assertEqual(run_history.count_passing(run_history.issue_results(connection, debug_run)), 0)
+            second_run = run_history.record_run(history_file, full, False, 40.0, 50.0)
+            with closing(run_history.connect(history_file)) as connection:
+                self.assertEqual(run_history.latest_runs(connection, False), [first_run, second_run])
+                self.assertEqual(run_history.latest_runs(connection, False, 3), [1, first_run, second_run])
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -6,79 +6,256 @@ Created by: Jonathan Phillips, https://github.com/jonathan-m-phillips
 Date: April 13, 2024
 
 Description:
-This script reads a log file and ranks the exceptions by how frequently they occur. If the exceptions
+This script reads log files and ranks the exceptions by how frequently they occur. If the exceptions
 occur more often, they are ranked higher. These exception rankings come from running the
 Ashe.RepositoryAutomationEngine in dryrun mode.
 
+Exceptions are accumulated in a SQLite index that remembers how far each log was read, so re-running
+on a growing log only parses the new lines and the ranking covers every ASHE run indexed so far.
+A log is recognized by a hash of its first bytes and a hash of the bytes before the offset read so
+far, so a rotated log (app.log -> app.log.1 or app.log.1.gz) is not parsed twice, and a truncated or
+new app.log is parsed from the start, even if it starts with the same banner as an indexed log.
+
 Output:
-Rankings written to a txt file in the same directory as the provided log file.
+Rankings written to a txt file in the same directory as the first provided log file.
 
 Usage:
-python3 specimin_exception_rank.py <path_to_log_file.log>
+python3 specimin_exception_rank.py <path_to_log_file.log> [<more log files> ...] [--index ranking.sqlite] [--top K]
 """
 
-import sys
+import argparse
+import collections
+import gzip
+import hashlib
 import os
 import re
-from collections import defaultdict
+import sqlite3
+import time
+from functools import lru_cache
+
+INDEX_FILE_NAME = 'specimin_exception_rank.sqlite'
+HEAD_SIZE = 4096  # bytes hashed to recognize a log
+TAIL_SIZE = 4096  # bytes before the indexed offset hashed to recognize a continuation of the log
+BATCH_SIZE = 10000  # exceptions kept in memory before they are written to the index
+NO_CONTEXT = "No code context available"
+
+EXCEPTION_PATTERN = re.compile(r'^Exception in thread ".*?" (\w+.*?):(.*?)(?=\n\S|\Z)', re.DOTALL)
+CONTEXT_PATTERN = re.compile(r'^\s+at (.+)$', re.MULTILINE)
+CALL_SITE_PATTERN = re.compile(r'\bat [\w\.$<>]+\(.*?\)')
+LINE_NUMBER_PATTERN = re.compile(r'\bLine \d+\b')
+MEMORY_ADDRESS_PATTERN = re.compile(r'\bmemory address 0x[\da-f]+\b', flags=re.I)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    head_length INTEGER NOT NULL,
+    head_hash TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    updated REAL NOT NULL,
+    tail_hash TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    message TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    example TEXT NOT NULL,
+    UNIQUE (name, message)
+);
+CREATE INDEX IF NOT EXISTS signatures_by_count ON signatures (count DESC, id);
+"""
 
 
 def analyze_log(file_path: str):
-    directory = os.path.dirname(file_path)
-    output_file_path = os.path.join(directory, 'specimin_exception_rank.txt')
+    """
+    Rank the exceptions of a single log. Kept for callers of the previous version.
+    """
+    analyze_logs([file_path])
 
-    with open(file_path, 'r') as file:
-        content = file.readlines()
 
-    exceptions = __extract_exceptions(content)
-    ranked_exceptions = __rank_exceptions(exceptions)
+def analyze_logs(file_paths: list, index_path: str = None, top: int = None):
+    """
+    Index the new part of every log and write the ranking of all indexed exceptions.
 
-    __write_ranked_exceptions(ranked_exceptions, output_file_path)
+    Parameters:
+    - file_paths (list): log files, plain or gzip-compressed
+    - index_path (str): SQLite index, defaults to specimin_exception_rank.sqlite next to the first log
+    - top (int): only write the 'top' most frequent exceptions
+    """
+    directory = os.path.dirname(file_paths[0])
+    output_file_path = os.path.join(directory, 'specimin_exception_rank.txt')
+    index_path = index_path or os.path.join(directory, INDEX_FILE_NAME)
+
+    connection = open_index(index_path)
+    try:
+        for file_path in file_paths:
+            parsed_bytes = index_log(connection, file_path)
+            print(f"{file_path}: parsed {parsed_bytes} new bytes")
+        __write_ranked_exceptions(__rank_exceptions(connection, top), output_file_path)
+    finally:
+        connection.close()
     print("Write successful")
 
 
-def __extract_exceptions(log_lines):
+def open_index(index_path: str):
+    connection = sqlite3.connect(index_path)
+    connection.executescript(SCHEMA)
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(logs)")]
+    if "tail_hash" not in columns:  # index written before the tail hash was recorded
+        with connection:
+            connection.execute("ALTER TABLE logs ADD COLUMN tail_hash TEXT NOT NULL DEFAULT ''")
+    return connection
+
+
+def __open_binary(file_path: str):
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, 'rb')
+    return open(file_path, 'rb')
+
+
+def __read_before(file_path: str, offset: int):
     """
-    Extract exceptions from the log lines. An exception is defined as a line that starts with "Exception in thread"
-    Args:
-        log_lines: A list of log lines
+    The TAIL_SIZE bytes (or fewer at the start of the file) before 'offset', None if the file is shorter
+    """
+    start = max(0, offset - TAIL_SIZE)
+    with __open_binary(file_path) as file:
+        if file_path.endswith(".gz"):
+            __skip(file, start)
+        else:
+            file.seek(start)
+        tail = file.read(offset - start)
+    return tail if len(tail) == offset - start else None
+
 
-    Returns: A list of tuples (name, message, example_line)
+def __find_log_entry(connection, file_path: str):
     """
-    # Enhanced to capture an example line following the exception message
-    exception_pattern = re.compile(r'^Exception in thread ".*?" (\w+.*?):(.*?)(?=\n\S|\Z)', re.DOTALL)
-    context_pattern = re.compile(r'^\s+at (.+)$', re.MULTILINE)
-    exceptions = []
-    for i, line in enumerate(log_lines):
-        match = exception_pattern.search(line)
-        if match:
-            exception_name, message = match.groups()
-            # find the next line that starts with whitespace followed by "at" to capture the context
-            context_match = context_pattern.search(log_lines[i + 1] if i + 1 < len(log_lines) else "")
-            example_line = context_match.group(1).strip() if context_match else "No code context available"
-            exceptions.append([exception_name.strip(), message.strip(), example_line])
-    return exceptions
+    The index entry of a log that this file continues: same first bytes, and same bytes before the
+    indexed offset. Entries with the longest head are tried first.
+
+    Returns:
+    - tuple: ((id, offset) or None for a log that was never indexed, first bytes of the file,
+      bytes before the offset)
+    """
+    with __open_binary(file_path) as file:
+        head = file.read(HEAD_SIZE)
+    head_hashes = {}
+    for log_id, head_length, head_hash, offset, tail_hash in connection.execute(
+            "SELECT id, head_length, head_hash, offset, tail_hash FROM logs ORDER BY head_length DESC, id"):
+        if head_length > len(head):
+            continue  # the indexed log was longer than this file: a different or truncated log
+        if head_length not in head_hashes:
+            head_hashes[head_length] = hashlib.sha256(head[:head_length]).hexdigest()
+        if head_hashes[head_length] != head_hash:
+            continue
+        tail = __read_before(file_path, offset)
+        if tail is None:
+            continue  # shorter than the indexed part: a different or truncated log
+        if tail_hash:
+            if hashlib.sha256(tail).hexdigest() == tail_hash:
+                return (log_id, offset), head, tail
+        elif head_length == HEAD_SIZE or offset == head_length:  # entry without a tail hash: the head must cover it
+            return (log_id, offset), head, tail
+    return None, head, b""
 
 
-def __rank_exceptions(exceptions):
+def index_log(connection, file_path: str):
     """
-    Rank the exceptions by how frequently they occur. If the exceptions occur more often, they are ranked higher.
-    Args:
-        exceptions: A list of tuples (name, message, example_line)
+    Parse the part of a log that is not indexed yet and add its exceptions to the index. Only complete
+    lines of a plain log are consumed; a partially written last line is parsed on the next run.
 
-    Returns: A sorted list of tuples (count, examples, name, message)
+    Returns:
+    - int: number of bytes parsed
     """
-    grouped_exceptions = defaultdict(list)
-    for name, message, example in exceptions:
-        simplified_message = simplify_message(message)
-        grouped_exceptions[(name, simplified_message)].append(example)
+    entry, head, tail = __find_log_entry(connection, file_path)
+    log_id, offset = entry if entry else (None, 0)
+    is_compressed = file_path.endswith(".gz")
+
+    pending = {}  # (name, simplified message) -> [count, first example]
+    parsed_bytes = 0
+    last_lines = collections.deque([tail])  # at least the TAIL_SIZE bytes before the new offset
+    last_lines_size = len(tail)
+    with __open_binary(file_path) as file:
+        if is_compressed:
+            __skip(file, offset)
+        else:
+            file.seek(offset)
+        exception = None  # exception of the previous line, waiting for its code context
+        for raw_line in file:
+            if not raw_line.endswith(b"\n") and not is_compressed:
+                break  # still being written
+            parsed_bytes += len(raw_line)
+            last_lines.append(raw_line)
+            last_lines_size += len(raw_line)
+            while last_lines_size - len(last_lines[0]) >= TAIL_SIZE:
+                last_lines_size -= len(last_lines.popleft())
+            line = raw_line.decode("utf-8", errors="replace")
+            if exception:
+                context_match = CONTEXT_PATTERN.search(line)
+                __add_exception(pending, exception, context_match.group(1).strip() if context_match else NO_CONTEXT)
+                exception = None
+            match = EXCEPTION_PATTERN.search(line)
+            if match:
+                exception = (match.group(1).strip(), simplify_message(match.group(2).strip()))
+            if len(pending) >= BATCH_SIZE:
+                __flush(connection, pending)
+        if exception:  # last line of the log
+            __add_exception(pending, exception, NO_CONTEXT)
+
+    with connection:  # exceptions and the new offset are committed together
+        __flush(connection, pending)
+        head_length = min(len(head), HEAD_SIZE)
+        head_hash = hashlib.sha256(head[:head_length]).hexdigest()
+        tail_hash = hashlib.sha256(b"".join(last_lines)[-TAIL_SIZE:]).hexdigest()
+        if log_id is None:
+            connection.execute("INSERT INTO logs (path, head_length, head_hash, offset, updated, tail_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                               (os.path.abspath(file_path), head_length, head_hash, offset + parsed_bytes, time.time(), tail_hash))
+        else:
+            connection.execute("UPDATE logs SET path = ?, head_length = ?, head_hash = ?, offset = ?, updated = ?, tail_hash = ? WHERE id = ?",
+                               (os.path.abspath(file_path), head_length, head_hash, offset + parsed_bytes, time.time(), tail_hash, log_id))
+    return parsed_bytes
+
+
+def __skip(file, count: int):
+    while count > 0:
+        chunk = file.read(min(count, 1024 * 1024))
+        if not chunk:
+            break
+        count -= len(chunk)
+
+
+def __add_exception(pending: dict, exception: tuple, example: str):
+    if exception in pending:
+        pending[exception][0] += 1
+    else:
+        pending[exception] = [1, example]
 
-    # convert grouped data into a sorted list of tuples (count, examples, name, message)
-    sorted_exceptions = sorted(((len(v), v, k[0], k[1]) for k, v in grouped_exceptions.items()), reverse=True,
-                               key=lambda x: x[0])
-    return sorted_exceptions
+
+def __flush(connection, pending: dict):
+    """
+    Add the pending exception counts to the index. The first example seen of a signature is kept.
+    """
+    connection.executemany(
+        "INSERT INTO signatures (name, message, count, example) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (name, message) DO UPDATE SET count = count + excluded.count",
+        ((name, message, count, example) for (name, message), (count, example) in pending.items()))
+    pending.clear()
+
+
+def __rank_exceptions(connection, top: int = None):
+    """
+    Rank the exceptions by how frequently they occur. If the exceptions occur more often, they are ranked higher.
+    The ranking is streamed from the index.
+
+    Returns: An iterator of tuples (count, example, name, message)
+    """
+    query = "SELECT count, example, name, message FROM signatures ORDER BY count DESC, id"
+    if top is not None:
+        return connection.execute(query + " LIMIT ?", (top,))
+    return connection.execute(query)
 
 
+@lru_cache(maxsize=65536)
 def simplify_message(message):
     """
     Simplify the exception message by removing certain patterns that are not helpful for distinguishing exceptions.
@@ -87,9 +264,9 @@ def simplify_message(message):
 
     Returns: A simplified version of the message
     """
-    message = re.sub(r'\bat [\w\.$<>]+\(.*?\)', '', message)
-    message = re.sub(r'\bLine \d+\b', '', message)
-    message = re.sub(r'\bmemory address 0x[\da-f]+\b', '', message, flags=re.I)
+    message = CALL_SITE_PATTERN.sub('', message)
+    message = LINE_NUMBER_PATTERN.sub('', message)
+    message = MEMORY_ADDRESS_PATTERN.sub('', message)
     return message.strip()
 
 
@@ -99,7 +276,7 @@ def __write_ranked_exceptions(ranked_exceptions, output_file_path):
     rank_increment = 0  # keeps track of how many ranks we should jump after ties
 
     with open(output_file_path, 'w') as output_file:
-        for count, examples, name, message in ranked_exceptions:
+        for count, example, name, message in ranked_exceptions:
             if last_count != count:
                 current_rank += rank_increment
                 rank_increment = 1  # reset for next potential tie group
@@ -112,14 +289,16 @@ Rank: {current_rank},
 Count: {count},
 Exception: {name},
 Message: {message},
-Example: {examples[0]}
+Example: {example}
 
 """
             output_file.write(output_line)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python3 specimin_exception_rank.py <path_to_log_file.log>")
-        sys.exit(1)
-    analyze_log(sys.argv[1])
+    parser = argparse.ArgumentParser(description='Rank the exceptions of ASHE logs by frequency')
+    parser.add_argument('log_files', nargs='+', help='ASHE log files, including rotated and .gz files')
+    parser.add_argument('--index', dest='index_path', help='SQLite ranking index (default: next to the first log)')
+    parser.add_argument('--top', type=int, default=None, help='only write the K most frequent exceptions')
+    args = parser.parse_args()
+    analyze_logs(args.log_files, args.index_path, args.top)
@@ -6,106 +6,232 @@ Created by: Jonathan Phillips, https://github.com/jonathan-m-phillips
 Date: April 13, 2024
 
 Description:
-This script reads a log file and computes attempted, successful, and failed Specimin minimization
+This script reads log files and computes attempted, successful, and failed Specimin minimization
 and compilation statistics. These statistics come from running the Ashe.RepositoryAutomationEngine
 in dryrun mode.
 
+Each log is read once, line by line. Rotated logs (app.log.1, app.log.2.gz, ...) of the same log are
+read as one stream, oldest first. Logs are scanned in parallel and the counters of a repository are
+merged across logs.
+
 Output:
-Summary written to a txt file in the same directory as the provided log file.
+Summary written to a txt file in the same directory as the first provided log file.
+Optionally the same statistics as JSON (--json) and CSV (--csv).
 
 Usage:
-python3 specimin_statistics.py <path_to_log_file.log>
+python3 specimin_statistics.py <path_to_log_file.log> [<more log files> ...] [--json out.json] [--csv out.csv] [--jobs N]
 """
 
-import sys
+import argparse
+import csv
+import gzip
+import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+STAT_KEYS = [
+    'minimization_attempts',
+    'successful_minimization',
+    'failed_minimization',
+    'compilation_attempts',
+    'successful_compilation',
+    'failed_compilation',
+    'full_success'
+]
+
+REPOSITORY_START = "Processing repository at:"
+REPOSITORY_END = "Completed processing repository at:"
+PROJECT_ROOT = "Project root path:"
+JAVA_FILE = "Processing Java file:"
+
+# log marker -> counters it increments
+COUNTER_MARKERS = {
+    "Minimizing source file...": ['minimization_attempts'],
+    "BUILD SUCCESSFUL": ['successful_minimization'],
+    "BUILD FAILED": ['failed_minimization'],
+    "Compiling Java files": ['compilation_attempts'],
+    "Minimized files compiled successfully.": ['successful_compilation', 'full_success'],
+    "Minimized files failed to compile.": ['failed_compilation']
+}
+
+# one alternation of every marker, so lines without any marker cost a single regex scan
+MARKER_PATTERN = re.compile("|".join(re.escape(marker) for marker in
+                                     [REPOSITORY_END, REPOSITORY_START, PROJECT_ROOT, JAVA_FILE, *COUNTER_MARKERS]))
+ROTATION_SUFFIX_PATTERN = re.compile(r"(\.\d{4}-\d{2}-\d{2})?(\.\d+)?(\.gz)?$")
 
 
 def analyze_log(file_path: str):
-    directory: str = os.path.dirname(file_path)
+    """
+    Analyze a single log file (and nothing else). Kept for callers of the previous version.
+    """
+    analyze_logs([file_path])
+
+
+def analyze_logs(file_paths: list, json_path: str = None, csv_path: str = None, jobs: int = None):
+    """
+    Computes the statistics of all the log files and writes the summary.
+
+    Parameters:
+    - file_paths (list): log files, plain or gzip-compressed. Rotated files of the same log are read in order.
+    - json_path (str): optional JSON output file
+    - csv_path (str): optional CSV output file
+    - jobs (int): number of logs scanned in parallel, defaults to the number of CPUs
+
+    Returns:
+    - list: one (repo_path, branch_name, stats) tuple per repository
+    """
+    directory: str = os.path.dirname(file_paths[0])
     output_file_path: str = os.path.join(directory, 'specimin_statistics.txt')
 
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        file_events = dict(zip(file_paths, executor.map(_scan_log, file_paths)))
+
+    merged: dict = {}  # (repo_path, branch_name) -> stats, in first-seen order
+    for group in __group_rotated_logs(file_paths):
+        for repo_path, branch_name, stats in __replay([file_events[path] for path in group]):
+            repo_stats = merged.setdefault((repo_path, branch_name), dict.fromkeys(STAT_KEYS, 0))
+            for key in STAT_KEYS:
+                repo_stats[key] += stats[key]
+    records = [(repo_path, branch_name, stats) for (repo_path, branch_name), stats in merged.items()]
+
     with open(output_file_path, 'w') as output_file:
-        with open(file_path, 'r') as file:
-            lines: list[str] = file.readlines()
-
-        repo_stats: dict[str, int] = {
-            'minimization_attempts': 0,
-            'successful_minimization': 0,
-            'failed_minimization': 0,
-            'compilation_attempts': 0,
-            'successful_compilation': 0,
-            'failed_compilation': 0,
-            'full_success': 0
-        }
-        repo_path: str = ""
-        branch_name: str = "N/A"  # default branch name before RepositoryAutomationEngine starts
-        context: str = "AsheAutomation"  # default context
-        project_root: str = ""
-        processing_new_repo: bool = False  # flag to check if repo stats are present to prevent duplicate printing
-
-        for line in lines:
-            line: str = line.strip()
-
-            # get the repository path and branch name from the log line
-            if "Processing repository at:" in line:
-                context = "RepositoryAutomationEngine"  # we know we are using the RepositoryAutomationEngine
-                repo_path, branch_name = __extract_repo_and_branch(line)
-                break
-
-        for line in lines:
-            line: str = line.strip()
-
-            if context == "RepositoryAutomationEngine":
-                if "Processing repository at:" in line:
-                    # if Ashe Repository Automation Engine finished processing a repository
-                    # and moved on to the next repository, print and reset the statistics
-                    if repo_path and processing_new_repo:
-                        __print_and_write_stats(repo_stats, repo_path, branch_name, output_file)
-                        repo_stats = repo_stats.fromkeys(repo_stats, 0)
-
-                    repo_path, branch_name = __extract_repo_and_branch(line)
-                    processing_new_repo = True
-
-                __update_stats(line, repo_stats)
-
-                if "Completed processing repository at:" in line:
-                    if repo_path and processing_new_repo:
-                        __print_and_write_stats(repo_stats, repo_path, branch_name, output_file)
-                        repo_stats = repo_stats.fromkeys(repo_stats, 0)  # reset statistics for new repo
-                        processing_new_repo = False
-
-            elif context == "AsheAutomation":
-                if "Project root path:" in line:
-                    project_root = __extract_project_root(line)
-
-                if "Processing Java file:" in line:
-                    repo_path = project_root
-                    processing_new_repo = True
-
-                __update_stats(line, repo_stats)
-
-        if repo_path and processing_new_repo:
-            __print_and_write_stats(repo_stats, repo_path, branch_name, output_file)
+        for repo_path, branch_name, stats in records:
+            __print_and_write_stats(stats, repo_path, branch_name, output_file)
+    if json_path:
+        with open(json_path, 'w') as json_file:
+            json.dump([dict(repo_path=repo_path, branch=branch_name, **stats) for repo_path, branch_name, stats in records],
+                      json_file, indent=2)
+    if csv_path:
+        with open(csv_path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['repo_path', 'branch', *STAT_KEYS])
+            for repo_path, branch_name, stats in records:
+                writer.writerow([repo_path, branch_name, *[stats[key] for key in STAT_KEYS]])
 
     print("Write successful")
+    return records
+
 
+def open_log(file_path: str):
+    """
+    Opens a plain or gzip-compressed log for reading text.
+    """
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, 'rt', errors='replace')
+    return open(file_path, 'r', errors='replace')
 
-def __update_stats(line, repo_stats):
-    if "Minimizing source file..." in line:
-        repo_stats['minimization_attempts'] += 1
-    if "BUILD SUCCESSFUL" in line:
-        repo_stats['successful_minimization'] += 1
-    if "BUILD FAILED" in line:
-        repo_stats['failed_minimization'] += 1
-    if "Compiling Java files" in line:
-        repo_stats['compilation_attempts'] += 1
-    if "Minimized files compiled successfully." in line:
-        repo_stats['successful_compilation'] += 1
-        repo_stats['full_success'] += 1
-    if "Minimized files failed to compile." in line:
-        repo_stats['failed_compilation'] += 1
+
+def _scan_log(file_path: str):
+    """
+    Reads a log once and condenses it into the events that matter for the statistics:
+    ("counts", [counter increments]), ("repo", path, branch), ("completed",), ("root", path) and ("java",).
+    Runs in a worker process.
+
+    Parameters:
+    - file_path (str): log file
+
+    Returns:
+    - list: the events, in log order
+    """
+    events: list = []
+    counts: list = [0] * len(STAT_KEYS)
+    counted: bool = False
+    with open_log(file_path) as file:
+        for line in file:
+            found = {match.group(0) for match in MARKER_PATTERN.finditer(line)}
+            if not found:
+                continue
+            line = line.strip()
+            if REPOSITORY_START in found:  # the counters of this line belong to the new repository
+                if counted:
+                    events.append(("counts", counts))
+                    counts, counted = [0] * len(STAT_KEYS), False
+                events.append(("repo", *__extract_repo_and_branch(line)))
+            if PROJECT_ROOT in found:
+                events.append(("root", __extract_project_root(line)))
+            if JAVA_FILE in found:
+                events.append(("java",))
+            for marker in found:
+                for key in COUNTER_MARKERS.get(marker, []):
+                    counts[STAT_KEYS.index(key)] += 1
+                    counted = True
+            if REPOSITORY_END in found:  # the counters of this line belong to the completed repository
+                if counted:
+                    events.append(("counts", counts))
+                    counts, counted = [0] * len(STAT_KEYS), False
+                events.append(("completed",))
+    if counted:
+        events.append(("counts", counts))
+    return events
+
+
+def __replay(events_per_file: list):
+    """
+    Attributes the counters of one log (possibly split over rotated files) to repositories.
+    Logs of the Ashe.RepositoryAutomationEngine contain "Processing repository at:" lines and are
+    reported per repository and branch. Other logs are reported per project root.
+
+    Returns:
+    - list: (repo_path, branch_name, stats) tuples, in log order
+    """
+    repository_engine: bool = any(event[0] == "repo" for events in events_per_file for event in events)
+    records: list = []
+    repo_stats: dict = dict.fromkeys(STAT_KEYS, 0)
+    repo_path: str = ""
+    branch_name: str = "N/A"  # default branch name before RepositoryAutomationEngine starts
+    project_root: str = ""
+    processing_new_repo: bool = False  # flag to check if repo stats are present to prevent duplicate printing
+
+    for events in events_per_file:
+        for event in events:
+            kind = event[0]
+            if kind == "counts":
+                for key, count in zip(STAT_KEYS, event[1]):
+                    repo_stats[key] += count
+            elif repository_engine and kind == "repo":
+                # if Ashe Repository Automation Engine finished processing a repository
+                # and moved on to the next repository, record and reset the statistics
+                if repo_path and processing_new_repo:
+                    records.append((repo_path, branch_name, repo_stats))
+                    repo_stats = dict.fromkeys(STAT_KEYS, 0)
+                repo_path, branch_name = event[1], event[2]
+                processing_new_repo = True
+            elif repository_engine and kind == "completed":
+                if repo_path and processing_new_repo:
+                    records.append((repo_path, branch_name, repo_stats))
+                    repo_stats = dict.fromkeys(STAT_KEYS, 0)  # reset statistics for new repo
+                    processing_new_repo = False
+            elif not repository_engine and kind == "root":
+                project_root = event[1]
+            elif not repository_engine and kind == "java":
+                repo_path = project_root
+                processing_new_repo = True
+
+    if repo_path and processing_new_repo:
+        records.append((repo_path, branch_name, repo_stats))
+    return records
+
+
+def __rotation_index(file_path: str):
+    match = re.search(r"\.(\d+)(\.gz)?$", file_path)
+    return int(match.group(1)) if match else 0
+
+
+def __group_rotated_logs(file_paths: list):
+    """
+    Groups rotated files of the same log (app.log, app.log.1, app.log.2.gz, app.2024-04-13.log.gz, ...),
+    oldest first: by modification time, then by rotation index (app.log.2 is older than app.log.1).
+
+    Returns:
+    - list: lists of file paths, one per log, in order of first appearance
+    """
+    groups: dict = {}
+    for file_path in file_paths:
+        directory, name = os.path.split(os.path.abspath(file_path))
+        base = ROTATION_SUFFIX_PATTERN.sub("", name.replace(".log", "", 1))
+        groups.setdefault((directory, base), []).append(file_path)
+    return [sorted(group, key=lambda path: (os.path.getmtime(path), -__rotation_index(path))) for group in groups.values()]
 
 
 def __print_and_write_stats(stats, repo_path, branch_name, output_file):
@@ -192,8 +318,10 @@ def __extract_project_root(log_line: str):
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python3 specimin_statistics.py <path_to_log_file.log>")
-        sys.exit(1)
-    log_file_path = sys.argv[1]
-    analyze_log(log_file_path)
+    parser = argparse.ArgumentParser(description='Specimin minimization and compilation statistics of ASHE logs')
+    parser.add_argument('log_files', nargs='+', help='ASHE log files, including rotated and .gz files')
+    parser.add_argument('--json', dest='json_path', help='write the statistics as JSON to this file')
+    parser.add_argument('--csv', dest='csv_path', help='write the statistics as CSV to this file')
+    parser.add_argument('--jobs', type=int, default=None, help='number of logs scanned in parallel')
+    args = parser.parse_args()
+    analyze_logs(args.log_files, args.json_path, args.csv_path, args.jobs)
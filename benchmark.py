@@ -0,0 +1,479 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import main
+from Result import Result
+from report_builder import TableGenerator
+from resource_usage import ResourceUsage
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "ashe_scripts"))
+import specimin_statistics
+import specimin_exception_rank
+
+'''
+Benchmarks of the Python side of the harness, run on synthetic inputs so that no Java, network or
+target repository is needed: building the Specimin commands of a large test_data.json, matching bug
+patterns and crashes in Checker Framework build logs, writing the HTML report and the ASHE log scripts.
+
+For each benchmark the best time of --repeat runs gives the throughput (MB/s of input, or items/s), and
+one more run under tracemalloc gives the peak Python heap. Work done in child processes (the scan of
+specimin_statistics.py) is timed but not included in the peak memory.
+
+Inputs are generated once per scale under $SPECIMIN_EVAL_CACHE/benchmark-inputs and reused. Baselines
+are kept per scale in $SPECIMIN_EVAL_CACHE/benchmark_baseline.json.
+
+usage:
+    python benchmark.py [--scale small|realistic|extreme] [--only NAME ...]
+    python benchmark.py --save-baseline          # record the results as the baseline of the scale
+    python benchmark.py --check [--tolerance 0.25]  # exit 1 if a benchmark regressed against the baseline
+'''
+
+baseline_file_name = "benchmark_baseline.json"
+inputs_dir_name = "benchmark-inputs"
+inputs_version = 1 # bump when the generated inputs change, so that cached inputs are regenerated
+memory_slack_mb = 1 # peak memory differences below this are noise
+
+# sizes of the generated inputs
+scales = {
+    "small":     {"build_log_mb": 5,   "crash_log_mb": 5,   "issues": 1000,  "targets": 2000,  "ashe_exceptions": 1000,  "ashe_log_mb": 5},
+    "realistic": {"build_log_mb": 50,  "crash_log_mb": 50,  "issues": 5000,  "targets": 10000, "ashe_exceptions": 5000,  "ashe_log_mb": 50},
+    "extreme":   {"build_log_mb": 400, "crash_log_mb": 400, "issues": 10000, "targets": 20000, "ashe_exceptions": 50000, "ashe_log_mb": 300},
+}
+
+bug_pattern = {
+    "file_pattern": "(\\w+\\.java)",
+    "error_pattern": "error: \\[(.+?)\\]",
+    "source_pattern": "(return\\s+\\w+;)",
+    "found_pattern": "found   : (.*)",
+    "required_pattern": "required: (.*)"
+}
+
+exception_names = ["java.lang.NullPointerException", "java.lang.ClassCastException", "java.lang.IllegalStateException",
+                   "java.lang.UnsupportedOperationException", "java.lang.IndexOutOfBoundsException",
+                   "com.github.javaparser.resolution.UnsolvedSymbolException"]
+
+class BenchmarkResult:
+    def __init__(self, name, items, unit, seconds, peak_bytes):
+        '''
+        Constructor of the class
+        Parameters:
+            name (str): benchmark name
+            items (int): amount of input processed by one run (bytes, targets, rows, ...)
+            unit (str): unit of 'items'
+            seconds (float): best time of the timed runs
+            peak_bytes (int): peak Python heap of the traced run
+        '''
+        self.name = name
+        self.items = items
+        self.unit = unit
+        self.seconds = seconds
+        self.peak_bytes = peak_bytes
+
+    @property
+    def throughput(self):
+        '''
+        'unit' per second, MB per second for byte inputs
+        '''
+        amount = self.items / (1024 * 1024) if self.unit == "bytes" else self.items
+        return amount / self.seconds if self.seconds > 0 else float("inf")
+
+    @property
+    def throughput_unit(self):
+        return "MB/s" if self.unit == "bytes" else f"{self.unit}/s"
+
+    @property
+    def peak_mb(self):
+        return self.peak_bytes / (1024 * 1024)
+
+    def to_dict(self):
+        return {"items": self.items, "unit": self.unit, "seconds": round(self.seconds, 4),
+                "throughput": round(self.throughput, 3), "peak_mb": round(self.peak_mb, 2)}
+
+
+def _write_until(path, size, chunk_source):
+    '''
+    Write the chunks produced by 'chunk_source' to 'path' until it holds at least 'size' bytes
+
+    Returns:
+        int: number of bytes written
+    '''
+    written = 0
+    with open(path, "w") as file:
+        for chunk in chunk_source:
+            file.write(chunk)
+            written += len(chunk)
+            if written >= size:
+                break
+    return written
+
+def _gradle_noise(rng, count):
+    # compiler output that matches no bug pattern value of interest
+    lines = []
+    for _ in range(count):
+        kind = rng.randrange(4)
+        if kind == 0:
+            lines.append(f"> Task :compileJava{rng.randrange(100)} UP-TO-DATE\n")
+        elif kind == 1:
+            lines.append(f"warning: [options] bootstrap class path not set in conjunction with -source {rng.choice([8, 11, 17])}\n")
+        elif kind == 2:
+            lines.append(f"Note: Some input files use unchecked or unsafe operations. Recompile with -Xlint:unchecked for details. ({rng.randrange(10**6)})\n")
+        else:
+            lines.append(f"/work/project/src/main/java/com/example/pkg{rng.randrange(50)}/Gen{rng.randrange(10**4)}.java:{rng.randrange(1, 900)}: "
+                         f"error: [argument] incompatible argument for parameter arg{rng.randrange(9)}\n"
+                         f"        call(value{rng.randrange(100)});\n             ^\n"
+                         f"  found   : @Nullable Value{rng.randrange(100)}\n  required: @NonNull Value{rng.randrange(100)}\n")
+    return "".join(lines)
+
+def _expected_error():
+    return ("/work/project/src/main/java/com/example/Target.java:42: error: [return] incompatible types in return.\n"
+            "        return result;\n               ^\n"
+            "  found   : @Nullable TargetValue\n  required: @NonNull TargetValue\n")
+
+def generate_build_log(directory, size):
+    '''
+    A Checker Framework build log of about 'size' bytes whose only occurrence of the expected error is at its
+    end, so that the matcher has to read all of it. Also writes the expected log.
+
+    Returns:
+        (expected log path, build log path)
+    '''
+    rng = random.Random(1)
+    expected_log = os.path.join(directory, "expected_log.txt")
+    build_log = os.path.join(directory, "build_log.txt")
+    with open(expected_log, "w") as file:
+        file.write(_expected_error())
+
+    def chunks():
+        while True:
+            yield _gradle_noise(rng, 2000)
+    _write_until(build_log, size, chunks())
+    with open(build_log, "a") as file:
+        file.write(_expected_error())
+    return expected_log, build_log
+
+def _crash(rng, unit, exception, stack_depth = 5):
+    frames = "".join(f"\tat org.checkerframework.framework.Gen{rng.randrange(500)}.visit{rng.randrange(50)}(Gen.java:{rng.randrange(1, 2000)})\n"
+                     for _ in range(stack_depth))
+    return (f"error: SourceChecker.typeProcess: unexpected Throwable ({exception.split('.')[-1]}) while processing {unit}\n"
+            f"  ; The Checker Framework crashed.  Please report the crash.  Version: Checker Framework 3.40.0.\n"
+            f"  Compilation unit: {unit}\n"
+            f"  Last visited tree at line {rng.randrange(1, 500)} column 1:\n"
+            f"  Exception: {exception}; {exception}\n"
+            f"{frames}")
+
+def generate_crash_log(directory, size):
+    '''
+    A build log of about 'size' bytes with a crash every few dozen lines. The crash of the expected log
+    (with the same stack) is only at the end of the build log.
+
+    Returns:
+        (expected log path, build log path, number of crashes in the build log)
+    '''
+    rng = random.Random(2)
+    expected_unit = "/work/project/src/main/java/com/example/Target.java"
+    expected_crash = _crash(random.Random(3), expected_unit, "java.lang.AssertionError")
+    expected_log = os.path.join(directory, "expected_crash_log.txt")
+    build_log = os.path.join(directory, "crash_log.txt")
+    with open(expected_log, "w") as file:
+        file.write(expected_crash)
+
+    crashes = 0
+    def chunks():
+        nonlocal crashes
+        while True:
+            parts = []
+            for _ in range(100):
+                parts.append(_gradle_noise(rng, 5))
+                parts.append(_crash(rng, f"/work/project/src/main/java/com/example/Gen{rng.randrange(10**4)}.java", rng.choice(exception_names)))
+                crashes += 1
+            yield "".join(parts)
+    _write_until(build_log, size, chunks())
+    with open(build_log, "a") as file:
+        file.write(expected_crash)
+    return expected_log, build_log, crashes + 1
+
+def generate_test_data(directory, issue_count, target_count):
+    '''
+    A test_data.json of 'issue_count' issues sharing 'target_count' targets
+
+    Returns:
+        str: path of the file
+    '''
+    rng = random.Random(4)
+    issues = []
+    for index in range(issue_count):
+        issue_targets = target_count // issue_count + (1 if index < target_count % issue_count else 0)
+        targets = []
+        for target_index in range(issue_targets):
+            target = {"file": f"Gen{target_index}.java", "package": f"org.example.module{index % 97}.pkg{target_index}"}
+            if rng.random() < 0.8:
+                target["method"] = f"method{target_index}(String, Map<String, List<Integer>>)"
+            else:
+                target["method"] = ""
+                target["field"] = f"FIELD_{target_index}"
+            if rng.random() < 0.1:
+                target["inner_class"] = f"Inner{target_index}"
+            targets.append(target)
+        issues.append({
+            "issue_id": f"cf-{100000 + index}",
+            "url": f"https://github.com/example/project{index % 300}.git",
+            "branch": "", "commit_hash": "", "project_name": f"project{index % 300}",
+            "root_dir": "src/main/java", "targets": targets,
+            "cf_version": "3.40.0", "java_version": "17", "bug_type": "error", "bug_pattern": bug_pattern,
+            "checker_qual_required": False, "has_dependency": False
+        })
+    path = os.path.join(directory, "test_data.json")
+    with open(path, "w") as file:
+        json.dump(issues, file, indent=1)
+    return path
+
+def generate_ashe_log(directory, size, exception_count):
+    '''
+    An ASHE dryrun log of about 'size' bytes over many repositories, with up to 'exception_count' Specimin
+    exceptions (the first ones of the log) spread over a few hundred distinct messages.
+
+    Returns:
+        str: path of the log
+    '''
+    rng = random.Random(5)
+    path = os.path.join(directory, "app.log")
+    exceptions_left = exception_count
+
+    def repository_block(repo):
+        nonlocal exceptions_left
+        lines = [f"INFO: Processing repository at: /work/repos/repo{repo} for branch: main\n",
+                 f"INFO: Project root path: /work/repos/repo{repo}/src/main/java\n"]
+        for file_index in range(20):
+            lines.append(f"INFO: Processing Java file: /work/repos/repo{repo}/src/main/java/Gen{file_index}.java\n")
+            lines.append("INFO: Minimizing source file...\n")
+            if exceptions_left > 0 and rng.random() < 0.7:
+                exceptions_left -= 1
+                lines.append(f'Exception in thread "main" {rng.choice(exception_names)}: cannot resolve symbol Sym{rng.randrange(300)} at Line {rng.randrange(1, 900)}\n')
+                lines.append(f"\tat org.checkerframework.specimin.Visitor{rng.randrange(40)}.visit(Visitor.java:{rng.randrange(1, 900)})\n")
+                lines.append("INFO: BUILD FAILED\n")
+            else:
+                lines.append("INFO: BUILD SUCCESSFUL\n")
+                lines.append("INFO: Compiling Java files\n")
+                lines.append(rng.choice(["INFO: Minimized files compiled successfully.\n", "INFO: Minimized files failed to compile.\n"]))
+            lines.append(f"DEBUG: {'x' * rng.randrange(20, 200)}\n")
+        lines.append(f"INFO: Completed processing repository at: /work/repos/repo{repo}\n")
+        return "".join(lines)
+
+    def chunks():
+        repo = 0
+        while True:
+            yield repository_block(repo)
+            repo += 1
+    _write_until(path, size, chunks())
+    return path
+
+def generate_results(count):
+    '''
+    'count' evaluated results with phase timings and resource usage, as the report receives them
+    '''
+    rng = random.Random(6)
+    results = []
+    start = time.time() * 1e6
+    for index in range(count):
+        passed = rng.random() < 0.7
+        result = Result(f"cf-{100000 + index}", "PASS" if passed else "FAIL", "" if passed else f"ISSUES/cf-{100000 + index}/cf-{100000 + index}_error.txt")
+        result.set_preservation_status("PASS" if passed and rng.random() < 0.8 else "FAIL", "" if passed else "Minimization did not succeed.")
+        result.set_run_time(rng.randrange(1, 600))
+        result.set_phase_events([{"name": phase, "cat": "phase", "ph": "X", "ts": round(start), "dur": rng.randrange(10**6, 10**8),
+                                  "pid": 1, "tid": 1, "args": {"issue": result.name}}
+                                 for phase in ("clone", "specimin", "compile_minimized", "compare_logs")])
+        result.add_resource_usage("specimin", ResourceUsage(rng.random() * 100, rng.random() * 10, rng.randrange(10**5, 4 * 10**6), rng.randrange(10**9), rng.randrange(10**8)))
+        results.append(result)
+    return results
+
+def prepare_inputs(inputs_dir, scale):
+    '''
+    Generate the inputs of a scale in 'inputs_dir', unless a complete set of the current version is there
+
+    Returns:
+        {}: paths and sizes of the inputs
+    '''
+    manifest_path = os.path.join(inputs_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+        if manifest.get("version") == inputs_version and manifest.get("sizes") == scales[scale]:
+            return manifest
+        shutil.rmtree(inputs_dir)
+    sizes = scales[scale]
+    os.makedirs(inputs_dir, exist_ok=True)
+    print(f"Generating {scale} benchmark inputs in {inputs_dir}")
+    expected_log, build_log = generate_build_log(inputs_dir, sizes["build_log_mb"] * 1024 * 1024)
+    expected_crash_log, crash_log, crashes = generate_crash_log(inputs_dir, sizes["crash_log_mb"] * 1024 * 1024)
+    manifest = {
+        "version": inputs_version,
+        "sizes": sizes,
+        "expected_log": expected_log,
+        "build_log": build_log,
+        "expected_crash_log": expected_crash_log,
+        "crash_log": crash_log,
+        "crashes": crashes,
+        "test_data": generate_test_data(inputs_dir, sizes["issues"], sizes["targets"]),
+        "ashe_log": generate_ashe_log(inputs_dir, sizes["ashe_log_mb"] * 1024 * 1024, sizes["ashe_exceptions"]),
+    }
+    with open(f"{manifest_path}.tmp", "w") as file: # the manifest marks a complete set of inputs
+        json.dump(manifest, file, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    return manifest
+
+
+def _build_commands(test_data, work_dir):
+    issues = main.read_json_from_file(test_data)
+    for issue in issues:
+        target_dir = os.path.join(work_dir, issue["issue_id"])
+        main.build_specimin_command(issue["project_name"], target_dir, issue["root_dir"], issue["targets"], "/work/libs")
+        main.build_specimin_args(issue["project_name"], target_dir, issue["root_dir"], issue["targets"], "/work/libs")
+
+def _rank_exceptions(ashe_log, work_dir):
+    index_path = os.path.join(work_dir, specimin_exception_rank.INDEX_FILE_NAME)
+    if os.path.exists(index_path): # the index is incremental: start from an empty one to parse the whole log
+        os.remove(index_path)
+    specimin_exception_rank.analyze_logs([ashe_log], index_path=index_path)
+
+def get_benchmarks(inputs, work_dir):
+    '''
+    The benchmarks over the generated inputs
+
+    Returns:
+        [(name, callable, items, unit)]
+    '''
+    results = generate_results(inputs["sizes"]["issues"])
+    report_path = os.path.join(work_dir, "report", "output.html")
+    # the ASHE scripts write their summary next to the log
+    ashe_log = os.path.join(work_dir, "ashe", os.path.basename(inputs["ashe_log"]))
+    os.makedirs(os.path.dirname(ashe_log), exist_ok=True)
+    if not os.path.exists(ashe_log):
+        os.symlink(inputs["ashe_log"], ashe_log)
+    return [
+        ("build_specimin_command", lambda: _build_commands(inputs["test_data"], work_dir), inputs["sizes"]["targets"], "targets"),
+        ("compare_pattern_data", lambda: main.compare_pattern_data(inputs["expected_log"], inputs["build_log"], bug_pattern),
+         os.path.getsize(inputs["build_log"]), "bytes"),
+        ("get_exception_data", lambda: main.get_exception_data(inputs["crash_log"], True), os.path.getsize(inputs["crash_log"]), "bytes"),
+        ("compare_crash_log", lambda: main.compare_crash_log(inputs["expected_crash_log"], inputs["crash_log"], True),
+         os.path.getsize(inputs["crash_log"]), "bytes"),
+        ("generateTable", lambda: TableGenerator(results, report_path=report_path).generateTable(), len(results), "rows"),
+        ("ashe_statistics", lambda: specimin_statistics.analyze_logs([ashe_log], jobs=1), os.path.getsize(inputs["ashe_log"]), "bytes"),
+        ("ashe_exception_rank", lambda: _rank_exceptions(ashe_log, work_dir), os.path.getsize(inputs["ashe_log"]), "bytes"),
+    ]
+
+def run_benchmark(name, function, items, unit, repeat = 3):
+    '''
+    Time 'function' 'repeat' times, then run it once more under tracemalloc for its peak memory.
+    Its output is discarded.
+
+    Returns:
+        BenchmarkResult
+    '''
+    best = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return BenchmarkResult(name, items, unit, best, peak)
+
+
+def get_baseline_file():
+    return os.path.join(main.get_cache_dir(), baseline_file_name)
+
+def load_baselines(baseline_file):
+    data = main.read_json_from_file(baseline_file) if os.path.exists(baseline_file) else None
+    return data if isinstance(data, dict) else {}
+
+def save_baseline(baseline_file, scale, results):
+    '''
+    Record 'results' as the baseline of 'scale'. Baselines of benchmarks that were not run are kept.
+    '''
+    baselines = load_baselines(baseline_file)
+    scale_baseline = baselines.setdefault(scale, {})
+    for result in results:
+        scale_baseline[result.name] = result.to_dict()
+    os.makedirs(os.path.dirname(os.path.abspath(baseline_file)), exist_ok=True)
+    with open(baseline_file, "w") as file:
+        json.dump(baselines, file, indent=2)
+
+def find_regressions(results, baseline, tolerance):
+    '''
+    Benchmarks whose throughput dropped, or whose peak memory grew, by more than 'tolerance' (a fraction)
+
+    Parameters:
+        results ([BenchmarkResult]): results of this run
+        baseline ({name: {}}): baseline of the scale (see BenchmarkResult.to_dict)
+
+    Returns:
+        [(name, description)]
+    '''
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None:
+            continue
+        if result.throughput < previous["throughput"] * (1 - tolerance):
+            regressions.append((result.name, f"throughput {result.throughput:.2f} {result.throughput_unit}, baseline {previous['throughput']:.2f}"))
+        if result.peak_mb > previous["peak_mb"] * (1 + tolerance) + memory_slack_mb:
+            regressions.append((result.name, f"peak memory {result.peak_mb:.1f} MB, baseline {previous['peak_mb']:.1f} MB"))
+    return regressions
+
+def print_results(results, baseline):
+    print(f"{'benchmark':<24}{'input':>14}{'best (s)':>10}{'throughput':>20}{'vs base':>9}{'peak (MB)':>11}")
+    for result in results:
+        size = f"{result.items / (1024 * 1024):.0f} MB" if result.unit == "bytes" else f"{result.items} {result.unit}"
+        previous = baseline.get(result.name)
+        change = f"{(result.throughput / previous['throughput'] - 1) * 100:+.0f}%" if previous and previous["throughput"] else "-"
+        print(f"{result.name:<24}{size:>14}{result.seconds:>10.3f}{result.throughput:>13.2f} {result.throughput_unit:<6}{change:>9}{result.peak_mb:>11.1f}")
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark the harness on synthetic inputs")
+    parser.add_argument('--scale', choices=list(scales), default="small", help='size of the generated inputs')
+    parser.add_argument('--only', nargs='+', help='benchmarks to run, all by default')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark, the best one is reported')
+    parser.add_argument('--inputs', help='directory of the generated inputs')
+    parser.add_argument('--baseline', default=get_baseline_file(), help='json file with the baselines')
+    parser.add_argument('--save-baseline', action='store_true', help='record the results as the baseline of the scale')
+    parser.add_argument('--check', action='store_true', help='exit 1 if a benchmark regressed against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed throughput drop or memory growth, as a fraction')
+    args = parser.parse_args()
+
+    inputs = prepare_inputs(args.inputs or os.path.join(main.get_cache_dir(), inputs_dir_name, args.scale), args.scale)
+    baseline = load_baselines(args.baseline).get(args.scale, {})
+    results = []
+    with tempfile.TemporaryDirectory(prefix="specimin-benchmark-") as work_dir:
+        for name, function, items, unit in get_benchmarks(inputs, work_dir):
+            if args.only and name not in args.only:
+                continue
+            results.append(run_benchmark(name, function, items, unit, args.repeat))
+            print(f"{name} done", file=sys.stderr)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, args.scale, results)
+        print(f"Baseline of {args.scale} saved in {args.baseline}")
+    if args.check:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for name, description in regressions:
+            print(f"REGRESSION {name}: {description}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from main import read_json_from_file, get_cache_dir, issue_folder_dir, specimin_output, specimin_jar_output
+import compile_server
+
+'''
+Runs javac on all of the minimized outputs under ISSUES/ and writes ISSUES/compile_status.json
+(jar mode: ISSUES/jar_compile_status.json), as check_compilation.sh did.
+
+It is desirable that all of the expected Specimin's minimized program gets compiled, because Specimin
+should produce independently-compilable programs. When invoked from Specimin CI, the status file is
+compared with the expected one.
+
+Programs are compiled in parallel (or one after the other in a single warm JVM with --server). Class
+files go to a temporary directory, source lists are passed in an argfile, and the compile time of each
+issue is written to ISSUES/compile_time.json (jar mode: ISSUES/jar_compile_time.json).
+
+usage: python check_compilation.py 1 --> for approximate mode
+or
+usage: python check_compilation.py 2 --> for exact/jar mode
+'''
+
+skipped_issues = ["jdk-8319461"]
+checker_qual_jar = os.path.join("src", "test", "resources", "shared", "checker-qual-3.42.0.jar")
+
+def _argfile_entry(path):
+    # javac argfiles split on whitespace; quoted entries keep it, with backslashes escaped
+    if any(c.isspace() or c in "\"'#" for c in path) or "\\" in path:
+        return '"' + path.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return path
+
+def find_sources(program_dir):
+    sources = []
+    for root, dirs, files in os.walk(program_dir):
+        dirs.sort()
+        sources.extend(os.path.relpath(os.path.join(root, name), program_dir) for name in sorted(files) if name.endswith(".java"))
+    return [os.path.join(".", source) for source in sources]
+
+def compile_program(issue_id, program_dir, classpath, use_server = False):
+    '''
+    Compile the minimized program of an issue with javac
+
+    Parameters:
+        issue_id (str): issue of the program
+        program_dir (str): output or jar_output directory of the issue
+        classpath (str): javac classpath
+        use_server (bool): compile in the warm javac JVM of this process, if it can be started
+
+    Returns:
+        (status, seconds, javac output): status is PASS or FAIL, seconds is None if javac was not run
+    '''
+    if not os.path.isdir(program_dir):
+        return "FAIL", None, ""
+    # if no directory exists inside the output, Specimin failed on the input target
+    if not any(entry.is_dir() for entry in os.scandir(program_dir)):
+        return "FAIL", None, f"No directories inside {program_dir}. Ignoring it.\n"
+
+    start_time = time.time()
+    with tempfile.TemporaryDirectory(prefix=f"{issue_id}-classes-") as classes_dir:
+        argfile = os.path.join(classes_dir, "sources.txt")
+        with open(argfile, 'w') as file:
+            file.write("\n".join(_argfile_entry(source) for source in find_sources(program_dir)) + "\n")
+        served = None
+        if use_server and shutil.which("javac"):
+            log_file = os.path.join(classes_dir, "javac.log")
+            sources = [os.path.join(os.path.abspath(program_dir), source) for source in find_sources(program_dir)]
+            served = compile_server.compile_with_server(get_cache_dir(), _system_jdk(), ["-classpath", classpath, "-d", classes_dir, *sources], log_file)
+        if served is not None:
+            returncode = served[0]
+            with open(log_file, 'r', errors='replace') as file:
+                output = file.read()
+        else:
+            run = subprocess.run(["javac", "-classpath", classpath, "-d", classes_dir, f"@{argfile}"], cwd=program_dir,
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            returncode = run.returncode
+            output = run.stdout.decode("utf-8", errors="replace")
+    return ("PASS" if returncode == 0 else "FAIL"), round(time.time() - start_time, 2), output
+
+def _system_jdk():
+    # JDK of the javac on the PATH: <jdk>/bin/javac
+    return os.path.dirname(os.path.dirname(os.path.realpath(shutil.which("javac"))))
+
+def write_status_file(status_path, compile_status):
+    # same layout as the json assembled by check_compilation.sh
+    lines = [f"  {json.dumps(issue_id)}: {json.dumps(status)}" for issue_id, status in compile_status.items()]
+    with open(status_path, 'w') as file:
+        file.write("{\n" + (",\n".join(lines) + "\n" if lines else "") + "}\n")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('mode', help='1 for approximate mode (output), 2 for exact/jar mode (jar_output)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of programs compiled in parallel')
+    parser.add_argument('--server', action='store_true', help='compile all programs in one warm javac JVM')
+    args = parser.parse_args()
+
+    if args.mode == "1":
+        min_program_dir = specimin_output
+        status_file = "compile_status.json"
+        time_file = "compile_time.json"
+    elif args.mode == "2":
+        min_program_dir = specimin_jar_output
+        status_file = "jar_compile_status.json"
+        time_file = "jar_compile_time.json"
+    else:
+        print("Invalid parameter")
+        sys.exit(1)
+
+    specimin_path = os.environ.get("SPECIMIN", "")
+    print(f"Specimin path: {specimin_path}")
+    classpath = os.path.join(specimin_path, checker_qual_jar)
+    issue_ids = [issue["issue_id"] for issue in read_json_from_file(os.path.join("resources", "test_data.json"))]
+    issue_ids = [issue_id for issue_id in issue_ids if issue_id not in skipped_issues]
+
+    with ThreadPoolExecutor(max_workers=1 if args.server else max(1, args.jobs)) as executor:
+        futures = [executor.submit(compile_program, issue_id, os.path.join(issue_folder_dir, issue_id, min_program_dir), classpath, args.server)
+                   for issue_id in issue_ids]
+
+        compile_status = {}
+        compile_time = {}
+        returnval = 0
+        for issue_id, future in zip(issue_ids, futures):
+            status, seconds, output = future.result()
+            print(f"Target = {issue_id}")
+            print(output, end="")
+            if status == "PASS":
+                print(f"Running javac on {issue_id}/{min_program_dir} PASSES ({seconds}s)")
+            elif seconds is not None:
+                print(f"Running javac on {issue_id}/{min_program_dir} FAILS. Please check logs above.")
+                returnval = 2
+            compile_status[issue_id] = status
+            compile_time[issue_id] = seconds
+
+    if returnval == 0:
+        print("All expected test outputs compiled successfully.")
+    else:
+        print("Some expected test outputs do not compile successfully. See the above error output for details.")
+
+    write_status_file(os.path.join(issue_folder_dir, status_file), compile_status)
+    with open(os.path.join(issue_folder_dir, time_file), 'w') as file:
+        json.dump(compile_time, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,203 @@
 import os
 from main import read_json_from_file
 from main import get_repository_name
+from main import get_cache_dir
+from concurrent.futures import ProcessPoolExecutor
 import json
-import subprocess
 
 '''
-This script depends on scc tool: https://github.com/boyter/scc
+Counts the Java lines of code of the hand-minimized programs and of the programs minimized by Specimin
+(output and jar_output). Lines are classified like scc (https://github.com/boyter/scc) does for Java:
+a line with any code is code, a line with only comments (or blank inside a block comment) is comment,
+other empty lines are blank. Counts are cached per file, keyed by (path, mtime, size).
 '''
 
+loc_cache_file_name = "loc_cache.json"
+
+# lexer states
+_code = 0
+_block_comment = 1
+_text_block = 2
+
+def count_java_lines(text):
+    '''
+    Count the code, comment and blank lines of a Java source
+
+    Returns:
+        (code, comment, blank)
+    '''
+    code_lines = comment_lines = blank_lines = 0
+    state = _code
+    for line in text.splitlines():
+        has_code = state == _text_block # lines of a text block are code, even empty ones
+        has_comment = state == _block_comment
+        i = 0
+        n = len(line)
+        while i < n:
+            c = line[i]
+            if state == _block_comment:
+                if line.startswith("*/", i):
+                    state = _code
+                    i += 2
+                else:
+                    i += 1
+                continue
+            if state == _text_block:
+                if c == '\\':
+                    i += 2
+                elif line.startswith('"""', i):
+                    state = _code
+                    i += 3
+                else:
+                    i += 1
+                continue
+            if c.isspace():
+                i += 1
+            elif line.startswith("//", i):
+                has_comment = True
+                break
+            elif line.startswith("/*", i):
+                has_comment = True
+                state = _block_comment
+                i += 2
+            elif line.startswith('"""', i):
+                has_code = True
+                state = _text_block
+                i += 3
+            elif c == '"' or c == "'":
+                # string or char literal: comment markers inside are not comments
+                has_code = True
+                i += 1
+                while i < n and line[i] != c:
+                    i += 2 if line[i] == '\\' else 1
+                i += 1
+            else:
+                has_code = True
+                i += 1
+        if has_code:
+            code_lines += 1
+        elif has_comment:
+            comment_lines += 1
+        else:
+            blank_lines += 1
+    return code_lines, comment_lines, blank_lines
+
+def count_java_file(path):
+    with open(path, 'r', errors='replace') as file:
+        return count_java_lines(file.read())
+
+def find_java_files(directory):
+    java_files = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        java_files.extend(os.path.join(root, name) for name in files if name.endswith(".java"))
+    return java_files
+
+def _load_cache(cache_file):
+    if not os.path.exists(cache_file):
+        return {}
+    try:
+        with open(cache_file, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def count_trees(trees, jobs = None):
+    '''
+    Count the Java lines of several directories at once. Files are counted in parallel; files whose
+    (mtime, size) did not change since the previous run are taken from the cache.
+
+    Parameters:
+        trees ({name: directory}): directories to count. Missing directories count as None
+        jobs (int): number of counting processes, defaults to the number of CPUs
+
+    Returns:
+        {name: (code, comment, blank) or None}
+    '''
+    cache_file = os.path.join(get_cache_dir(), loc_cache_file_name)
+    cache = _load_cache(cache_file)
+    tree_files = {name: find_java_files(directory) for name, directory in trees.items() if os.path.isdir(directory)}
+
+    file_stats = {}
+    to_count = []
+    for files in tree_files.values():
+        for path in files:
+            abs_path = os.path.abspath(path)
+            stat = os.stat(abs_path)
+            file_stats[abs_path] = (stat.st_mtime_ns, stat.st_size)
+            cached = cache.get(abs_path)
+            if not cached or tuple(cached[:2]) != file_stats[abs_path]:
+                to_count.append(abs_path)
+    to_count = sorted(set(to_count))
+    if to_count:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for path, counts in zip(to_count, executor.map(count_java_file, to_count, chunksize=64)):
+                cache[path] = [*file_stats[path], *counts]
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    with open(f"{cache_file}.tmp", 'w') as file:
+        json.dump({path: cache[path] for path in file_stats}, file)
+    os.replace(f"{cache_file}.tmp", cache_file)
+
+    totals = {}
+    for name in trees:
+        if name not in tree_files:
+            totals[name] = None
+            continue
+        counts = [0, 0, 0]
+        for path in tree_files[name]:
+            for index, value in enumerate(cache[os.path.abspath(path)][2:]):
+                counts[index] += value
+        totals[name] = tuple(counts)
+    return totals
+
+def _reduction(code_line, reference):
+    # size of the Specimin output relative to the hand-minimized program
+    if not code_line or not reference:
+        return "-"
+    return f"{code_line / reference:.2f}x"
+
 def main():
     json_file_path = os.path.join("resources", "test_data.json")
     parsed_data = read_json_from_file(json_file_path)
 
-    code_count = {}
-
+    trees = {}
     if parsed_data:
         for issue in parsed_data:
             issue_id = issue["issue_id"]
-            url = issue["url"]
-            repo_name = get_repository_name(url)
-
-            # get hand min program loc
-            hand_code_line = 0
-            specimin_code_line = 0
-            hand_min_program_path = os.path.join("ISSUES", issue_id, "input", repo_name, "specimin", "test")
-            if os.path.exists(hand_min_program_path):
-                output = subprocess.check_output(["scc", "-f", "json"], cwd=hand_min_program_path)
-                data = json.loads(output) # this is array of dictionary
-                for item in data:
-                     if item.get("Name") == "Java":   # checking only java line code
-                         hand_code_line += item.get("Code")
-            else:
-                print(f"Test code not available for {issue_id}")
-
-            # get specimin min program loc
-            specimin_min_program_path = os.path.join("ISSUES", issue_id, "output", repo_name, "src")
-            if os.path.exists(specimin_min_program_path):
-                output = subprocess.check_output(["scc", "-f", "json"], cwd=specimin_min_program_path)
-                data = json.loads(output) # this is array of dictionary
-                for item in data:
-                     if item.get("Name") == "Java":   # checking only java line code
-                         specimin_code_line += item.get("Code")
-            else:
-                print(f"Minimization was failed/ not executed {issue_id}")
-            
-            combined_code_info = {"test": hand_code_line, "specimin": specimin_code_line}
-            code_count[issue_id] = combined_code_info
+            repo_name = get_repository_name(issue["url"])
+            trees[(issue_id, "test")] = os.path.join("ISSUES", issue_id, "input", repo_name, "specimin", "test")
+            trees[(issue_id, "output")] = os.path.join("ISSUES", issue_id, "output", repo_name, "src")
+            trees[(issue_id, "jar_output")] = os.path.join("ISSUES", issue_id, "jar_output", repo_name, "src")
+    counts = count_trees(trees)
 
+    code_count = {}
+    for issue in (parsed_data or []):
+        issue_id = issue["issue_id"]
+        if counts[(issue_id, "test")] is None:
+            print(f"Test code not available for {issue_id}")
+        if counts[(issue_id, "output")] is None:
+            print(f"Minimization was failed/ not executed {issue_id}")
+        code_count[issue_id] = {
+            "test": (counts[(issue_id, "test")] or (0,))[0],
+            "specimin": (counts[(issue_id, "output")] or (0,))[0],
+            "jar_specimin": (counts[(issue_id, "jar_output")] or (0,))[0]
+        }
 
     pretty_json = json.dumps(code_count, indent=4)
     print(pretty_json)
 
-    total_specimin_line = 0
-    total_hand_written_line = 0
-    sp_divisor = 0
-    hand_divisor = 0
-    for key in code_count:
-        sl = code_count.get(key).get("specimin")
-        total_specimin_line += sl
-        sp_divisor = sp_divisor + 1 if sl != 0 else sp_divisor
-
-        hl = code_count.get(key).get("test")
-        total_hand_written_line += hl
-        hand_divisor = hand_divisor + 1 if hl != 0 else hand_divisor
+    for key, label in (("test", "hand"), ("specimin", "sp"), ("jar_specimin", "jar_sp")):
+        values = [code_count[issue_id][key] for issue_id in code_count if code_count[issue_id][key] != 0]
+        print(f"{label}_divisor = {len(values)}")
+        print(f"{label}_avg: {round(sum(values) / len(values)) if values else 0}")
 
-    print(f"sp_divisor = {sp_divisor}")
-    print(f"hand_divisor = {hand_divisor}")
-    sp_avg = round(total_specimin_line/sp_divisor)
-    hand_avg = round(total_hand_written_line/hand_divisor)
-    print(f"sp_avg: {sp_avg}")
-    print(f"hand_avg: {hand_avg}")
+    print()
+    print(f"{'issue':<16}{'test':>8}{'output':>10}{'reduction':>11}{'jar_output':>12}{'reduction':>11}")
+    for issue_id, lines in code_count.items():
+        print(f"{issue_id:<16}{lines['test']:>8}{lines['specimin']:>10}{_reduction(lines['specimin'], lines['test']):>11}"
+              f"{lines['jar_specimin']:>12}{_reduction(lines['jar_specimin'], lines['test']):>11}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
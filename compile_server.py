@@ -0,0 +1,179 @@
+import atexit
+import hashlib
+import os
+import platform
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+from file_lock import file_lock
+from specimin_worker import SpeciminWorker, WorkerTimeout
+from toolchain import get_jdk_executable, get_checker_jar
+
+server_source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "harness", "CompileServer.java")
+server_class_name = "CompileServer"
+server_cache_dir_name = "compile-server"
+fallback_status = 255 # the server cannot run the job, it must be run in a new JVM
+
+class CompileServer(SpeciminWorker):
+    '''
+    One long-lived JVM running CompileServer for a (JDK, Checker Framework, JVM options, environment)
+    combination. It speaks the protocol of SpeciminWorker; only the command starting the JVM differs.
+    '''
+    def __init__(self, command, env, log_file):
+        '''
+        Constructor of the class
+        Parameters:
+            command ([str]): java command starting the server
+            env ({}): environment of the server, e.g. _JAVA_OPTIONS from the issue's compiler_option
+            log_file (str): file receiving the server's own stderr
+        '''
+        super().__init__(None, None, log_file)
+        self._command = command
+        self._env = env
+
+    def _start(self):
+        with open(self._log_file, 'a') as log:
+            self._process = subprocess.Popen(self._command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=log, env=self._env)
+        self._buffer = b""
+
+def compile_server_classes(cache_dir, jdk_dir):
+    '''
+    Compile CompileServer.java with the javac of 'jdk_dir', once per source version and JDK.
+
+    Returns:
+        classes_dir (str): directory containing CompileServer.class
+    '''
+    with open(server_source, 'rb') as file:
+        source_hash = hashlib.sha1(file.read()).hexdigest()[:12]
+    classes_dir = os.path.join(cache_dir, server_cache_dir_name, f"{source_hash}-{os.path.basename(jdk_dir)}")
+    with file_lock(f"{classes_dir}.lock"):
+        if os.path.exists(os.path.join(classes_dir, f"{server_class_name}.class")):
+            return classes_dir
+        tmp_dir = f"{classes_dir}.tmp"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        subprocess.run([get_jdk_executable(jdk_dir, "javac"), "-d", tmp_dir, server_source], check=True)
+        os.rename(tmp_dir, classes_dir)
+    return classes_dir
+
+def parse_shell_exports(compiler_option):
+    '''
+    Environment set by the compiler_option of a javac issue (lines like export _JAVA_OPTIONS="...").
+
+    Returns:
+        {name: value}, None if the option does anything else, in which case build.sh must be used
+    '''
+    env = {}
+    for line in (compiler_option or "").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = re.match(r"export\s+(\w+)=(.*)$", line)
+        if not match:
+            return None
+        try:
+            value = shlex.split(match.group(2))
+        except ValueError:
+            return None
+        if len(value) > 1:
+            return None
+        env[match.group(1)] = value[0] if value else ""
+    return env
+
+def _server_command(cache_dir, jdk_dir, cf_dir):
+    classes_dir = compile_server_classes(cache_dir, jdk_dir)
+    java_path = get_jdk_executable(jdk_dir, "java")
+    if cf_dir is None:
+        return [java_path, "-cp", classes_dir, server_class_name, "javac"]
+
+    checker_jar = get_checker_jar(cf_dir)
+    classpath = [checker_jar, classes_dir]
+    tools_jar = os.path.join(jdk_dir, "Contents", "Home", "lib", "tools.jar") if platform.system() == "Darwin" else os.path.join(jdk_dir, "lib", "tools.jar")
+    if os.path.exists(tools_jar): # JDK 8: javac is not part of the runtime
+        classpath.append(tools_jar)
+    probe = subprocess.run([java_path, "-cp", os.pathsep.join(classpath), server_class_name, "probe", checker_jar],
+                           stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    command = probe.stdout.decode("utf-8").splitlines()
+    main_index = next(index for index, argument in enumerate(command) if argument in ("com.sun.tools.javac.Main", "-jar"))
+    if command[main_index] == "-jar": # javac.jar of the Checker Framework must shadow the JDK's javac
+        classpath.insert(0, command[main_index + 1])
+    return [java_path, *command[:main_index], "-cp", os.pathsep.join(classpath), server_class_name, "checker", checker_jar]
+
+_servers = {}
+_unavailable = set()
+_servers_lock = threading.Lock()
+
+def get_compile_server(cache_dir, jdk_dir, cf_dir = None, env = None):
+    '''
+    Compile server of the current process for a JDK, an optional Checker Framework and an environment.
+    Servers are started lazily and closed when the process exits.
+
+    Returns:
+        CompileServer, None if no server can be started for this combination
+    '''
+    env_items = tuple(sorted((env or {}).items()))
+    key = (jdk_dir, cf_dir, env_items)
+    with _servers_lock:
+        if key in _servers:
+            return _servers[key]
+        if key in _unavailable:
+            return None
+        try:
+            command = _server_command(cache_dir, jdk_dir, cf_dir)
+        except (OSError, subprocess.CalledProcessError, StopIteration) as e:
+            print(f"Compile server unavailable for {os.path.basename(jdk_dir)} {os.path.basename(cf_dir or '')}: {e}")
+            _unavailable.add(key)
+            return None
+        log_file = os.path.join(cache_dir, server_cache_dir_name, f"server-{os.getpid()}-{len(_servers)}.log")
+        server = CompileServer(command, dict(os.environ, **dict(env_items)), log_file)
+        _servers[key] = server
+        return server
+
+def _discard_server(server, unavailable = True):
+    with _servers_lock:
+        key = next((key for key, value in _servers.items() if value is server), None)
+        if key is None:
+            return
+        if unavailable:
+            _unavailable.add(key)
+        del _servers[key]
+
+def compile_with_server(cache_dir, jdk_dir, args, log_file, cf_dir = None, env = None, timeout = None):
+    '''
+    Compile in a warm server: javac arguments, or `java -jar checker.jar` arguments if 'cf_dir' is given.
+    Diagnostics are written to 'log_file' as a cold run would write them.
+
+    Parameters:
+        timeout (int): seconds after which the server is killed and WorkerTimeout is raised. The
+                       compilation is not retried in a new JVM, where it would hang as well
+
+    Returns:
+        (returncode, ResourceUsage or None), or None if the job must be run in a new JVM instead
+    '''
+    server = get_compile_server(cache_dir, jdk_dir, cf_dir, env)
+    if server is None:
+        return None
+    try:
+        returncode = server.run(args, os.path.abspath(log_file), timeout)
+    except WorkerTimeout:
+        print(f"Compile server timed out after {timeout}s")
+        _discard_server(server, unavailable=False) # killed by run; the next job starts a new server
+        raise
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"Compile server failed: {e}. Compiling in a new JVM")
+        return None
+    if not server.is_alive(): # the JVM died: its exit status says nothing about the program
+        print("Compile server exited. Compiling in a new JVM")
+        _discard_server(server)
+        return None
+    if returncode == fallback_status:
+        return None
+    return returncode, server.last_usage
+
+@atexit.register
+def _close_servers():
+    for server in _servers.values():
+        server.close()
@@ -0,0 +1,115 @@
+import os
+import re
+from collections import deque
+from exception_data import ExceptionData
+
+crash_marker = '; The Checker Framework crashed.'
+compilation_unit_marker = 'Compilation unit:'
+exception_marker = 'Exception:'
+marker_window = 5 # lines, starting at a marker, in which the next marker is expected
+stack_window = 5 # lines after the exception line holding the stack frames
+
+# parser states
+_unit = 1 # crash seen, looking for the compilation unit
+_exception = 2 # compilation unit seen, looking for the exception
+_stack = 3 # exception seen, collecting "at ..." frames
+_done = 4 # crash parsed, or one of its markers is missing
+
+class _Crash:
+    '''
+    Parser state of one crash. Every crash has its own windows, so a crash starting inside the windows
+    of the previous one does not cut them short.
+    '''
+    def __init__(self):
+        self.state = _unit
+        self.remaining = marker_window
+        self.class_name = ""
+        self.cause = ""
+        self.stack = []
+        self.data = None
+
+    def advance(self, line, stripped, require_stack):
+        if self.state == _stack:
+            if stripped.startswith("at"):
+                self.stack.append(line.split()[-1].strip())
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.finish()
+            return
+        if self.state == _unit:
+            if not stripped.startswith(compilation_unit_marker):
+                self._count_down()
+                return
+            self.class_name = os.path.basename(line.rstrip("\n").split(" ")[-1])
+            self.state, self.remaining = _exception, marker_window # the compilation unit line opens the exception window
+        if self.state == _exception:
+            if not stripped.startswith(exception_marker):
+                self._count_down()
+                return
+            self.cause = _exception_cause(stripped)
+            if not self.class_name or not self.cause:
+                self.state = _done
+            elif not require_stack: # if stack is not required, not adding them in exception data.
+                self.data = ExceptionData(self.class_name, self.cause)
+                self.state = _done
+            else:
+                self.state, self.remaining = _stack, stack_window
+
+    def finish(self):
+        if self.state == _stack and self.stack:
+            self.data = ExceptionData(self.class_name, self.cause, self.stack)
+        self.state = _done
+
+    def _count_down(self):
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.state = _done
+
+def _exception_cause(line):
+    # Exception: java.lang.NullPointerException; java.lang.NullPointerException -> java.lang.NullPointerException
+    tokens = line[line.index(exception_marker) + len(exception_marker):].split()
+    if not tokens:
+        return ""
+    return re.sub(r'^[^a-zA-Z]+|[^a-zA-Z]+$', '', tokens[0])
+
+def parse_crash_log(log_file: str, require_stack = False):
+    '''
+    Parse the Checker Framework crashes of a log in one pass with constant memory. Each crash is
+
+        ; The Checker Framework crashed. ...
+        Compilation unit: /path/Foo.java        (within 5 lines from the crash line)
+        Exception: java.lang.NullPointerException; ...   (within 5 lines from the compilation unit)
+          at frame1                             (the 5 lines after the exception line)
+
+    Every crash is parsed in its own windows, as if it were alone in the log: a crash marker inside the
+    stack window of the previous crash does not end that stack, and the frames after it may belong to
+    both crashes.
+
+    Parameters:
+        log_file (str): log to parse
+        require_stack (bool): only yield crashes with a stack trace, and include it
+
+    Yields:
+        ExceptionData: one record per complete crash, in the order of the crash lines
+    '''
+    crashes = deque() # crashes not yielded yet, in log order; at most a few windows long
+    found_crash = False
+    with open(log_file, "r", errors="replace") as file:
+        for line in file:
+            stripped = line.strip()
+            if stripped.startswith(crash_marker):
+                found_crash = True
+                crashes.append(_Crash())
+            for crash in crashes:
+                if crash.state != _done:
+                    crash.advance(line, stripped, require_stack)
+            while crashes and crashes[0].state == _done:
+                crash = crashes.popleft()
+                if crash.data:
+                    yield crash.data
+    for crash in crashes: # log ended inside the windows
+        crash.finish()
+        if crash.data:
+            yield crash.data
+    if not found_crash:
+        print(f"No crash data in {log_file}")
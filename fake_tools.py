@@ -0,0 +1,280 @@
+import glob
+import json
+import os
+import re
+import shlex
+import shutil
+import signal
+import sys
+import time
+
+'''
+Stand-ins for the external tools driven by the harness, used by load_test.py to run main.py without
+network, Gradle, a JDK or Specimin. Each tool is a small wrapper script running
+
+    python fake_tools.py gradlew|java|javac <arguments>
+
+and behaves like the real tool as far as the harness can tell:
+- gradlew: installDist (a prebuilt Specimin distribution with a Gradle start script), run --args='...' (Specimin), pullJar
+  (a jar in the libs directory) and compileJava (the preservation check of gradle issues)
+- java: Specimin (the main class in the dist.json of the distribution on the -cp), `-jar checker.jar`
+  (the Checker Framework), and the SpeciminWorker / CompileServer protocols of --batch and --compile-server.
+  A main class the distribution does not ship fails like the JVM does.
+- javac: compilation of the harness classes (-d) and the preservation check of javac issues
+
+Specimin "minimizes" an issue by copying its target files to the output directory. A compiler reproduces
+an issue by printing the issue's expected_log.txt (an error or a crash) among other diagnostics.
+
+Behaviour is read from the json file in $FAKE_TOOLS_CONFIG:
+
+    {"defaults": {...}, "issues": {"cf-1": {...}}}
+
+with the keys of default_behaviour. Issues are recognized by the ISSUES/<issue_id>/ directory in the
+arguments. If $FAKE_TOOLS_LOG is set, every invocation appends one json line (tool, kind, issue, start,
+end, pid) to it.
+'''
+
+config_env_var = "FAKE_TOOLS_CONFIG"
+log_env_var = "FAKE_TOOLS_LOG"
+dist_main_class = "org.checkerframework.specimin.FakeSpeciminMain" # written to the start script by installDist
+dist_manifest_name = "dist.json"
+worker_class_name = "SpeciminWorker"
+server_class_name = "CompileServer"
+
+default_behaviour = {
+    "latency": 0.1,           # seconds a Specimin run takes
+    "output_bytes": 2048,     # bytes Specimin writes to stdout
+    "failure": "none",        # none | fail (exception, exit 1) | crash (SIGKILL) | hang | no_output (exit 0, nothing minimized)
+    "hang_seconds": 3600,     # how long a hanging Specimin sleeps before exiting
+    "compile_latency": 0.02,  # seconds a compilation of the minimized program takes
+    "compile_output_bytes": 4096, # bytes of unrelated diagnostics around the expected log
+    "preserve": True          # the compiler reproduces the expected log of the issue
+}
+
+issue_path_pattern = re.compile(r"[/\\]ISSUES[/\\]([^/\\]+)[/\\]")
+
+def _load_config():
+    path = os.environ.get(config_env_var)
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def get_behaviour(issue_id):
+    '''
+    Behaviour of the tools for an issue: default_behaviour, overridden by the defaults and the issue
+    entry of the configuration
+    '''
+    config = _load_config()
+    return dict(default_behaviour, **config.get("defaults", {}), **config.get("issues", {}).get(issue_id or "", {}))
+
+def find_issue(arguments):
+    '''
+    (issue id, ISSUES/<issue_id> directory) of the first argument inside an issue directory, (None, None) otherwise
+    '''
+    for argument in arguments:
+        match = issue_path_pattern.search(argument)
+        if match:
+            return match.group(1), argument[:match.end() - 1]
+    return None, None
+
+def record(tool, kind, issue_id, start):
+    log_path = os.environ.get(log_env_var)
+    if not log_path:
+        return
+    line = json.dumps({"tool": tool, "kind": kind, "issue": issue_id, "start": start, "end": time.time(), "pid": os.getpid()})
+    with open(log_path, 'a') as file: # one short append per call, so concurrent tools do not interleave
+        file.write(line + "\n")
+
+def _filler(size, prefix):
+    # 'size' bytes of log lines
+    lines = []
+    written = 0
+    index = 0
+    while written < size:
+        line = f"{prefix} {index}: {'.' * 60}\n"
+        lines.append(line)
+        written += len(line)
+        index += 1
+    return "".join(lines)
+
+def _option_values(arguments, option):
+    return [arguments[index + 1] for index, argument in enumerate(arguments[:-1]) if argument == option]
+
+def run_specimin(arguments, out, err):
+    '''
+    Fake Specimin run: copy the target files from --root to --outputDirectory
+
+    Returns:
+        int: exit status
+    '''
+    issue_id, _ = find_issue(arguments)
+    behaviour = get_behaviour(issue_id)
+    start = time.time()
+    time.sleep(behaviour["latency"])
+    out.write(_filler(behaviour["output_bytes"], "Specimin progress"))
+    out.flush()
+    failure = behaviour["failure"]
+    if failure == "crash":
+        record("specimin", "crash", issue_id, start)
+        os.kill(os.getpid(), signal.SIGKILL)
+    if failure == "hang":
+        time.sleep(behaviour["hang_seconds"])
+    if failure == "fail":
+        err.write('Exception in thread "main" java.lang.RuntimeException: fake Specimin failure\n'
+                  f"\tat {dist_main_class}.performMinimization(FakeSpeciminMain.java:42)\n"
+                  f"\tat {dist_main_class}.main(FakeSpeciminMain.java:7)\n")
+        record("specimin", "fail", issue_id, start)
+        return 1
+    if failure != "no_output":
+        root = _option_values(arguments, "--root")[0]
+        output_dir = _option_values(arguments, "--outputDirectory")[0]
+        for target_file in _option_values(arguments, "--targetFile"):
+            source = os.path.join(root, target_file)
+            if os.path.exists(source):
+                os.makedirs(os.path.dirname(os.path.join(output_dir, target_file)), exist_ok=True)
+                shutil.copyfile(source, os.path.join(output_dir, target_file))
+    record("specimin", "run", issue_id, start)
+    return 0
+
+def compile_program(tool, arguments, err):
+    '''
+    Fake compilation of a minimized program (gradle compileJava, javac or checker.jar): without Java
+    files it succeeds, otherwise it reports the issue's expected log among other diagnostics and fails.
+
+    Returns:
+        int: exit status
+    '''
+    issue_id, issue_dir = find_issue(arguments)
+    behaviour = get_behaviour(issue_id)
+    start = time.time()
+    time.sleep(behaviour["compile_latency"])
+    sources = [argument for argument in arguments if argument.endswith(".java")]
+    for argument in arguments: # gradle: the project directory or build file
+        if not argument.endswith(".java") and issue_path_pattern.search(argument):
+            project_dir = argument if os.path.isdir(argument) else os.path.dirname(argument)
+            sources.extend(glob.glob(os.path.join(project_dir, "src", "**", "*.java"), recursive=True))
+    if not sources:
+        record(tool, "compile", issue_id, start)
+        return 0
+    half = behaviour["compile_output_bytes"] // 2
+    err.write(_filler(half, "warning: [options] unrelated diagnostic"))
+    expected_logs = glob.glob(os.path.join(issue_dir, "input", "*", "specimin", "expected_log.txt")) if issue_dir else []
+    if behaviour["preserve"] and expected_logs:
+        with open(expected_logs[0], 'r') as file:
+            err.write(file.read())
+    else:
+        err.write("Unrelated.java:1: error: [unrelated.error] not the expected diagnostic\n")
+    err.write(_filler(half, "warning: [options] unrelated diagnostic"))
+    err.write("1 error\n")
+    record(tool, "compile", issue_id, start)
+    return 1
+
+def gradlew(arguments):
+    tasks = [argument for argument in arguments if not argument.startswith("-")
+             and not os.path.isabs(argument) and argument not in _option_values(arguments, "-b") + _option_values(arguments, "-p")]
+    if "installDist" in tasks:
+        start = time.time()
+        install_dir = os.path.join(os.getcwd(), "build", "install", "specimin")
+        os.makedirs(os.path.join(install_dir, "lib"), exist_ok=True)
+        os.makedirs(os.path.join(install_dir, "bin"), exist_ok=True)
+        for jar in ("specimin-fake.jar", "javaparser-fake.jar"):
+            with open(os.path.join(install_dir, "lib", jar), 'w') as file:
+                file.write("fake Specimin distribution\n")
+        with open(os.path.join(install_dir, "bin", "specimin"), 'w') as file: # the parts of a Gradle start script the harness reads
+            file.write("#!/bin/sh\n"
+                       "DEFAULT_JVM_OPTS='\"-Xmx1g\"'\n"
+                       "CLASSPATH=$APP_HOME/lib/specimin-fake.jar:$APP_HOME/lib/javaparser-fake.jar\n"
+                       "set -- \\\n"
+                       "        \"-Dorg.gradle.appname=$APP_BASE_NAME\" \\\n"
+                       "        -classpath \"$CLASSPATH\" \\\n"
+                       f"        {dist_main_class} \\\n"
+                       "        \"$@\"\n")
+        record("gradlew", "installDist", None, start)
+        return 0
+    if "run" in tasks:
+        specimin_args = next(argument[len("--args="):] for argument in arguments if argument.startswith("--args="))
+        return run_specimin(shlex.split(specimin_args), sys.stdout, sys.stderr)
+    if "pullJar" in tasks:
+        start = time.time()
+        script = _option_values(arguments, "-b")[0]
+        issue_id, _ = find_issue([script])
+        libs_dir = os.path.join(os.path.dirname(script), "libs")
+        os.makedirs(libs_dir, exist_ok=True)
+        with open(os.path.join(libs_dir, "dependency-fake.jar"), 'w') as file:
+            file.write("fake dependency\n")
+        record("gradlew", "pullJar", issue_id, start)
+        return 0
+    if "compileJava" in tasks:
+        status = compile_program("gradlew", arguments, sys.stderr)
+        sys.stderr.write("BUILD FAILED\n" if status else "BUILD SUCCESSFUL\n")
+        return status
+    sys.stderr.write(f"fake gradlew: unsupported tasks {tasks}\n")
+    return 1
+
+def serve(job, out):
+    '''
+    The SpeciminWorker / CompileServer protocol: one "job id<TAB>log file<TAB>arguments..." line per job on
+    stdin, answered by "job id<TAB>status" once the job's output is in the log file
+    '''
+    protocol_out = sys.stdout
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        fields = line.rstrip("\n").split("\t")
+        with open(fields[1], 'w') as log:
+            status = job(fields[2:], log)
+        protocol_out.write(f"{fields[0]}\t{status}\n")
+        protocol_out.flush()
+    return 0
+
+def find_main_class(arguments):
+    '''
+    Main class of the Specimin distribution on the -cp of a java command, read from its dist.json
+    '''
+    for classpath in _option_values(arguments, "-cp"):
+        for entry in classpath.split(os.pathsep):
+            manifest = os.path.join(os.path.dirname(os.path.dirname(entry)), dist_manifest_name) # <dist>/lib/x.jar
+            if os.path.exists(manifest):
+                with open(manifest, 'r') as file:
+                    return json.load(file).get("main_class")
+    return None
+
+def java(arguments):
+    if "-jar" in arguments:
+        return compile_program("checker", arguments[arguments.index("-jar") + 2:], sys.stderr)
+    main_class = find_main_class(arguments)
+    if main_class and main_class != dist_main_class:
+        sys.stderr.write(f"Error: Could not find or load main class {main_class}\n")
+        return 1
+    if main_class in arguments and worker_class_name not in arguments:
+        return run_specimin(arguments[arguments.index(main_class) + 1:], sys.stdout, sys.stderr)
+    if worker_class_name in arguments:
+        return serve(lambda job_args, log: run_specimin(job_args, log, log), sys.stdout)
+    if server_class_name in arguments:
+        mode = arguments[arguments.index(server_class_name) + 1]
+        if mode == "probe":
+            print("com.sun.tools.javac.Main")
+            return 0
+        return serve(lambda job_args, log: compile_program("checker" if mode == "checker" else "javac", job_args, log), sys.stdout)
+    sys.stderr.write(f"fake java: unsupported command {arguments}\n")
+    return 1
+
+def javac(arguments):
+    if "-d" in arguments: # harness classes (SpeciminWorker, CompileServer)
+        start = time.time()
+        classes_dir = _option_values(arguments, "-d")[0]
+        for source in arguments:
+            if source.endswith(".java"):
+                class_name = os.path.splitext(os.path.basename(source))[0]
+                open(os.path.join(classes_dir, f"{class_name}.class"), 'w').close()
+        record("javac", "harness", None, start)
+        return 0
+    return compile_program("javac", arguments, sys.stderr)
+
+tools = {"gradlew": gradlew, "java": java, "javac": javac}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in tools:
+        sys.exit(f"usage: fake_tools.py {'|'.join(tools)} <arguments>")
+    sys.exit(tools[sys.argv[1]](sys.argv[2:]))
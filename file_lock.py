@@ -0,0 +1,22 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+@contextmanager
+def file_lock(lock_path):
+    '''
+    Hold an exclusive advisory lock on 'lock_path' for the duration of the with-block.
+    Used to serialize work on shared on-disk state (downloads, caches, mirrors) when
+    several issues are evaluated concurrently by different processes.
+
+    Parameters:
+        lock_path (str): Path of the lock file. It is created if it does not exist.
+    '''
+    lock_dir = os.path.dirname(os.path.abspath(lock_path))
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
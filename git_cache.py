@@ -0,0 +1,92 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import time
+from file_lock import file_lock
+
+mirror_cache_dir_name = 'git-mirrors'
+mirror_refresh_interval = 600 # seconds. A mirror fetched more recently than this is not fetched again
+fetch_stamp_file_name = 'FETCH_STAMP'
+
+def get_mirror_path(url, cache_dir):
+    '''
+    Location of the bare mirror of 'url'. The name keeps the repository name for readability and adds
+    a hash of the url so that forks with the same repository name do not collide.
+    '''
+    repo_name = os.path.splitext(os.path.basename(url.rstrip('/')))[0]
+    url_hash = hashlib.sha1(url.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(cache_dir, mirror_cache_dir_name, f"{repo_name}-{url_hash}.git")
+
+def _is_fresh(mirror_path):
+    stamp = os.path.join(mirror_path, fetch_stamp_file_name)
+    return os.path.exists(stamp) and time.time() - os.path.getmtime(stamp) < mirror_refresh_interval
+
+def _touch_stamp(mirror_path):
+    with open(os.path.join(mirror_path, fetch_stamp_file_name), 'w') as file:
+        file.write(str(time.time()))
+
+def update_mirror(url, cache_dir):
+    '''
+    Create the bare mirror of 'url', or refresh it incrementally with `git fetch`.
+
+    cache_dir
+    |--- git-mirrors
+    |    |--- daikon-<hash>.git   ---> bare mirror shared by every issue using the same url
+
+    Parameters:
+        url (str): repository url
+        cache_dir (str): root directory of the harness caches
+
+    Returns:
+        mirror_path (str): path of the mirror, None if it could not be created
+    '''
+    mirror_path = get_mirror_path(url, cache_dir)
+    with file_lock(f"{mirror_path}.lock"):
+        if os.path.isdir(mirror_path):
+            if _is_fresh(mirror_path):
+                return mirror_path
+            status = subprocess.run(["git", "fetch", "--prune", "origin"], cwd=mirror_path)
+            if status.returncode != 0:
+                print(f"Failed to refresh mirror of {url}. Using the existing mirror")
+            else:
+                _touch_stamp(mirror_path)
+            return mirror_path
+
+        tmp_path = f"{mirror_path}.tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        status = subprocess.run(["git", "clone", "--mirror", url, tmp_path])
+        if status.returncode != 0:
+            print(f"Failed to mirror {url}")
+            return None
+        # issue clones borrow objects from the mirror (--shared); never let gc drop them
+        subprocess.run(["git", "config", "gc.auto", "0"], cwd=tmp_path)
+        subprocess.run(["git", "config", "gc.pruneExpire", "never"], cwd=tmp_path)
+        os.rename(tmp_path, mirror_path)
+        _touch_stamp(mirror_path)
+    return mirror_path
+
+def clone_from_mirror(url, mirror_path, branch, project_dir):
+    '''
+    Clone 'url' into 'project_dir' using the mirror as object store. The clone stores no objects of its
+    own (`git clone --shared`), and its origin points back to 'url'.
+
+    Parameters:
+        url (str): repository url
+        mirror_path (str): mirror returned by update_mirror
+        branch (str): branch to check out, default branch if empty
+        project_dir (str): directory of the clone, e.g. ISSUES/cf-1291/input/daikon
+
+    Returns:
+        bool: True if the clone succeeded
+    '''
+    clone_command = ["git", "clone", "--shared"]
+    if branch:
+        clone_command.extend(["-b", branch])
+    clone_command.extend([mirror_path, project_dir])
+    status = subprocess.run(clone_command)
+    if status.returncode != 0:
+        return False
+    subprocess.run(["git", "remote", "set-url", "origin", url], cwd=project_dir)
+    return True
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import re
+import shlex
+import shutil
+from file_lock import file_lock
+from output_sink import OutputSink, run_streaming
+
+'''
+Gradle environment shared by the builds of all issues: one Gradle user home (dependency cache, build
+cache, configuration cache and daemon registry) and a file based Maven mirror of every dependency
+resolved so far. A build script that resolved its dependencies once is "primed": its later builds run
+with --offline against the mirror and the dependency cache, without the network.
+'''
+
+gradle_home_dir_name = "gradle-home"
+maven_mirror_dir_name = "maven-mirror"
+primed_dir_name = "primed"
+init_script_name = "specimin-eval-mirror.gradle"
+
+gradle_properties = """org.gradle.daemon=true
+org.gradle.caching=true
+org.gradle.configuration-cache.problems=warn
+"""
+
+# the mirror is declared before the repositories of the build scripts, so it is tried first
+init_script_template = """allprojects {{
+    repositories {{
+        maven {{
+            name = 'speciminEvalMirror'
+            url = uri('{mirror_url}')
+        }}
+    }}
+}}
+"""
+
+# messages of Gradle when a dependency cannot be resolved, e.g. offline with an incomplete cache
+resolution_error = re.compile(r"Could not resolve|Could not find [\w.\-]+:|No cached version|Could not (?:GET|HEAD|download)")
+
+def get_gradle_home(cache_dir):
+    return os.path.join(cache_dir, gradle_home_dir_name)
+
+def get_maven_mirror(cache_dir):
+    return os.path.join(cache_dir, maven_mirror_dir_name)
+
+def _write_if_changed(path, content):
+    if os.path.exists(path):
+        with open(path, 'r') as file:
+            if file.read() == content:
+                return
+    with open(f"{path}.tmp", 'w') as file:
+        file.write(content)
+    os.replace(f"{path}.tmp", path)
+
+def prepare_gradle_home(cache_dir):
+    '''
+    Create the shared Gradle user home with its gradle.properties and the init script declaring the
+    Maven mirror. Safe to call from every process.
+
+    Returns:
+        gradle_home (str): value of GRADLE_USER_HOME for the builds
+    '''
+    gradle_home = get_gradle_home(cache_dir)
+    mirror_dir = get_maven_mirror(cache_dir)
+    with file_lock(f"{gradle_home}.lock"):
+        os.makedirs(os.path.join(gradle_home, "init.d"), exist_ok=True)
+        os.makedirs(mirror_dir, exist_ok=True)
+        _write_if_changed(os.path.join(gradle_home, "gradle.properties"), gradle_properties)
+        init_script = init_script_template.format(mirror_url="file://" + os.path.abspath(mirror_dir))
+        _write_if_changed(os.path.join(gradle_home, "init.d", init_script_name), init_script)
+    return gradle_home
+
+def gradle_env(cache_dir):
+    return dict(os.environ, GRADLE_USER_HOME=prepare_gradle_home(cache_dir))
+
+def sync_maven_mirror(cache_dir):
+    '''
+    Copy the artifacts of the Gradle dependency cache (caches/modules-2/files-2.1/<group>/<module>/<version>/<sha1>/<file>)
+    into the Maven layout of the mirror (<group as path>/<module>/<version>/<file>). Existing files are kept.
+
+    Returns:
+        int: number of files added to the mirror
+    '''
+    files_dir = os.path.join(get_gradle_home(cache_dir), "caches", "modules-2", "files-2.1")
+    mirror_dir = get_maven_mirror(cache_dir)
+    if not os.path.isdir(files_dir):
+        return 0
+    added = 0
+    with file_lock(f"{mirror_dir}.lock"):
+        for root, dirs, files in os.walk(files_dir):
+            relative = os.path.relpath(root, files_dir).split(os.sep)
+            if len(relative) != 4:
+                continue
+            group, module, version, _ = relative
+            target_dir = os.path.join(mirror_dir, *group.split("."), module, version)
+            for name in files:
+                target = os.path.join(target_dir, name)
+                if os.path.exists(target):
+                    continue
+                os.makedirs(target_dir, exist_ok=True)
+                shutil.copyfile(os.path.join(root, name), f"{target}.tmp")
+                os.replace(f"{target}.tmp", target)
+                added += 1
+    return added
+
+def build_key(script_paths):
+    '''
+    Key of a build: hash of its build scripts (build.gradle, settings.gradle, dependency.gradle)
+    '''
+    digest = hashlib.sha1()
+    for path in script_paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                digest.update(file.read())
+    return digest.hexdigest()
+
+def _primed_marker(cache_dir, key):
+    return os.path.join(get_gradle_home(cache_dir), primed_dir_name, key)
+
+def is_primed(cache_dir, key):
+    return os.path.exists(_primed_marker(cache_dir, key))
+
+def mark_primed(cache_dir, key):
+    '''
+    Record that the dependencies of the build 'key' are in the cache, after copying them to the mirror
+    '''
+    sync_maven_mirror(cache_dir)
+    marker = _primed_marker(cache_dir, key)
+    os.makedirs(os.path.dirname(marker), exist_ok=True)
+    open(marker, 'a').close()
+
+def gradle_command(task, project_dir = None, build_file = None, offline = False):
+    '''
+    ./gradlew command of a task using the shared build cache and a warm daemon. A build selected
+    with 'project_dir' (-p) also uses the configuration cache, which does not support -b.
+
+    Returns:
+        str: shell command to run from the Specimin directory
+    '''
+    command = ["./gradlew", "--daemon", "--build-cache"]
+    if project_dir:
+        command.extend(["--configuration-cache", "-p", project_dir])
+    else:
+        command.extend(["-b", build_file])
+    if offline:
+        command.append("--offline")
+    command.append(task)
+    return " ".join(shlex.quote(argument) for argument in command)
+
+def _log_has_resolution_error(log_file):
+    if not log_file or not os.path.exists(log_file):
+        return False
+    with open(log_file, 'r', errors='replace') as file:
+        return any(resolution_error.search(line) for line in file)
+
+def run_gradle(cache_dir, task, key, cwd, project_dir = None, build_file = None, stderr_sink = None):
+    '''
+    Run a Gradle task in the shared environment: offline if the build 'key' is primed, online otherwise.
+    An offline build that misses a dependency is run again online. An online build that resolved all
+    its dependencies primes 'key'.
+
+    Parameters:
+        cache_dir (str): harness cache holding the Gradle user home and the mirror
+        task (str): Gradle task, e.g. compileJava
+        key (str): build_key of the build scripts
+        cwd (str): Specimin directory, where gradlew is
+        project_dir (str): project directory of the build (-p), or
+        build_file (str): build script of the build (-b)
+        stderr_sink (OutputSink): receives stderr. Its log file is searched for resolution errors
+
+    Returns:
+        StreamedRun: the last Gradle run
+    '''
+    env = gradle_env(cache_dir)
+    log_file = stderr_sink.log_path if stderr_sink else None
+    if is_primed(cache_dir, key):
+        status = run_streaming(gradle_command(task, project_dir, build_file, offline=True), stderr_sink=stderr_sink, cwd=cwd, shell=True, env=env)
+        if status.returncode == 0 or (log_file and not _log_has_resolution_error(log_file)):
+            return status
+        print(f"Offline Gradle build of {project_dir or build_file} failed, retrying online")
+        if stderr_sink: # the sink was closed by the offline run
+            stderr_sink = OutputSink(log_file)
+    status = run_streaming(gradle_command(task, project_dir, build_file), stderr_sink=stderr_sink, cwd=cwd, shell=True, env=env)
+    if status.returncode == 0 or (log_file and not _log_has_resolution_error(log_file)):
+        mark_primed(cache_dir, key)
+    return status
@@ -0,0 +1,374 @@
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+import zipfile
+import toolchain
+from Keyvalue import JsonKeys
+from main import read_json_from_file, get_status_file_paths
+
+'''
+End-to-end load test of main.py on a machine without network. A sandbox is generated with
+- local bare git repositories holding one branch per synthetic issue (sources, build scripts, expected log)
+- a Specimin git repository whose gradlew is a stand-in (fake_tools.py)
+- a fake JDK (java, javac) used to run Specimin, and a toolchain mirror with fake JDK and Checker
+  Framework archives for the preservation checks of javac and checker.jar issues
+- resources/test_data.json with the synthetic issues, and the behaviour of the fake tools per issue
+Then main.py is run in the sandbox, possibly several times (--runs) to see the caches at work, and the
+time spent in the fake tools is compared with the wall time of the run.
+
+sandbox
+|--- fixtures
+|    |--- repos/projectN.git         ---> bare repositories
+|    |--- specimin                   ---> $SPECIMIN
+|    |--- jdk                        ---> $JAVA_HOME of Specimin
+|    |--- toolchain-mirror           ---> --toolchain-mirror
+|--- run
+|    |--- resources/test_data.json
+|    |--- ISSUES                     ---> output of main.py, ISSUES/.cache holds the harness caches
+|--- fake_tools.json, fake_tools.log
+
+usage:
+    python load_test.py --sandbox /tmp/load [--issues 200] [--repos 20] [--jobs 8] [--runs 2] [-- main.py options]
+'''
+
+fake_tools_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_tools.py")
+main_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+fixture_time = 1700000000 # commit time of the fixtures, so that they are reproducible
+fake_release_url = "https://example.invalid/checker-framework/releases"
+java_versions = ["8", "11", "17"]
+javac_version = "17.0.9"
+cf_versions = ["3.40.0", "3.42.0"]
+
+error_bug_pattern = {
+    "file_pattern": "(\\w+\\.java)",
+    "error_pattern": "error: \\[(.+?)\\]",
+    "found_pattern": "found   : (.*)",
+    "required_pattern": "required: (.*)"
+}
+javac_bug_pattern = {
+    "file_pattern": "(\\w+\\.java)",
+    "error_pattern": "(incompatible types:)"
+}
+
+def _write_wrapper(path, tool):
+    with open(path, 'w') as file:
+        file.write(f'#!/bin/sh\nexec "{sys.executable}" "{fake_tools_script}" {tool} "$@"\n')
+    os.chmod(path, 0o755)
+
+def _java_source(package, class_name, method):
+    return (f"package {package};\n\n"
+            f"public class {class_name} {{\n"
+            f"    public Object {method}() {{\n"
+            f"        Object result = null;\n"
+            f"        return result;\n"
+            f"    }}\n}}\n")
+
+def _expected_log(issue):
+    target_file = issue[JsonKeys.TARGETS.value][0][JsonKeys.FILE_NAME.value]
+    if issue[JsonKeys.BUG_TYPE.value] == "crash":
+        return (f"  ; The Checker Framework crashed.  Please report the crash.\n"
+                f"  Compilation unit: /work/src/{target_file}\n"
+                f"  Last visited tree at line 5 column 9:\n"
+                f"  Exception: java.lang.NullPointerException; java.lang.NullPointerException\n"
+                f"\tat org.checkerframework.framework.type.AnnotatedTypeFactory.getAnnotatedType(AnnotatedTypeFactory.java:1146)\n")
+    if issue.get("build_system") == "javac":
+        return f"{target_file}:5: error: incompatible types: Object cannot be converted to int\n"
+    return (f"{target_file}:5: error: [return] incompatible types in return.\n"
+            f"        return result;\n               ^\n"
+            f"  found   : @Nullable Object\n  required: @NonNull Object\n")
+
+def _fast_import_file(path, content):
+    data = content.encode("utf-8")
+    return f"M 644 inline {path}\ndata {len(data)}\n".encode("utf-8") + data + b"\n"
+
+def create_repository(repo_path, issues):
+    '''
+    Create a bare repository with one branch per issue, in one `git fast-import`
+
+    Parameters:
+        repo_path (str): path of the bare repository
+        issues ([{}]): issues of the repository. Each branch holds the target files of its issue and the
+                       specimin directory (build.gradle, settings.gradle, dependency.gradle, expected_log.txt)
+    '''
+    subprocess.run(["git", "init", "--quiet", "--bare", repo_path], check=True)
+    stream = io.BytesIO()
+    for issue in issues:
+        stream.write(f"commit refs/heads/{issue[JsonKeys.BRANCH.value]}\n"
+                     f"committer Fixture <fixture@example.invalid> {fixture_time} +0000\n"
+                     f"data 7\nfixture\n".encode("utf-8"))
+        for target in issue[JsonKeys.TARGETS.value]:
+            package = target[JsonKeys.PACKAGE.value]
+            class_name = os.path.splitext(target[JsonKeys.FILE_NAME.value])[0]
+            path = "/".join([issue[JsonKeys.ROOT_DIR.value], *package.split("."), target[JsonKeys.FILE_NAME.value]])
+            stream.write(_fast_import_file(path, _java_source(package, class_name, target[JsonKeys.METHOD_NAME.value].split("(")[0])))
+        stream.write(_fast_import_file("specimin/build.gradle", "plugins {\n    id 'java'\n}\n"))
+        stream.write(_fast_import_file("specimin/settings.gradle", f"rootProject.name = '{issue[JsonKeys.ISSUE_ID.value]}'\n"))
+        stream.write(_fast_import_file("specimin/dependency.gradle", "task pullJar(type: Copy) {}\n"))
+        stream.write(_fast_import_file("specimin/expected_log.txt", _expected_log(issue)))
+        stream.write(b"\n")
+    stream.write(f"reset refs/heads/main\nfrom refs/heads/{issues[0][JsonKeys.BRANCH.value]}\n\n".encode("utf-8"))
+    subprocess.run(["git", "fast-import", "--quiet"], cwd=repo_path, input=stream.getvalue(), check=True)
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"], cwd=repo_path, check=True)
+
+def generate_issues(count, repos_dir, repo_count, rng, targets_per_issue = 2):
+    '''
+    Synthetic issues in the format of resources/test_data.json: gradle issues, checker.jar issues
+    (build_system "shell") and javac issues, with error or crash bug types
+
+    Returns:
+        [{}]
+    '''
+    issues = []
+    for index in range(count):
+        issue_id = f"load-{index}"
+        repo_name = f"project{index % repo_count}"
+        build_system = rng.choices(["gradle", "shell", "javac"], weights=[6, 3, 1])[0]
+        bug_type = "error" if build_system == "javac" or rng.random() < 0.6 else "crash"
+        targets = [{"method": f"method{target}()", "file": f"Target{target}.java", "package": f"org.load.issue{index}"}
+                   for target in range(targets_per_issue)]
+        issue = {
+            "issue_id": issue_id,
+            "url": "file://" + os.path.join(repos_dir, f"{repo_name}.git"),
+            "branch": f"issue-{index}",
+            "commit_hash": "",
+            "project_name": repo_name,
+            "root_dir": "src/main/java",
+            "targets": targets,
+            "cf_version": rng.choice(cf_versions),
+            "java_version": javac_version if build_system == "javac" else rng.choice(java_versions),
+            "bug_type": bug_type,
+            "checker_qual_required": False,
+            "has_dependency": rng.random() < 0.3
+        }
+        if bug_type != "crash":
+            issue["bug_pattern"] = javac_bug_pattern if build_system == "javac" else error_bug_pattern
+        if build_system != "gradle":
+            issue["build_system"] = build_system
+        if build_system == "shell":
+            issue["cf_release_url"] = fake_release_url
+            issue["build_flags"] = ["-processor", "nullness"]
+        issues.append(issue)
+    return issues
+
+def create_specimin(specimin_dir):
+    '''
+    A Specimin git repository whose gradlew is the fake one
+    '''
+    os.makedirs(specimin_dir, exist_ok=True)
+    _write_wrapper(os.path.join(specimin_dir, "gradlew"), "gradlew")
+    with open(os.path.join(specimin_dir, ".gitignore"), 'w') as file:
+        file.write("build/\n")
+    git = ["git", "-c", "user.name=Fixture", "-c", "user.email=fixture@example.invalid"]
+    subprocess.run(["git", "init", "--quiet"], cwd=specimin_dir, check=True)
+    subprocess.run(["git", "add", "."], cwd=specimin_dir, check=True)
+    subprocess.run([*git, "commit", "--quiet", "-m", "fake Specimin"], cwd=specimin_dir, check=True)
+
+def create_jdk(jdk_dir):
+    os.makedirs(os.path.join(jdk_dir, "bin"), exist_ok=True)
+    for tool in ("java", "javac"):
+        _write_wrapper(os.path.join(jdk_dir, "bin", tool), tool)
+
+def _add_to_tar(tar, name, content, mode = 0o644):
+    data = content.encode("utf-8")
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = mode
+    info.mtime = fixture_time
+    tar.addfile(info, io.BytesIO(data))
+
+def create_toolchain_mirror(mirror_dir, issues):
+    '''
+    Fake JDK and Checker Framework archives for every toolchain the issues need, named as
+    toolchain.ensure_toolchain looks them up in a mirror (<name>.tar.gz, <name>.zip), with their sha256
+    '''
+    os.makedirs(mirror_dir, exist_ok=True)
+    for spec in toolchain.collect_requirements(issues):
+        if spec.kind == "jdk":
+            archive = os.path.join(mirror_dir, f"{spec.name}.tar.gz")
+            with tarfile.open(archive, "w:gz") as tar:
+                for tool in ("java", "javac"):
+                    _add_to_tar(tar, f"{spec.name}/bin/{tool}", f'#!/bin/sh\nexec "{sys.executable}" "{fake_tools_script}" {tool} "$@"\n', 0o755)
+        else:
+            archive = os.path.join(mirror_dir, f"{spec.name}.zip")
+            with zipfile.ZipFile(archive, 'w') as zip_file:
+                zip_file.writestr(f"{spec.name}/checker/dist/checker.jar", "fake checker.jar\n")
+        with open(f"{archive}.sha256", 'w') as file:
+            file.write(f"{toolchain._sha256(archive)}  {os.path.basename(archive)}\n")
+
+def generate_behaviour(issues, rng, failure_rate, latency, output_bytes, unpreserved_rate):
+    '''
+    Behaviour of the fake tools per issue (see fake_tools.default_behaviour). A 'failure_rate' fraction of the
+    issues fails in Specimin, spread over the failure modes; latencies are drawn from the 'latency' range.
+    '''
+    behaviour = {}
+    for issue in issues:
+        entry = {"latency": round(rng.uniform(*latency), 3), "output_bytes": output_bytes}
+        if rng.random() < failure_rate:
+            entry["failure"] = rng.choice(["fail", "crash", "no_output"])
+        elif rng.random() < unpreserved_rate:
+            entry["preserve"] = False
+        behaviour[issue[JsonKeys.ISSUE_ID.value]] = entry
+    return {"defaults": {}, "issues": behaviour}
+
+def create_sandbox(sandbox, issue_count, repo_count, seed, failure_rate, latency, output_bytes, unpreserved_rate):
+    '''
+    Generate the fixtures, test_data.json and the fake tool configuration of the sandbox
+
+    Returns:
+        [{}]: the generated issues
+    '''
+    rng = random.Random(seed)
+    fixtures = os.path.join(sandbox, "fixtures")
+    repos_dir = os.path.join(fixtures, "repos")
+    os.makedirs(repos_dir)
+    issues = generate_issues(issue_count, repos_dir, repo_count, rng)
+    by_repo = {}
+    for issue in issues:
+        by_repo.setdefault(issue["project_name"], []).append(issue)
+    for repo_name, repo_issues in by_repo.items():
+        create_repository(os.path.join(repos_dir, f"{repo_name}.git"), repo_issues)
+    create_specimin(os.path.join(fixtures, "specimin"))
+    create_jdk(os.path.join(fixtures, "jdk"))
+    create_toolchain_mirror(os.path.join(fixtures, "toolchain-mirror"), issues)
+
+    os.makedirs(os.path.join(sandbox, "run", "resources"))
+    with open(os.path.join(sandbox, "run", "resources", "test_data.json"), 'w') as file:
+        json.dump(issues, file, indent=2)
+    with open(os.path.join(sandbox, "fake_tools.json"), 'w') as file:
+        json.dump(generate_behaviour(issues, rng, failure_rate, latency, output_bytes, unpreserved_rate), file, indent=2)
+    return issues
+
+def get_environment(sandbox):
+    '''
+    Environment of main.py in the sandbox: fake Specimin and JDK, no network access needed
+    '''
+    fixtures = os.path.join(sandbox, "fixtures")
+    jdk_dir = os.path.join(fixtures, "jdk")
+    return dict(os.environ,
+                SPECIMIN=os.path.join(fixtures, "specimin"),
+                JAVA_HOME=jdk_dir,
+                PATH=os.path.join(jdk_dir, "bin") + os.pathsep + os.environ.get("PATH", ""),
+                FAKE_TOOLS_CONFIG=os.path.join(sandbox, "fake_tools.json"),
+                FAKE_TOOLS_LOG=os.path.join(sandbox, "fake_tools.log"),
+                SPECIMIN_EVAL_CACHE=os.path.join(sandbox, "run", "ISSUES", ".cache"),
+                SPECIMIN_EVAL_HISTORY=os.path.join(sandbox, "run", "ISSUES", "run_history.sqlite"),
+                GIT_CONFIG_NOSYSTEM="1")
+
+def read_tool_calls(log_path):
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def peak_concurrency(calls):
+    '''
+    Largest number of calls running at the same time
+    '''
+    boundaries = sorted([(call["start"], 1) for call in calls] + [(call["end"], -1) for call in calls])
+    running = peak = 0
+    for _, change in boundaries:
+        running += change
+        peak = max(peak, running)
+    return peak
+
+def summarize_run(sandbox, run_index, wall_time, jobs, returncode, isJarMode = False):
+    '''
+    Summary of a run of main.py from its status files and the calls of the fake tools
+
+    Returns:
+        {}
+    '''
+    log_path = os.path.join(sandbox, "fake_tools.log")
+    calls = read_tool_calls(log_path)
+    if calls: # keep the calls of each run apart
+        os.replace(log_path, os.path.join(sandbox, f"fake_tools-{run_index}.log"))
+    status_file, preservation_file, _ = (os.path.join(sandbox, "run", path) for path in get_status_file_paths(isJarMode))
+    status = read_json_from_file(status_file) if os.path.exists(status_file) else {}
+    preservation = read_json_from_file(preservation_file) if os.path.exists(preservation_file) else {}
+    tool_seconds = sum(call["end"] - call["start"] for call in calls)
+    specimin_calls = [call for call in calls if call["tool"] == "specimin"]
+    kinds = {}
+    for call in calls:
+        key = f"{call['tool']}:{call['kind']}"
+        kinds[key] = kinds.get(key, 0) + 1
+    issues = max(len(status), 1)
+    return {
+        "run": run_index,
+        "returncode": returncode,
+        "wall_seconds": round(wall_time, 2),
+        "issues": len(status),
+        "minimized": sum(1 for value in status.values() if value == "PASS"),
+        "preserved": sum(1 for value in preservation.values() if value == "PASS"),
+        "issues_per_second": round(len(status) / wall_time, 2) if wall_time > 0 else None,
+        "tool_seconds": round(tool_seconds, 2),
+        "tool_calls": kinds,
+        "specimin_peak_concurrency": peak_concurrency(specimin_calls),
+        # time of the --jobs slots not spent inside a fake tool, per issue
+        "harness_overhead_per_issue": round(max(0.0, wall_time * jobs - tool_seconds) / issues, 3)
+    }
+
+def run_main(sandbox, main_args):
+    '''
+    Run main.py in the sandbox
+
+    Returns:
+        (exit status, wall seconds)
+    '''
+    start = time.monotonic()
+    with open(os.path.join(sandbox, "main_output.txt"), 'a') as output:
+        status = subprocess.run([sys.executable, main_script, *main_args], cwd=os.path.join(sandbox, "run"),
+                                env=get_environment(sandbox), stdout=output, stderr=subprocess.STDOUT)
+    return status.returncode, time.monotonic() - start
+
+def _parse_range(text):
+    low, _, high = text.partition(":")
+    return float(low), float(high or low)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run main.py on synthetic issues with fake Specimin, Gradle and JDKs")
+    parser.add_argument('--sandbox', required=True, help='directory of the generated sandbox')
+    parser.add_argument('--issues', type=int, default=200, help='number of synthetic issues')
+    parser.add_argument('--repos', type=int, default=20, help='number of target repositories shared by the issues')
+    parser.add_argument('--jobs', type=int, default=8, help='--jobs of main.py')
+    parser.add_argument('--runs', type=int, default=1, help='runs of main.py on the same sandbox, to measure the caches')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=_parse_range, default=(0.05, 0.5), help='Specimin latency range in seconds, MIN:MAX')
+    parser.add_argument('--output-size', type=int, default=4096, help='bytes Specimin writes per run')
+    parser.add_argument('--failure-rate', type=float, default=0.1, help='fraction of issues failing in Specimin')
+    parser.add_argument('--unpreserved-rate', type=float, default=0.1, help='fraction of minimized issues whose compiler output does not match')
+    parser.add_argument('--keep', action='store_true', help='reuse an existing sandbox instead of regenerating it')
+    parser.add_argument('main_args', nargs=argparse.REMAINDER, help='options passed to main.py after --')
+    args = parser.parse_args()
+
+    sandbox = os.path.abspath(args.sandbox)
+    if not (args.keep and os.path.exists(os.path.join(sandbox, "fake_tools.json"))):
+        if os.path.exists(sandbox):
+            shutil.rmtree(sandbox)
+        start = time.monotonic()
+        create_sandbox(sandbox, args.issues, args.repos, args.seed, args.failure_rate, args.latency, args.output_size, args.unpreserved_rate)
+        print(f"Sandbox with {args.issues} issues generated in {time.monotonic() - start:.1f}s")
+
+    main_args = [argument for argument in args.main_args if argument != "--"]
+    main_args = ["--jobs", str(args.jobs), "--toolchain-mirror", os.path.join(sandbox, "fixtures", "toolchain-mirror"), *main_args]
+    summaries = []
+    for run_index in range(1, args.runs + 1):
+        returncode, wall_time = run_main(sandbox, main_args)
+        summary = summarize_run(sandbox, run_index, wall_time, args.jobs, returncode, isJarMode=any(argument in ("-j", "--isJarMode") for argument in main_args))
+        summaries.append(summary)
+        print(json.dumps(summary, indent=2))
+    with open(os.path.join(sandbox, "load_test_summary.json"), 'w') as file:
+        json.dump(summaries, file, indent=2)
+    if any(summary["returncode"] != 0 for summary in summaries):
+        print(f"main.py failed, see {os.path.join(sandbox, 'main_output.txt')}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
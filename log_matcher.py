@@ -0,0 +1,109 @@
+import os
+import re
+from functools import lru_cache
+
+# constructs that can match a line break (or look across one); patterns using them are matched on the
+# whole log instead of line by line. The check is textual and errs on the side of whole-log matching.
+_multiline_constructs = re.compile(r"\\[sSWDnrvfx0-9uUNAZ]|\[\^|\(\?|[\^$]|\n")
+
+class LogPattern:
+    def __init__(self, key, pattern):
+        '''
+        Constructor of the class
+        Parameters:
+            key (str): name of the pattern in bug_pattern, e.g. file_pattern
+            pattern (str): regular expression. Its first group is the value compared between logs
+        '''
+        self.key = key
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.line_local = not _multiline_constructs.search(pattern)
+
+    def normalize(self, value):
+        if self.key == "file_pattern": # logs of the target and the minimized program use different paths
+            return os.path.basename(value)
+        return value
+
+@lru_cache(maxsize=256)
+def compile_patterns(bug_pattern_items):
+    '''
+    Compile the bug_pattern of an issue once per process.
+
+    Parameters:
+        bug_pattern_items (((str, str), ...)): items of the bug_pattern dictionary
+
+    Returns:
+        [LogPattern]
+    '''
+    return [LogPattern(key, pattern) for key, pattern in bug_pattern_items]
+
+def _findall_value(match):
+    # the value re.findall would return for this match
+    groups = match.groups()
+    if not groups:
+        return match.group(0)
+    return groups[0] if len(groups) == 1 else groups
+
+def expected_values(patterns, expected_log_path):
+    '''
+    Value of every pattern in the expected log, which only holds the desired log information
+
+    Returns:
+        {key: normalized value}
+    '''
+    with open(expected_log_path, "r", errors="replace") as file:
+        expected_log_content = file.read()
+    expected = {}
+    for log_pattern in patterns:
+        match = log_pattern.regex.search(expected_log_content)
+        if not match:
+            raise ValueError(f"{log_pattern.pattern} not matched")
+        expected[log_pattern.key] = log_pattern.normalize(match.group(1))
+    return expected
+
+def _scan_lines(log_path, pending):
+    '''
+    One streaming pass over the log for the line-local patterns. A pattern leaves 'pending' as soon
+    as its expected value is seen; the pass stops once nothing is pending.
+    '''
+    with open(log_path, "r", errors="replace") as file:
+        for line in file:
+            if not pending:
+                return
+            for log_pattern, value in list(pending):
+                if any(log_pattern.normalize(_findall_value(match)) == value for match in log_pattern.regex.finditer(line)):
+                    pending.remove((log_pattern, value))
+
+def _scan_whole(log_content, log_pattern, value):
+    '''
+    Search a pattern that can span lines over the whole decoded log, stopping at the first hit. The str
+    regex keeps the unicode semantics of \\w, \\s, \\d, character classes and \\u escapes.
+    '''
+    return any(log_pattern.normalize(_findall_value(match)) == value for match in log_pattern.regex.finditer(log_content))
+
+def log_contains_expected(bug_pattern_data, expected_log_path, actual_log_path):
+    '''
+    True if every value that the bug patterns extract from the expected log is also found by the same
+    pattern in the actual log. Line-local patterns share one streaming pass over the actual log.
+
+    Parameters:
+        bug_pattern_data ({key: pattern}): bug_pattern of the issue
+        expected_log_path (str): expected log of the target
+        actual_log_path (str): build log of the minimized program
+
+    Returns:
+        bool
+    '''
+    patterns = compile_patterns(tuple(bug_pattern_data.items()))
+    expected = expected_values(patterns, expected_log_path)
+
+    pending = [(log_pattern, expected[log_pattern.key]) for log_pattern in patterns if log_pattern.line_local]
+    _scan_lines(actual_log_path, pending)
+    if pending:
+        return False
+    whole_log_patterns = [log_pattern for log_pattern in patterns if not log_pattern.line_local]
+    if not whole_log_patterns:
+        return True
+    with open(actual_log_path, "r", errors="replace") as file: # read once, only for the patterns that need it
+        actual_log_content = file.read()
+    return all(_scan_whole(actual_log_content, log_pattern, expected[log_pattern.key]) for log_pattern in whole_log_patterns)
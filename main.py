@@ -1,22 +1,40 @@
 import json
-import re
 import os
 import sys
 import subprocess
 import shutil
 from Keyvalue import JsonKeys
 from Result import Result
-from report_builder import TableGenerator
+from report_builder import StreamingReport
+from resource_usage import ResourceUsage
 from exception_data import ExceptionData
-import zipfile
+from crash_log_parser import parse_crash_log
 import platform
-import tarfile
 import glob
 import stat
 import argparse
 import time
 import math
 import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from specimin_distribution import build_specimin_distribution, build_specimin_java_command, get_specimin_version_key, get_git_head
+from specimin_worker import get_worker_pool, WorkerTimeout
+from git_cache import update_mirror, clone_from_mirror
+import result_cache
+import toolchain
+from output_sink import OutputSink, run_streaming
+from phase_trace import PhaseTracer
+import scheduler
+import log_matcher
+import phase_trace
+import itertools
+import compile_server
+import gradle_setup
+import run_history
+import run_journal
+import pipeline
+import functools
+from run_journal import RunJournal
 
 issue_folder_dir = 'ISSUES'
 specimin_input = 'input'
@@ -24,14 +42,20 @@ specimin_output = 'output'
 specimin_jar_output = 'jar_output'
 specimin_project_name = 'specimin'
 specimin_source_url = 'https://github.com/kelloggm/specimin.git'
-TIMEOUT_DURATION = 300
+TIMEOUT_DURATION = scheduler.default_timeout
+COMPILE_TIMEOUT_DURATION = TIMEOUT_DURATION # seconds, javac or the checker on a minimized program
 specimin_env_var = "SPECIMIN"
 json_status_file_name = "target_status.json"
 minimized_program_build_log_file = "build_log.txt"
 linux_system_identifier = "Linux"
 macos_system_identifier = "Darwin"
 preservation_status_file_name = "preservation_status.json"
-run_time = {}
+run_time_file_name = "run_time.json"
+trace_file_name = "trace.json"
+phase_timing_file_name = "phase_timing.json"
+resource_usage_file_name = "resource_usage.json"
+cache_env_var = "SPECIMIN_EVAL_CACHE"
+default_cache_dir_name = ".cache"
 
 def read_json_from_file(file_path):
     '''
@@ -63,37 +87,30 @@ def get_specimin_env_var():
     specimin_env_value = os.environ.get(specimin_env_var)
     return specimin_env_value
 
+def get_cache_dir():
+    '''
+    Root directory of the caches shared between issues and runs (prebuilt Specimin, ...).
+    $SPECIMIN_EVAL_CACHE if defined, otherwise ISSUES/.cache
+
+    Retruns:
+        Absolute path of the cache directory
+    '''
+    cache_dir = os.environ.get(cache_env_var) or os.path.join(issue_folder_dir, default_cache_dir_name)
+    return os.path.abspath(cache_dir)
+
 def set_directory_exec_permission(directory_path):
     current_permissions = os.stat(directory_path).st_mode
     new_permissions = current_permissions | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH # owner, group, other
     os.chmod(directory_path, new_permissions)
 
-def download_with_wget(url, save_as):
-    try:
-        subprocess.run(["wget", "-q", "--show-progress", "-O", save_as, url], check=True)
-        print("File downloaded successfully.")
-    except subprocess.CalledProcessError as e:
-        print("Failed to download file:", e)
-
-def unzip_file(zip_file):
+def execute_shell_command_with_logging(command, log_file_path, timeout = None):
     '''
-    unzips a zip file
-    '''
-    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-        zip_ref.extractall()
-
-def extract_and_rename(tar_file, target_name):
-    with tarfile.open(tar_file, "r:gz") as tar:
-        tar.extractall()
-        extracted_dir = tar.getnames()[0]
-        set_directory_exec_permission(extracted_dir)
-    os.rename(extracted_dir, target_name)
+    Run 'command', streaming its stderr to 'log_file_path'
 
-def execute_shell_command_with_logging(command, log_file_path):
-    with open(log_file_path, 'w') as f:
-       st = subprocess.run(command, stderr=f)
-       if st.returncode == 0:
-           raise Exception("exception")
+    Returns:
+        StreamedRun: exit status and resource usage of the command
+    '''
+    return run_streaming(command, stderr_sink=OutputSink(log_file_path), timeout=timeout)
 
 
 def get_repository_name(github_ssh: str):
@@ -147,7 +164,7 @@ def is_git_directory(dir):
     git_dir_path = os.path.join(dir, '.git')
     return os.path.exists(git_dir_path) and os.path.isdir(git_dir_path)
 
-def get_target_data(url, branch, commit, directory):
+def get_target_data(url, branch, commit, directory, cache_dir = None):
     '''
     Get target repository data 
 
@@ -156,12 +173,21 @@ def get_target_data(url, branch, commit, directory):
         branch(str): branch name
         commit(str): commit #
         directory (str): directory to clone in
+        cache_dir (str): if given, the clone shares the objects of a bare mirror of 'url' kept in this cache
     '''
     project_name = get_repository_name(url)
     if (os.path.exists(os.path.join(directory, project_name))):
         print(f"{project_name} repository already exists. Aborting cloning")
         return
 
+    if cache_dir:
+        mirror_path = update_mirror(url, cache_dir)
+        if mirror_path and clone_from_mirror(url, mirror_path, branch, os.path.join(directory, project_name)):
+            print(f"get_target_data -> cloned {url} from mirror {mirror_path}")
+            checkout_commit(commit, os.path.join(directory, project_name))
+            return
+        print(f"Mirror unavailable for {url}. Cloning directly")
+
     clone_command = ["git", "clone"]
     if branch:
         clone_command.extend(["-b", branch])
@@ -254,34 +280,28 @@ def clone_specimin(path_to_clone, url):
     else:
         get_target_data(url, "", "", path_to_clone)
 
+def prepare_specimin_distribution(specimin_path):
+    '''
+    Build (or reuse) the prebuilt Specimin distribution of the current Specimin commit.
+    The build is skipped when a distribution for the checked out commit is already cached.
 
-def build_specimin_command(project_name: str,
-                           target_base_dir_path: str,
-                           root_dir: str,  
-                           targets: list,
-                           jar_path: str = "",
-                           isJarMode = False):
+    Parameters:
+        specimin_path (str): Specimin source directory ($SPECIMIN or ISSUES/specimin)
+
+    Returns:
+        dist_dir (str): distribution directory, None if Specimin has to be run through Gradle
     '''
-    Build the gradle command to execute Specimin on target project
+    return build_specimin_distribution(os.path.abspath(specimin_path), get_cache_dir())
 
-    issue_container_dir(ISSUES)
-    |--- issue_id(cf-1291)     
-    |    |--- input  ---> it contains the git repository of a target project
-    |    |      |----nomulus/core/src/main/java/    ---> this is the root directory of a package
-    |    |                                   |---package_path/file.java (daikon/chicory/PureMethodInfo.java)  --> a target file
-    |    |--- output --> Contains minimization result of Specimin
 
-    
-    Parameters:
-        project_name (str): Name of the target project. Example: daikon
-        target_base_dir (str): path of the target project directory. Ex: ISSUES/cf-1291
-        root_dir (str): A directory path relative to the project base directory where java package stored.
-        targets ({'method': '' or 'field': '', 'file': '', 'package': ''}) : target java file and method/field name data
-    
+def _collect_specimin_targets(project_name, target_base_dir_path, root_dir, targets, isJarMode):
+    '''
+    Resolve the root, output directory and qualified target names of a Specimin invocation.
+    An existing output directory is removed.
+
     Retruns:
-        command (str): The gradle command of SPECIMIN for the issue.
+        (root_dir, output_dir, target_file_list, target_method_list, target_field_list)
     '''
-    
     if not os.path.isabs(target_base_dir_path):
         raise ValueError("Invalid argument: target_base_dir_path must be an absolute path")
 
@@ -330,6 +350,63 @@ def build_specimin_command(project_name: str,
         if field_name:
             target_field_list.append(package_name + "." + os.path.splitext(file_name)[0]+ inner_class_name + "#" + field_name)
 
+    return root_dir, output_dir, target_file_list, target_method_list, target_field_list
+
+def build_specimin_args(project_name: str,
+                        target_base_dir_path: str,
+                        root_dir: str,
+                        targets: list,
+                        jar_path: str = "",
+                        isJarMode = False):
+    '''
+    Build the Specimin arguments for a target project as an argv list. Same parameters as build_specimin_command.
+
+    Retruns:
+        args ([str]): Specimin arguments, e.g. ['--root', '...', '--outputDirectory', '...', '--targetFile', '...']
+    '''
+    root_dir, output_dir, target_file_list, target_method_list, target_field_list = _collect_specimin_targets(
+        project_name, target_base_dir_path, root_dir, targets, isJarMode)
+
+    args = ["--root", root_dir, "--outputDirectory", output_dir]
+    for file in target_file_list:
+        args.extend(["--targetFile", file])
+    for method in target_method_list:
+        args.extend(["--targetMethod", method])
+    for field in target_field_list:
+        args.extend(["--targetField", field])
+    if jar_path:
+        args.extend(["--jarPath", jar_path])
+    return args
+
+def build_specimin_command(project_name: str,
+                           target_base_dir_path: str,
+                           root_dir: str,  
+                           targets: list,
+                           jar_path: str = "",
+                           isJarMode = False):
+    '''
+    Build the gradle command to execute Specimin on target project
+
+    issue_container_dir(ISSUES)
+    |--- issue_id(cf-1291)     
+    |    |--- input  ---> it contains the git repository of a target project
+    |    |      |----nomulus/core/src/main/java/    ---> this is the root directory of a package
+    |    |                                   |---package_path/file.java (daikon/chicory/PureMethodInfo.java)  --> a target file
+    |    |--- output --> Contains minimization result of Specimin
+
+    
+    Parameters:
+        project_name (str): Name of the target project. Example: daikon
+        target_base_dir (str): path of the target project directory. Ex: ISSUES/cf-1291
+        root_dir (str): A directory path relative to the project base directory where java package stored.
+        targets ({'method': '' or 'field': '', 'file': '', 'package': ''}) : target java file and method/field name data
+    
+    Retruns:
+        command (str): The gradle command of SPECIMIN for the issue.
+    '''
+    root_dir, output_dir, target_file_list, target_method_list, target_field_list = _collect_specimin_targets(
+        project_name, target_base_dir_path, root_dir, targets, isJarMode)
+
     output_dir_subcommand = "--outputDirectory" + " " + f"\"{output_dir}\""
     root_dir_subcommand = "--root" + " " + f"\"{root_dir}\""
     target_file_subcommand = ""
@@ -353,47 +430,93 @@ def build_specimin_command(project_name: str,
     
     return command
 
-def run_specimin(issue_name, command, directory) -> Result:
+def run_specimin(issue_name, command, directory, timeout = TIMEOUT_DURATION) -> Result:
     '''
     Execute SPECIMIN on a target project
 
     Parameters:
-        command (str): The gradle command to run specimin
+        command (str or [str]): The gradle command to run specimin, or the argv of a prebuilt Specimin (run without a shell)
         directory (str): The base directory of the specimin repository
+        timeout (int): seconds after which Specimin is killed
     
     Returns: 
         Result: execution result of Specimin
     '''
     print(f"{issue_name} executing...")
+    error_msg_file = os.path.join(issue_folder_dir, issue_name, f"{issue_name}_error.txt") # not abs path. ISSUES/cf-1291/cf-1291_error.txt
+    output_file = os.path.join(issue_folder_dir, issue_name, f"{issue_name}_output.txt")
     try:
-        result = subprocess.run(command, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True, timeout=TIMEOUT_DURATION)
+        # output is streamed to the log files; only the first lines of stderr are kept in memory
+        result = run_streaming(command, stdout_sink=OutputSink(output_file), stderr_sink=OutputSink(error_msg_file),
+                               cwd=directory, shell=isinstance(command, str), timeout=timeout)
         print(f"{issue_name} execution ends.")
         if result.returncode == 0:
-            return Result(issue_name, "PASS", "")
+            os.remove(error_msg_file)
+            specimin_result = Result(issue_name, "PASS", "")
         else:
-            error_msg_file = os.path.join(issue_folder_dir, issue_name, f"{issue_name}_error.txt") # not abs path. ISSUES/cf-1291/cf-1291_error.txt
-            try:
-                stderr_str = result.stderr.decode("utf-8") # this can fail.
-                stderr_lines = stderr_str.split('\n')[:5]
-                first_five_lines_stderr = '\n'.join(stderr_lines)
-                print(first_five_lines_stderr)
-                if os.path.exists(error_msg_file):
-                    os.remove(error_msg_file)
-                with open(error_msg_file, 'w') as file:
-                    file.write(stderr_str)
-            except UnicodeDecodeError as e:
-                 print("Error decoding stderr:", e)
-            return Result(issue_name, "FAIL", f"{error_msg_file}")
+            print(result.stderr.head())
+            specimin_result = Result(issue_name, "FAIL", f"{error_msg_file}")
+        specimin_result.add_resource_usage("specimin", result.usage)
+        return specimin_result
     except subprocess.TimeoutExpired:
         print(f"{issue_name} execution ends. TIMEOUT")
         return Result(issue_name, "FAIL", "Timeout")
     except Exception as e:
         return Result(issue_name, "FAIL", f"Unhandled exception occurred: {e}")
 
+def run_specimin_in_worker(issue_name, specimin_args, specimin_dist, timeout = TIMEOUT_DURATION) -> Result:
+    '''
+    Execute SPECIMIN on a target project inside a warm Specimin worker JVM of this process.
+
+    Parameters:
+        issue_name (str): issue id
+        specimin_args ([str]): Specimin arguments (see build_specimin_args)
+        specimin_dist (str): prebuilt Specimin distribution
+        timeout (int): seconds after which the worker is killed
 
-def pullDependencies(script_path, specimin_path):
-    status = subprocess.run(f"./gradlew -b  {script_path} pullJar", cwd = specimin_path, shell=True)
+    Returns:
+        Result: execution result of Specimin
+    '''
+    print(f"{issue_name} executing in Specimin worker...")
+    error_msg_file = os.path.join(issue_folder_dir, issue_name, f"{issue_name}_error.txt") # not abs path. ISSUES/cf-1291/cf-1291_error.txt
+    try:
+        pool = get_worker_pool(specimin_dist, get_cache_dir())
+        returncode, usage = pool.run(specimin_args, os.path.abspath(error_msg_file), timeout)
+    except WorkerTimeout:
+        print(f"{issue_name} execution ends. TIMEOUT")
+        return Result(issue_name, "FAIL", "Timeout")
+    except Exception as e:
+        return Result(issue_name, "FAIL", f"Unhandled exception occurred: {e}")
+
+    print(f"{issue_name} execution ends.")
+    if returncode == 0:
+        if os.path.exists(error_msg_file):
+            os.remove(error_msg_file)
+        result = Result(issue_name, "PASS", "")
+    else:
+        with open(error_msg_file, 'r', errors='replace') as file:
+            print(''.join(itertools.islice(file, 5)))
+        result = Result(issue_name, "FAIL", f"{error_msg_file}")
+    result.add_resource_usage("specimin", usage)
+    return result
+
+
+def pullDependencies(script_path, specimin_path, shared_gradle = False):
+    '''
+    Parameters:
+        script_path (str): dependency.gradle of the issue
+        specimin_path (str): Specimin directory, where gradlew is
+        shared_gradle (bool): run in the shared Gradle user home, offline once the script is primed
+
+    Returns:
+        ResourceUsage: CPU, memory and I/O used by the Gradle pullJar task
+    '''
+    if shared_gradle:
+        status = gradle_setup.run_gradle(get_cache_dir(), "pullJar", gradle_setup.build_key([script_path]), specimin_path, build_file=script_path)
+    else:
+        status = run_streaming(f"./gradlew -b  {script_path} pullJar", cwd = specimin_path, shell=True)
     print(f"Jar pull status = {status.returncode}")
+    return status.usage
 
 def copyFiles(src_dir, des_dir):
     files = os.listdir(src_dir)
@@ -404,19 +527,31 @@ def copyFiles(src_dir, des_dir):
             dest_file = os.path.join(des_dir, file)
             shutil.copy2(src_file, dest_file)
 
-def performEvaluation(issue_data, isJarMode = False) -> Result:
+def fetch_issue(issue_data, isJarMode = False, specimin_dist = None, use_cache = True, tracer: PhaseTracer = None, shared_gradle = False, journal: RunJournal = None):
     '''
-    For each issue data, execute SPECIMIN on a target project. 
+    Network part of the evaluation of an issue: clone of the target and lookup of the result cache, then
+    on a miss the Gradle pullJar in jar mode and the toolchains of the preservation check.
 
     Parameters:
-        issue ({}): json data associated with an issue    
-    '''
+        issue_data ({}): json data associated with an issue
+        isJarMode (bool): True if Specimin is executed in jar mode
+        specimin_dist (str): prebuilt Specimin distribution, part of the cache key
+        use_cache (bool): restore the result of an identical previous evaluation from the result cache
+        tracer (PhaseTracer): records the time spent in each phase
+        shared_gradle (bool): run pullJar in the shared Gradle user home (see gradle_setup)
+        journal (RunJournal): records the completed phases. Phases it holds from an interrupted run are not run again
 
+    Returns:
+        Result if the evaluation ends here (cached, or the jar pull script is missing), otherwise the
+        fetched issue {} passed to minimize_issue and verify_issue
+    '''
     issue_id = issue_data[JsonKeys.ISSUE_ID.value]
     url = issue_data[JsonKeys.URL.value]
     branch = issue_data[JsonKeys.BRANCH.value]
     commit_hash = issue_data[JsonKeys.COMMIT_HASH.value]
     qual_jar_required = issue_data[JsonKeys.CHECKER_QUAL_REQURIED.value]
+    if tracer is None:
+        tracer = PhaseTracer(issue_id)
 
     issue_folder_abs_dir = os.path.abspath(issue_folder_dir)
     input_dir = create_issue_directory(issue_folder_abs_dir, issue_id)
@@ -427,9 +562,18 @@ def performEvaluation(issue_data, isJarMode = False) -> Result:
         print("Clone copy of Specimin is used")
         specimin_path = os.path.join(issue_folder_abs_dir, specimin_project_name)
 
-    get_target_data(url, branch, commit_hash, input_dir) 
+    project_dir = os.path.join(input_dir, repo_name)
+    if journal and journal.was_started(issue_id) and not journal.get_phase(issue_id, "clone") and os.path.exists(project_dir):
+        print(f"{issue_id}: removing the clone interrupted in the previous run")
+        shutil.rmtree(project_dir)
+    with tracer.span("clone", url=url):
+        get_target_data(url, branch, commit_hash, input_dir, get_cache_dir())
+    if journal and not journal.get_phase(issue_id, "clone") and is_git_directory(project_dir):
+        journal.phase_completed(issue_id, "clone")
 
     jar_path = ""
+    pull_usage = None
+    jar_pull_script = None
     if isJarMode:
         jar_path = os.path.join(issue_folder_abs_dir, issue_id, specimin_input, repo_name, specimin_project_name, "libs") # this should include the qual jar if needed
         os.makedirs(jar_path, exist_ok=True)
@@ -438,38 +582,183 @@ def performEvaluation(issue_data, isJarMode = False) -> Result:
         if req_dep_in_jar_mode and not os.path.exists(jar_pull_script):
             print("Jar pull script is not available.")
             return Result(issue_id, "FAIL", "Jar pull script unavailable")
-        elif req_dep_in_jar_mode and os.path.exists(jar_pull_script):
-            pullDependencies(jar_pull_script, specimin_path)
+        elif not req_dep_in_jar_mode:
+            jar_pull_script = None
     elif qual_jar_required:
         jar_path = os.path.join(issue_folder_abs_dir, issue_id, specimin_input, repo_name, specimin_project_name, "checker") # in seperate directory so that unnecessary jar's are not loaded
     else:
         jar_path = ""
+
+    # the key only depends on the clone and the jar path: a hit skips pullJar and the toolchain downloads
+    output_dir = os.path.join(issue_folder_abs_dir, issue_id, specimin_jar_output if isJarMode else specimin_output)
+    error_file = os.path.join(issue_folder_abs_dir, issue_id, f"{issue_id}_error.txt")
+    cache_key = None
+    cached_result = None
+    if use_cache:
+        with tracer.span("cache_lookup"):
+            specimin_version = os.path.basename(specimin_dist) if specimin_dist else get_specimin_version_key(specimin_path)
+            target_commit = get_git_head(os.path.join(input_dir, repo_name))
+            cache_key = result_cache.compute_key(specimin_version, target_commit, issue_data, isJarMode, jar_path if os.path.exists(jar_path) else "")
+            if cache_key:
+                cached_result = result_cache.lookup(get_cache_dir(), cache_key, output_dir, error_file)
+            if cached_result:
+                print(f"{issue_id} restored from result cache - {cached_result.status}, preservation {cached_result.preservation_status}")
+                cached_result.from_cache = True
+                return cached_result
+
+    if jar_pull_script:
+        pulled = journal.get_phase(issue_id, "pull_dependencies") if journal else None
+        if pulled:
+            pull_usage = ResourceUsage.from_dict(pulled["usage"]) if pulled.get("usage") else None
+        else:
+            with tracer.span("pull_dependencies"):
+                pull_usage = pullDependencies(jar_pull_script, specimin_path, shared_gradle)
+            if journal:
+                journal.phase_completed(issue_id, "pull_dependencies", usage=pull_usage.to_dict() if pull_usage else None)
     
     qual_path = os.path.join(issue_folder_abs_dir, issue_id, specimin_input, repo_name, specimin_project_name, "checker")
     if isJarMode and qual_jar_required:
         if os.path.exists(qual_path):
             copyFiles(qual_path, jar_path)
-    
+
+    if issue_data.get("build_system", "gradle") != "gradle":
+        # downloaded here rather than in the preservation check; a failure is reported by check_preservation
+        try:
+            with tracer.span("toolchain"):
+                for spec in toolchain.get_issue_requirements(issue_data):
+                    toolchain.ensure_toolchain(spec, get_cache_dir())
+        except Exception as e:
+            print(f"{issue_id}: toolchain not available: {e}")
+
+    return {"issue_data": issue_data, "isJarMode": isJarMode, "repo_name": repo_name, "specimin_path": specimin_path,
+            "jar_path": jar_path, "pull_usage": pull_usage, "cache_key": cache_key, "output_dir": output_dir, "error_file": error_file}
+
+def minimize_issue(fetched, specimin_dist = None, use_worker = False, tracer: PhaseTracer = None, timeouts = None, journal: RunJournal = None) -> Result:
+    '''
+    Run Specimin on a fetched issue (see fetch_issue)
+
+    Parameters:
+        fetched ({}): the issue returned by fetch_issue
+        specimin_dist (str): prebuilt Specimin distribution. If None, Specimin is run with `./gradlew run`
+        use_worker (bool): run Specimin in a warm worker JVM of this process instead of a new JVM (requires specimin_dist)
+        tracer (PhaseTracer): records the time spent in each phase
+        timeouts ({issue_id: seconds}): Specimin timeout per issue (see scheduler.plan_issue), TIMEOUT_DURATION if absent
+        journal (RunJournal): records the Specimin result. A result it holds from an interrupted run is reused
+
+    Returns:
+        Result: execution result of Specimin
+    '''
+    issue_data = fetched["issue_data"]
+    issue_id = issue_data[JsonKeys.ISSUE_ID.value]
+    repo_name = fetched["repo_name"]
+    jar_path = fetched["jar_path"]
+    if tracer is None:
+        tracer = PhaseTracer(issue_id)
+    issue_folder_abs_dir = os.path.abspath(issue_folder_dir)
+
+    minimized = journal.get_phase(issue_id, "specimin") if journal else None
+    if minimized and (minimized["result"]["status"] != "PASS" or os.path.isdir(fetched["output_dir"])):
+        print(f"{issue_id} Specimin result restored from the run journal")
+        return Result.from_dict(minimized["result"])
+
     specimin_command = ""
     result: Result = None
     
-    specimin_command = build_specimin_command(repo_name, os.path.join(issue_folder_abs_dir, issue_id), issue_data[JsonKeys.ROOT_DIR.value], issue_data[JsonKeys.TARGETS.value], jar_path if os.path.exists(jar_path) else "", isJarMode)
-
-    print(f"build command: {specimin_command}")
+    with tracer.span("build_command"):
+        if specimin_dist:
+            specimin_args = build_specimin_args(repo_name, os.path.join(issue_folder_abs_dir, issue_id), issue_data[JsonKeys.ROOT_DIR.value], issue_data[JsonKeys.TARGETS.value], jar_path if os.path.exists(jar_path) else "", fetched["isJarMode"])
+            specimin_command = build_specimin_java_command(specimin_dist, specimin_args)
+            print(f"build command: {' '.join(specimin_command)}")
+        else:
+            specimin_command = build_specimin_command(repo_name, os.path.join(issue_folder_abs_dir, issue_id), issue_data[JsonKeys.ROOT_DIR.value], issue_data[JsonKeys.TARGETS.value], jar_path if os.path.exists(jar_path) else "", fetched["isJarMode"])
+            print(f"build command: {specimin_command}")
+    timeout = (timeouts or {}).get(issue_id, TIMEOUT_DURATION)
     start_time = time.time()
-    result = run_specimin(issue_id ,specimin_command, specimin_path)   
+    with tracer.span("specimin", worker=bool(specimin_dist and use_worker), timeout=timeout):
+        if specimin_dist and use_worker:
+            result = run_specimin_in_worker(issue_id, specimin_args, specimin_dist, timeout)
+        else:
+            result = run_specimin(issue_id ,specimin_command, fetched["specimin_path"], timeout)   
     end_time = time.time()
 
     duration = round(end_time - start_time)
+    result.set_run_time(duration)
+    result.add_resource_usage("pull_dependencies", fetched["pull_usage"])
+    if journal and not result.reason.startswith("Unhandled exception"):
+        journal.phase_completed(issue_id, "specimin", result=result.to_dict())
+    return result
 
-    global run_time
-    run_time[f"{issue_id}"] = duration
+def verify_issue(fetched, result: Result, tracer: PhaseTracer = None, use_compile_server = False, shared_gradle = False) -> Result:
+    '''
+    Preservation check of the Specimin result of a fetched issue, then storage of the evaluation in the
+    result cache
 
+    Parameters:
+        fetched ({}): the issue returned by fetch_issue
+        result (Result): the Specimin result returned by minimize_issue. Its preservation status is updated.
+        tracer (PhaseTracer): records the time spent in each phase
+        use_compile_server (bool): check preservation of javac and Checker Framework issues in warm compiler JVMs
+        shared_gradle (bool): build gradle issues in the shared Gradle user home (see gradle_setup)
+    '''
     print(f"{result.name} - {result.status}")
 
     if result.status.lower() == "fail":
         result.set_preservation_status("FAIL", "Minimization did not succeed.")
-        return result
+    else:
+        check_preservation(fetched["issue_data"], result, fetched["isJarMode"], fetched["specimin_path"], tracer, use_compile_server, shared_gradle)
+
+    # timeouts and harness errors depend on the machine, not on the inputs of the key
+    cache_key = fetched["cache_key"]
+    if cache_key and result.reason != "Timeout" and not result.reason.startswith("Unhandled exception"):
+        with (tracer or PhaseTracer(result.name)).span("cache_store"):
+            result_cache.store(get_cache_dir(), cache_key, result, fetched["output_dir"], fetched["error_file"] if result.status == "FAIL" else None)
+    return result
+
+def performEvaluation(issue_data, isJarMode = False, specimin_dist = None, use_worker = False, use_cache = True, tracer: PhaseTracer = None, timeouts = None, use_compile_server = False, shared_gradle = False, journal: RunJournal = None) -> Result:
+    '''
+    For each issue data, execute SPECIMIN on a target project: fetch_issue, minimize_issue and verify_issue in turn.
+
+    Parameters:
+        issue ({}): json data associated with an issue    
+        specimin_dist (str): prebuilt Specimin distribution. If None, Specimin is run with `./gradlew run`
+        use_worker (bool): run Specimin in a warm worker JVM instead of a new JVM (requires specimin_dist)
+        use_cache (bool): restore the result of an identical previous evaluation from the result cache
+        tracer (PhaseTracer): records the time spent in each phase
+        timeouts ({issue_id: seconds}): Specimin timeout per issue (see scheduler.plan_issue), TIMEOUT_DURATION if absent
+        use_compile_server (bool): check preservation of javac and Checker Framework issues in warm compiler JVMs
+        shared_gradle (bool): run the Gradle builds in the shared Gradle user home (see gradle_setup)
+        journal (RunJournal): records the completed phases. Phases it holds from an interrupted run are not run again
+    '''
+    if tracer is None:
+        tracer = PhaseTracer(issue_data[JsonKeys.ISSUE_ID.value])
+    fetched = fetch_issue(issue_data, isJarMode, specimin_dist, use_cache, tracer, shared_gradle, journal)
+    if isinstance(fetched, Result):
+        return fetched
+    result = minimize_issue(fetched, specimin_dist, use_worker, tracer, timeouts, journal)
+    return verify_issue(fetched, result, tracer, use_compile_server, shared_gradle)
+
+def check_preservation(issue_data, result: Result, isJarMode = False, specimin_path = "", tracer: PhaseTracer = None, use_compile_server = False, shared_gradle = False) -> Result:
+    '''
+    Check whether the program minimized by Specimin still reproduces the behavior of the target:
+    build/check the minimized program and compare its log with the expected log.
+
+    Parameters:
+        issue_data ({}): json data associated with an issue
+        result (Result): result of a successful Specimin run. Its preservation status is updated.
+        isJarMode (bool): True if Specimin was executed in jar mode
+        specimin_path (str): Specimin directory, used to run Gradle
+        tracer (PhaseTracer): records the time spent in each phase
+        use_compile_server (bool): compile javac and Checker Framework issues in a warm JVM of this process
+        shared_gradle (bool): build gradle issues in the shared Gradle user home, offline once primed
+
+    Returns:
+        Result: 'result' with the preservation status set
+    '''
+    issue_id = issue_data[JsonKeys.ISSUE_ID.value]
+    if tracer is None:
+        tracer = PhaseTracer(issue_id)
+    repo_name = get_repository_name(issue_data[JsonKeys.URL.value])
+    issue_folder_abs_dir = os.path.abspath(issue_folder_dir)
 
     build_system = issue_data.get("build_system", "gradle")
     print(f"build used = {build_system}")
@@ -494,7 +783,8 @@ def performEvaluation(issue_data, isJarMode = False) -> Result:
             log_file = os.path.join(issue_folder_abs_dir, issue_id, specimin_output, repo_name, minimized_program_build_log_file)
 
         copy_command = f"cp {build_gradle_path} {settings_gradle_path} {gradle_files_destination_path}"
-        subprocess.run(copy_command, shell=True)
+        with tracer.span("copy_build_files"):
+            subprocess.run(copy_command, shell=True)
     
         if os.path.exists(log_file):
             os.remove(log_file)
@@ -502,96 +792,34 @@ def performEvaluation(issue_data, isJarMode = False) -> Result:
         target_gradle_script = os.path.join(gradle_files_destination_path, "build.gradle")
         # Open the log file in write mode
         min_prgrm_build_status = None
-        with open(log_file, "w") as log_file_obj:
-            min_prgrm_build_status = subprocess.run(f"./gradlew -b  {target_gradle_script} compileJava", cwd = specimin_path, shell=True, stderr=log_file_obj)
-            print(f"{issue_id} Minimized program gradle build status = {min_prgrm_build_status.returncode}")
+        with tracer.span("compile_minimized", build_system=build_system):
+            if shared_gradle:
+                build_key = gradle_setup.build_key([target_gradle_script, os.path.join(gradle_files_destination_path, "settings.gradle")])
+                min_prgrm_build_status = gradle_setup.run_gradle(get_cache_dir(), "compileJava", build_key, specimin_path, project_dir=gradle_files_destination_path, stderr_sink=OutputSink(log_file))
+            else:
+                min_prgrm_build_status = run_streaming(f"./gradlew -b  {target_gradle_script} compileJava", stderr_sink=OutputSink(log_file), cwd = specimin_path, shell=True)
+        result.add_resource_usage("compile_minimized", min_prgrm_build_status.usage)
+        print(f"{issue_id} Minimized program gradle build status = {min_prgrm_build_status.returncode}")
         if min_prgrm_build_status.returncode == 0:
             print(f"{issue_id} Minimized program gradle build successful. Expected: Fail")
             result.set_preservation_status("FAIL", "Min program is not reproducing issue with modular analyses")
             return result
     else:
-        if build_system != "javac":
-            cf_url = issue_data.get("cf_release_url", "")
-            version = issue_data.get("cf_version", "1.9.13")
-            cf_path = f"checker-framework-{version}"
-            cf_abs_path = os.path.abspath(cf_path)
-            cf_zip = f"{cf_abs_path}.zip"
-            full_url = cf_url + "/" + cf_path + "/" + cf_path + ".zip"
-            if not os.path.exists(cf_zip):
-                download_with_wget(full_url, cf_zip)
-
-            if os.path.exists(cf_zip) and not os.path.exists(cf_abs_path):
-                unzip_file(cf_zip)
-        
-        if build_system == "javac":
-            jdk_template_url = "https://download.oracle.com/java/17/archive/jdk-{version}_{os}-{arch}_bin.tar.gz"
-        else:
-            jdk_template_url = "https://corretto.aws/downloads/latest/amazon-corretto-{version}-{arch}-{os}-jdk.tar.gz"
-        
-        version = issue_data.get(JsonKeys.JAVA_VERSION.value, "11")
-        #TODO: if version is not 8, no need to pull jdk
-        arch = "x64"
-        if platform.machine() == "arm64": #ignoring x86
-            arch = "aarch64"
-        platform_system = platform.system()
-        op = ""  # use this variable to only form the jdk download url
-        if platform_system == linux_system_identifier:
-            op = "linux"
-        elif platform_system == macos_system_identifier:
-            op = "macos"
-        else:
-            result.set_preservation_status("FAIL", f"{platform_system} not supported")
-            raise Exception(f"{platform_system} not supported")
-
-        jdk_url = jdk_template_url.format(version=version, arch=arch, os=op)
-
-        if build_system == "javac":
-            jdk_name = f"jdk-{version}"
-        else:
-            jdk_name = f"amazon-corretto-{version}"
-        
-        jdk_tar_name = f"{jdk_name}.tar.gz"
-        jdk_tar_abs_path = os.path.abspath(jdk_tar_name)
-
-        if not os.path.exists(jdk_tar_abs_path):
-            download_with_wget(jdk_url, jdk_tar_abs_path)
-        
-
-        if platform_system ==linux_system_identifier:
-            extracted_jdk_abs_path = os.path.abspath(jdk_name) #/../amazon-corretto-8
-        elif platform_system == macos_system_identifier:
-            extracted_jdk_abs_path = os.path.abspath(jdk_name) + ".jdk" #//.//amazon-corretto-8.jdk
-        else:
-            raise Exception(f"{platform_system} not supported")
-        
-        if not os.path.exists(extracted_jdk_abs_path):
-            os.makedirs(extracted_jdk_abs_path, exist_ok=True)
-            if os.path.exists(extracted_jdk_abs_path):
-                if build_system == "javac":
-                    with tarfile.open(jdk_tar_abs_path, "r:gz") as tar:
-                            tar.extractall()
-                    set_directory_exec_permission(extracted_jdk_abs_path)
-                else:
-                    extract_and_rename(jdk_tar_abs_path, extracted_jdk_abs_path)
         # https://checkerframework.org/manual/#external-tools
         # using option 3 for CF invokation with downloaded jdk
         #Option 3: Whenever this document tells you to run javac, instead run checker.jar via java (not javac) as in:
         #java -jar "$CHECKERFRAMEWORK/checker/dist/checker.jar" -cp "myclasspath" -processor nullness MyFile.java
-        if platform.system() == linux_system_identifier:
-            if build_system == "javac":
-                java_path = os.path.join(extracted_jdk_abs_path, "bin", "javac")
-            else:
-                java_path = os.path.join(extracted_jdk_abs_path, "bin", "java")
-        elif platform.system() == macos_system_identifier:
-            if build_system == "javac":
-                java_path = os.path.join(extracted_jdk_abs_path, "Contents", "Home", "bin", "javac")
-            else:
-                java_path = os.path.join(extracted_jdk_abs_path, "Contents", "Home", "bin", "java")
-        else:
-            raise Exception(f"{platform_system} not supported")
+        try:
+            toolchain_specs = toolchain.get_issue_requirements(issue_data)
+        except Exception as e: # unsupported platform
+            result.set_preservation_status("FAIL", f"{e}")
+            raise
+        with tracer.span("toolchain"):
+            toolchain_dirs = {spec.kind: toolchain.ensure_toolchain(spec, get_cache_dir()) for spec in toolchain_specs}
+        java_path = toolchain.get_jdk_executable(toolchain_dirs["jdk"], "javac" if build_system == "javac" else "java")
 
         if build_system != "javac":
-            checker_jar_path = os.path.join(cf_abs_path, "checker", "dist", "checker.jar")
+            checker_jar_path = toolchain.get_checker_jar(toolchain_dirs["cf"])
             set_directory_exec_permission(checker_jar_path)
 
         targets = issue_data.get("build_targets", "src/**/*.java")
@@ -622,11 +850,22 @@ def performEvaluation(issue_data, isJarMode = False) -> Result:
                 script.write("#!/bin/sh\n")
                 script.write(compiler_option + "\n")
                 script.write(command_str + "\n")
-            with open(log_file, 'w') as f:
-                st = subprocess.run(["bash", shell_script], stderr=f)
-                if st.returncode == 0:
-                    result.set_preservation_status("FAIL", "Min program is not showing issue with modular analyses")
-                    return result
+            env = compile_server.parse_shell_exports(compiler_option) if use_compile_server else None
+            try:
+                with tracer.span("compile_minimized", build_system=build_system):
+                    served = compile_server.compile_with_server(get_cache_dir(), toolchain_dirs["jdk"], file_paths, log_file, env=env, timeout=COMPILE_TIMEOUT_DURATION) if env is not None else None
+                    if served is None:
+                        st = run_streaming(["bash", shell_script], stderr_sink=OutputSink(log_file), timeout=COMPILE_TIMEOUT_DURATION)
+                        served = (st.returncode, st.usage)
+            except (WorkerTimeout, subprocess.TimeoutExpired):
+                print(f"{issue_id}: compilation of the minimized program timed out")
+                result.set_preservation_status("FAIL", "Compilation timeout")
+                return result
+            returncode, usage = served
+            result.add_resource_usage("compile_minimized", usage)
+            if returncode == 0:
+                result.set_preservation_status("FAIL", "Min program is not showing issue with modular analyses")
+                return result
         else:
             flags = issue_data.get("build_flags", [])
             command = [java_path, '-jar', checker_jar_path]
@@ -635,9 +874,21 @@ def performEvaluation(issue_data, isJarMode = False) -> Result:
             command_str = ' '.join(command)
             print(f"{issue_id}: executing this command to check preservation status: {command_str}")
             try:
-                execute_shell_command_with_logging(command, log_file)
-            except Exception as e:
-                print("Exception:", str(e))
+                with tracer.span("compile_minimized", build_system=build_system):
+                    served = None
+                    if use_compile_server:
+                        served = compile_server.compile_with_server(get_cache_dir(), toolchain_dirs["jdk"], [*flags, *file_paths], log_file, cf_dir=toolchain_dirs["cf"], timeout=COMPILE_TIMEOUT_DURATION)
+                    if served is None:
+                        st = execute_shell_command_with_logging(command, log_file, COMPILE_TIMEOUT_DURATION)
+                        served = (st.returncode, st.usage)
+            except (WorkerTimeout, subprocess.TimeoutExpired):
+                print(f"{issue_id}: checker did not finish in {COMPILE_TIMEOUT_DURATION}s")
+                result.set_preservation_status("FAIL", "Compilation timeout")
+                return result
+            returncode, usage = served
+            result.add_resource_usage("compile_minimized", usage)
+            if returncode == 0:
+                print(f"{issue_id}: checker did not report any error. Expected: Fail")
                 result.set_preservation_status("FAIL", "Min program is not showing issue with modular analyses")
                 return result
         
@@ -648,50 +899,27 @@ def performEvaluation(issue_data, isJarMode = False) -> Result:
         return result
     
     status = False
-    if (JsonKeys.BUG_TYPE.value in issue_data and issue_data[JsonKeys.BUG_TYPE.value] == "crash"):
-        require_stack = issue_data.get("require_stack", False)
-        status = compare_crash_log(expected_log_file, log_file, require_stack)
-    else:
-        try:
-            status = compare_pattern_data(expected_log_file, log_file, issue_data[JsonKeys.BUG_PATTERN.value])
-        except ValueError as e:
-            result.set_preservation_status("FAIL", f"{e}")
-            return result
+    with tracer.span("compare_logs"):
+        if (JsonKeys.BUG_TYPE.value in issue_data and issue_data[JsonKeys.BUG_TYPE.value] == "crash"):
+            require_stack = issue_data.get("require_stack", False)
+            status = compare_crash_log(expected_log_file, log_file, require_stack)
+        else:
+            try:
+                status = compare_pattern_data(expected_log_file, log_file, issue_data[JsonKeys.BUG_PATTERN.value])
+            except ValueError as e:
+                result.set_preservation_status("FAIL", f"{e}")
+                return result
         
     result.set_preservation_status("PASS" if status else "FAIL", "" if status else f"log mismatched between target and min program")
     return result
 
 
 def compare_pattern_data(expected_log_path, actual_log_path, bug_pattern_data):
-    with open(expected_log_path, "r") as file:
-        expected_log_file_content = file.read()
-
-    with open(actual_log_path, "r") as file:
-        actual_log_file_content = file.read()
-
     #Algorithm steps:
     #1.extract data from expected log file. One matched item should be there since only desired log information is in expected log file
-    #2.extract data from build log file. Multiple matched items can be found. 
-    #3.checked if item of st:2 is in items of st:3. if not there immediate return False. otherwise continue
-    #4.return True at method end since no mismatch found.
-    for key in bug_pattern_data:
-        pattern = bug_pattern_data[key]
-        expected_content = re.search(pattern, expected_log_file_content)
-        if not expected_content: #TODO: this should trigger error. it indicates pattern error 
-            raise ValueError(f"{pattern} not matched")  
-        expected_content = expected_content.group(1) 
-        actual_content = re.findall(pattern, actual_log_file_content)
-
-        if key == "file_pattern":
-            expected_content = os.path.basename(expected_content)
-            actual_content = [os.path.basename(item) for item in actual_content]
-
-        if expected_content in actual_content:
-            continue
-        else:
-            return False
-
-    return True
+    #2.extract data from build log file in a single pass. Multiple matched items can be found. 
+    #3.checked if item of st:1 is in items of st:2. if any is missing return False
+    return log_matcher.log_contains_expected(bug_pattern_data, expected_log_path, actual_log_path)
 
 
 def get_exception_data(log_file: str, require_stack = False):
@@ -699,81 +927,264 @@ def get_exception_data(log_file: str, require_stack = False):
     Parse the exception data from the log file
 
     Returns:
-        exception_data (ExceptionData): exception data
-    '''
-
-    with open(log_file, "r") as file:
-        logs = file.read()
-
-    lines_of_logs = logs.split('\n')
-
-    return_data = []
-    cf_crash_line = [line_no for line_no, line in enumerate(lines_of_logs) if line.lstrip().startswith('; The Checker Framework crashed.')]
-    if len(cf_crash_line) == 0:
-        print(f"No crash data in {log_file}")
-        return []
-
-    for line_no in cf_crash_line: # if multiple crash location found, one shoud match exactly with the expected crash information
-        crashed_class_name_line = -1
-        for i in range(line_no, line_no + 5): # should be immediate next line of crash line
-            if lines_of_logs[i].strip().startswith("Compilation unit:"):
-                crashed_class_name_line = i
-                break
-        if crashed_class_name_line == -1:
-            continue  # start looking for next crash location
-        class_name_abs_path = lines_of_logs[crashed_class_name_line].split(" ")[-1]
-        crashed_class_name = os.path.basename(class_name_abs_path)
-
-        exception_line = -1
-        for i in range(crashed_class_name_line, crashed_class_name_line + 5): # should be immediate next line of crash line
-            if lines_of_logs[i].strip().startswith("Exception:"):
-                exception_line = i
-                break
-        exception_stack = [] #compare it with actual stack trace
-        exception_line_str = lines_of_logs[exception_line] #Exception: java.lang.NullPointerException; java.lang.NullPointerException
-        exception_line_sub_str = (exception_line_str[exception_line_str.index("Exception:") + 10:]).split()[0] # java.lang.NullPointerException; java.lang.NullPointerException
-        exception_cause = re.sub(r'^[^a-zA-Z]+|[^a-zA-Z]+$', '', exception_line_sub_str) # java.lang.NullPointerException
-        
-        if not require_stack and crashed_class_name and exception_cause: # if stack is not required, not adding them in exception data. 
-            exception_data = ExceptionData(crashed_class_name, exception_cause)
-            return_data.append(exception_data)
-            continue
-        
-        for i in range(exception_line + 1, exception_line + 6):
-            if lines_of_logs[i].lstrip().startswith("at"):
-                exception_stack.append(lines_of_logs[i].split()[-1].strip())
-        
-        if crashed_class_name and exception_cause and len(exception_stack) > 0:
-            exception_data = ExceptionData(crashed_class_name, exception_cause, exception_stack)
-            return_data.append(exception_data)
+        [ExceptionData]: one entry per crash found in the log
+    '''
+    return list(parse_crash_log(log_file, require_stack))
 
-    return return_data
+def _same_crash(expected_crash_data: ExceptionData, data: ExceptionData, require_stack):
+    if expected_crash_data.exception != data.exception or expected_crash_data.exception_class != data.exception_class:
+        return False
+    return not require_stack or expected_crash_data.stack_trace == data.stack_trace
 
 def compare_crash_log(expected_log_path, actual_log_path, require_stack = True):
     '''
-    Compare the crash log of the minimized program with the expected crash log
+    Compare the crash log of the minimized program with the expected crash log. The actual log is
+    parsed lazily and the comparison stops at the first matching crash.
     '''
+    expected_crash_data = next(parse_crash_log(expected_log_path, require_stack), None) # there should be 1 crash data
+    if expected_crash_data is None:
+        raise ValueError(f"{expected_log_path} invalid. No crash data") # no crash data found in the expected log file
 
-    expected_crash_datas = get_exception_data(expected_log_path, require_stack) # there should be 1 crash data
-    actual_crash_data = get_exception_data(actual_log_path, require_stack)
+    return any(_same_crash(expected_crash_data, data, require_stack) for data in parse_crash_log(actual_log_path, require_stack))
 
-    if not expected_crash_datas:
-        raise ValueError(f"{expected_log_path} invalid. No crash data") # no crash data found in the expected log file
-    
-    expected_crash_data = expected_crash_datas[0]
-        
-    for data in actual_crash_data:
-        if require_stack:
-            if (expected_crash_data.exception == data.exception and
-                expected_crash_data.exception_class == data.exception_class and
-                expected_crash_data.stack_trace == data.stack_trace):
-                return True
-        else:
-            if (expected_crash_data.exception == data.exception and
-                expected_crash_data.exception_class == data.exception_class):
-                return True
-    return False
 
+def _unhandled_exception_result(issue_id, e) -> Result:
+    print(f"{issue_id} Exception: {e}")
+    result = Result(issue_id, "FAIL", f"Unhandled exception occurred: {e}")
+    result.set_preservation_status("FAIL", f"Unhandled exception occurred: {e}")
+    return result
+
+def _complete_issue(result: Result, tracer: PhaseTracer, journal: RunJournal = None) -> Result:
+    result.set_phase_events(tracer.events) # also kept for failed and cached evaluations
+    if journal:
+        journal.issue_completed(result)
+    print((f"{result.name} <========= execution Ends."))
+    return result
+
+def evaluate_issue(issue_data, isJarMode = False, **evaluation_options) -> Result:
+    '''
+    Run performEvaluation for a single issue. Any exception raised while evaluating the issue is
+    converted into a FAIL result so that one broken issue does not abort the whole batch.
+
+    Parameters:
+        issue_data ({}): json data associated with an issue
+        isJarMode (bool): True if Specimin is executed in jar mode
+        evaluation_options: keyword arguments forwarded to performEvaluation
+
+    Returns:
+        Result: execution result of the issue
+    '''
+    issue_id = issue_data[JsonKeys.ISSUE_ID.value]
+    print(f"{issue_id} execution starts =========>")
+    tracer = PhaseTracer(issue_id)
+    journal = evaluation_options.get("journal")
+    if journal:
+        journal.issue_started(issue_id)
+    try:
+        with tracer.span("evaluate", jar_mode=bool(isJarMode)):
+            result = performEvaluation(issue_data, isJarMode, tracer=tracer, **evaluation_options)
+    except Exception as e:
+        result = _unhandled_exception_result(issue_id, e)
+    return _complete_issue(result, tracer, journal)
+
+def evaluate_issues(issues, isJarMode = False, jobs = 1, on_result = None, **evaluation_options) -> list:
+    '''
+    Evaluate a list of issues, optionally in a pool of 'jobs' worker processes. Every issue works in its
+    own ISSUES/<issue_id> directory, so independent issues can be minimized concurrently.
+
+    Parameters:
+        issues ([{}]): json data of the issues to evaluate
+        isJarMode (bool): True if Specimin is executed in jar mode
+        jobs (int): number of issues evaluated concurrently
+        on_result (callable): called with each Result as soon as its issue completes, in the calling process
+        evaluation_options: keyword arguments forwarded to performEvaluation
+
+    Returns:
+        [Result]: one result per issue, in the same order as 'issues' regardless of completion order
+    '''
+    if jobs <= 1 or len(issues) <= 1:
+        results = []
+        for issue in issues:
+            results.append(evaluate_issue(issue, isJarMode, **evaluation_options))
+            if on_result:
+                on_result(results[-1])
+        return results
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(evaluate_issue, issue, isJarMode, **evaluation_options): index for index, issue in enumerate(issues)}
+        try:
+            for future in as_completed(futures):
+                issue_id = issues[futures[future]][JsonKeys.ISSUE_ID.value]
+                try:
+                    result = future.result()
+                except Exception as e: # the worker process itself died, e.g. killed by the OOM killer
+                    print(f"{issue_id} Exception: {e}")
+                    result = Result(issue_id, "FAIL", f"Worker process failed: {e}")
+                    result.set_preservation_status("FAIL", f"Worker process failed: {e}")
+                results[futures[future]] = result
+                if on_result:
+                    on_result(result)
+        except KeyboardInterrupt: # do not start the queued issues while the running ones are stopped
+            for future in futures:
+                future.cancel()
+            raise
+    return [results[index] for index in range(len(issues))]
+
+def fetch_stage(item, isJarMode = False, evaluation_options = None):
+    '''
+    Fetch stage of evaluate_issues_pipelined: fetch_issue on 'item' = (index, issue_data)
+
+    Returns:
+        (True, (index, Result)) if the evaluation ends here, otherwise (False, (index, fetched issue, PhaseTracer))
+    '''
+    index, issue_data = item
+    options = evaluation_options or {}
+    issue_id = issue_data[JsonKeys.ISSUE_ID.value]
+    print(f"{issue_id} execution starts =========>")
+    tracer = PhaseTracer(issue_id)
+    journal = options.get("journal")
+    if journal:
+        journal.issue_started(issue_id)
+    try:
+        fetched = fetch_issue(issue_data, isJarMode, options.get("specimin_dist"), options.get("use_cache", True), tracer, options.get("shared_gradle", False), journal)
+    except Exception as e:
+        fetched = _unhandled_exception_result(issue_id, e)
+    if isinstance(fetched, Result):
+        return True, (index, _complete_issue(fetched, tracer, journal))
+    return False, (index, fetched, tracer)
+
+def minimize_stage(item, evaluation_options = None):
+    '''
+    Minimize stage of evaluate_issues_pipelined: minimize_issue on 'item' = (index, fetched issue, PhaseTracer)
+
+    Returns:
+        (False, (index, fetched issue, Result, PhaseTracer)), or (True, (index, Result)) on a harness error
+    '''
+    index, fetched, tracer = item
+    options = evaluation_options or {}
+    journal = options.get("journal")
+    try:
+        result = minimize_issue(fetched, options.get("specimin_dist"), options.get("use_worker", False), tracer, options.get("timeouts"), journal)
+    except Exception as e:
+        return True, (index, _complete_issue(_unhandled_exception_result(tracer.issue_id, e), tracer, journal))
+    return False, (index, fetched, result, tracer)
+
+def verify_stage(item, evaluation_options = None):
+    '''
+    Verify stage of evaluate_issues_pipelined: verify_issue on 'item' = (index, fetched issue, Result, PhaseTracer)
+
+    Returns:
+        (True, (index, Result))
+    '''
+    index, fetched, result, tracer = item
+    options = evaluation_options or {}
+    try:
+        result = verify_issue(fetched, result, tracer, options.get("use_compile_server", False), options.get("shared_gradle", False))
+    except Exception as e:
+        result = _unhandled_exception_result(tracer.issue_id, e)
+    return True, (index, _complete_issue(result, tracer, options.get("journal")))
+
+def evaluate_issues_pipelined(issues, isJarMode = False, fetch_jobs = 4, minimize_jobs = 1, verify_jobs = 1, queue_size = pipeline.default_queue_size, on_result = None, **evaluation_options):
+    '''
+    Evaluate a list of issues in three pipeline stages with their own pools of worker processes: fetch
+    (clone, pullJar, toolchains, cache lookup), minimize (Specimin) and verify (preservation check). The
+    network-bound fetches do not hold a Specimin slot, and the Specimin JVMs do not wait for compilations.
+
+    Parameters:
+        issues ([{}]): json data of the issues to evaluate
+        isJarMode (bool): True if Specimin is executed in jar mode
+        fetch_jobs, minimize_jobs, verify_jobs (int): number of issues each stage processes concurrently
+        queue_size (int): number of issues waiting in front of the minimize and verify stages
+        on_result (callable): called with each Result as soon as its issue completes, in the calling process
+        evaluation_options: keyword arguments of performEvaluation
+
+    Returns:
+        ([Result] in the same order as 'issues', pipeline statistics (see pipeline.Pipeline.stats))
+    '''
+    results = {}
+    def on_finished(item):
+        index, result = item
+        results[index] = result
+        if on_result:
+            on_result(result)
+    def on_error(stage_name, item, e): # the worker process itself died, e.g. killed by the OOM killer
+        issue_id = issues[item[0]][JsonKeys.ISSUE_ID.value]
+        print(f"{issue_id} Exception in the {stage_name} stage: {e}")
+        result = Result(issue_id, "FAIL", f"Worker process failed: {e}")
+        result.set_preservation_status("FAIL", f"Worker process failed: {e}")
+        return item[0], result
+
+    evaluation_pipeline = pipeline.Pipeline([
+        pipeline.Stage("fetch", functools.partial(fetch_stage, isJarMode=isJarMode, evaluation_options=evaluation_options), fetch_jobs),
+        pipeline.Stage("minimize", functools.partial(minimize_stage, evaluation_options=evaluation_options), minimize_jobs),
+        pipeline.Stage("verify", functools.partial(verify_stage, evaluation_options=evaluation_options), verify_jobs)
+    ], queue_size)
+    evaluation_pipeline.run(list(enumerate(issues)), on_finished, on_error)
+    return [results[index] for index in range(len(issues))], evaluation_pipeline.stats()
+
+
+def get_status_file_paths(isJarMode = False):
+    '''
+    Paths of the files recording the outcome of a run
+
+    Returns:
+        (target status file, preservation status file, runtime file)
+    '''
+    if isJarMode:
+        return (os.path.join(issue_folder_dir, "jar_target_status.json"),
+                os.path.join(issue_folder_dir, "jar_preservation_status.json"),
+                os.path.join(issue_folder_dir, f"jar_{run_time_file_name}"))
+    return (os.path.join(issue_folder_dir, json_status_file_name),
+            os.path.join(issue_folder_dir, preservation_status_file_name),
+            os.path.join(issue_folder_dir, run_time_file_name))
+
+def get_trace_file_paths(isJarMode = False):
+    '''
+    Paths of the phase timing and resource usage files of a run
+
+    Returns:
+        (Chrome trace file, per-issue phase summary file, per-issue resource usage file)
+    '''
+    prefix = "jar_" if isJarMode else ""
+    return (os.path.join(issue_folder_dir, f"{prefix}{trace_file_name}"),
+            os.path.join(issue_folder_dir, f"{prefix}{phase_timing_file_name}"),
+            os.path.join(issue_folder_dir, f"{prefix}{resource_usage_file_name}"))
+
+def load_previous_run(isJarMode = False):
+    '''
+    Load the status and runtime files written by the previous run, if any.
+
+    Returns:
+        (target status {issue_id: status}, preservation status {issue_id: status}, runtime {issue_id: seconds})
+    '''
+    previous = []
+    for file_path in get_status_file_paths(isJarMode):
+        data = read_json_from_file(file_path) if os.path.exists(file_path) else None
+        previous.append(data if isinstance(data, dict) else {})
+    return tuple(previous)
+
+def failed_previously(issue_id, previous_status, previous_preservation_status):
+    '''
+    True if the issue failed minimization or preservation in the previous run, or was not part of it
+    '''
+    if issue_id not in previous_status:
+        return True
+    return previous_status.get(issue_id) != "PASS" or previous_preservation_status.get(issue_id) != "PASS"
+
+def plan_issues(issues, previous_status, previous_preservation_status, isJarMode = False, jobs = 1, time_budget = None):
+    '''
+    Execution order and timeouts of the issues. Issues that failed (or did not run) in the previous run
+    come first so results relevant to a Specimin fix show up early; within each group the issues expected
+    to take longest (from the runtime history) start first.
+
+    Returns:
+        ([IssuePlan] to run in order, [IssuePlan] skipped because they do not fit in 'time_budget')
+    '''
+    history = scheduler.load_history(get_cache_dir())
+    plans = [scheduler.plan_issue(issue, history, issue_folder_dir, isJarMode) for issue in issues]
+    return scheduler.schedule(plans, jobs, time_budget,
+                              is_priority=lambda plan: failed_previously(plan.issue_id, previous_status, previous_preservation_status))
 
 def main():
     '''
@@ -791,11 +1202,36 @@ def main():
     else:
         print("Local Specimin not found. Cloning a Specimin copy")
         clone_specimin(issue_folder_dir, specimin_source_url)
+        specimin_path = os.path.join(issue_folder_dir, specimin_project_name)
 
     parser = argparse.ArgumentParser(description='command line parser')
     parser.add_argument('-j', '--isJarMode', type=bool, help='pass "true" if jar mode execution')
     parser.add_argument('--debug', type=str, help='python main.py --debug #issue to run only that target')
+    parser.add_argument('--jobs', type=int, default=1, help='number of issues to evaluate in parallel')
+    parser.add_argument('--gradle-run', action='store_true', help='run Specimin with ./gradlew run instead of a prebuilt distribution')
+    parser.add_argument('--batch', action='store_true', help='minimize issues in warm Specimin worker JVMs (one per --jobs process)')
+    parser.add_argument('--no-cache', action='store_true', help='always run Specimin, ignoring the result cache')
+    parser.add_argument('--cache-max-size', type=int, default=result_cache.default_max_size_mb, help='result cache size limit in MB')
+    parser.add_argument('--cache-max-age', type=int, default=result_cache.default_max_age_days, help='days after which unused cached results are evicted')
+    parser.add_argument('--rerun-failed', action='store_true', help='only evaluate issues that failed minimization or preservation in the previous run')
+    parser.add_argument('--time-budget', type=int, help='seconds available for the run. Issues not expected to finish in time are skipped')
+    parser.add_argument('--compile-server', action='store_true', help='check preservation of javac and Checker Framework issues in warm compiler JVMs')
+    parser.add_argument('--shared-gradle', action='store_true', help='build gradle issues in a shared Gradle user home with a local Maven mirror, offline once primed, with the build and configuration caches')
+    parser.add_argument('--toolchain-mirror', type=str, help='directory or file:// url with JDK and Checker Framework archives to use instead of downloading')
+    parser.add_argument('--resume', action='store_true', help='continue the interrupted previous run from its journal instead of starting over')
+    parser.add_argument('--pipeline', action='store_true', help='evaluate in separate fetch, minimize and verify stages, each with its own pool of processes')
+    parser.add_argument('--fetch-jobs', type=int, help='issues cloned and fetched concurrently in --pipeline mode (default: max(4, 2 * --jobs))')
+    parser.add_argument('--minimize-jobs', type=int, help='concurrent Specimin runs in --pipeline mode (default: --jobs)')
+    parser.add_argument('--verify-jobs', type=int, help='concurrent preservation checks in --pipeline mode (default: --jobs)')
+    parser.add_argument('--queue-size', type=int, default=pipeline.default_queue_size, help='issues waiting in front of the minimize and verify stages in --pipeline mode')
     args = parser.parse_args()
+    run_started = time.time()
+    use_pipeline = args.pipeline or any(jobs is not None for jobs in (args.fetch_jobs, args.minimize_jobs, args.verify_jobs))
+    specimin_jobs = args.minimize_jobs or args.jobs if use_pipeline else args.jobs
+
+    specimin_dist = None
+    if not args.gradle_run:
+        specimin_dist = prepare_specimin_distribution(specimin_path)
 
     json_file_path = os.path.join("resources", "test_data.json")
     parsed_data = read_json_from_file(json_file_path)
@@ -803,47 +1239,130 @@ def main():
     isJar = args.isJarMode
     debug_target = args.debug
     print("execution mode Jar = ", isJar)
+
+    journal_file = run_journal.get_journal_file(issue_folder_dir, isJar)
+    resume_state = run_journal.load_resume_state(journal_file) if args.resume else None
+    if args.resume and resume_state is None:
+        print(f"No interrupted run in {journal_file}. Starting a new run")
+    elif resume_state:
+        # the selection of the interrupted run, whose status files were not written
+        args.rerun_failed = resume_state.options.get("rerun_failed", False)
+        args.time_budget = resume_state.options.get("time_budget")
+        debug_target = resume_state.options.get("debug")
+        print(f"Resuming the interrupted run: {len(resume_state.results)} of {len(resume_state.issue_ids)} issues completed")
     
-    evaluation_results = []
+    issues = []
+    if parsed_data:
+        issues = [issue for issue in parsed_data if not debug_target or issue["issue_id"] == debug_target]
+
+    previous_status, previous_preservation_status, previous_run_time = load_previous_run(isJar)
+    if args.rerun_failed:
+        issues = [issue for issue in issues if failed_previously(issue["issue_id"], previous_status, previous_preservation_status)]
+        print(f"Re-running {len(issues)} previously failed issues")
+    issue_plans, skipped_plans = plan_issues(issues, previous_status, previous_preservation_status, isJar, specimin_jobs, args.time_budget)
+    for plan in skipped_plans:
+        print(f"{plan.issue_id} skipped: expected runtime {round(plan.expected_runtime)}s does not fit in the time budget")
+    scheduled_issues = [plan.issue_data for plan in issue_plans]
+    timeouts = {plan.issue_id: plan.timeout for plan in issue_plans}
+    journal = RunJournal(journal_file, resume_state.durable_phases if resume_state else None)
+    restored_results = []
+    if resume_state:
+        issues_by_id = {issue["issue_id"]: issue for issue in issues}
+        scheduled_issues = [issues_by_id[issue_id] for issue_id in resume_state.issue_ids if issue_id in issues_by_id]
+        restored_results = [resume_state.results[issue["issue_id"]] for issue in scheduled_issues if issue["issue_id"] in resume_state.results]
+        journal.append({"type": "resume", "resumed": time.time()})
+    else:
+        journal.start_run([issue["issue_id"] for issue in scheduled_issues], vars(args))
+    pending_issues = [issue for issue in scheduled_issues if not resume_state or issue["issue_id"] not in resume_state.results]
+
+    if args.toolchain_mirror:
+        os.environ[toolchain.mirror_env_var] = args.toolchain_mirror # inherited by the --jobs worker processes
+    if not use_pipeline: # the fetch stage of the pipeline downloads them
+        toolchain.prefetch(pending_issues, get_cache_dir(), jobs=max(args.jobs, 4))
+
+    if args.batch and not specimin_dist:
+        print("Batch mode requires a prebuilt Specimin distribution. Running one JVM per issue")
+    report = StreamingReport(len(scheduled_issues), run_history.get_baseline(run_history.get_history_file(), isJar))
+    for result in restored_results:
+        report.addResult(result)
+    report.refresh()
+    evaluation_options = dict(specimin_dist=specimin_dist, use_worker=args.batch, use_cache=not args.no_cache, timeouts=timeouts, use_compile_server=args.compile_server, shared_gradle=args.shared_gradle, journal=journal)
+    try:
+        if use_pipeline:
+            pipeline_results, pipeline_stats = evaluate_issues_pipelined(pending_issues, isJar, args.fetch_jobs or max(4, 2 * args.jobs), specimin_jobs, args.verify_jobs or args.jobs,
+                                                                         args.queue_size, on_result=report.addResult, **evaluation_options)
+            scheduled_results = restored_results + pipeline_results
+            print(pipeline.format_stats(pipeline_stats))
+            pipeline.write_stats(pipeline_stats, os.path.join(issue_folder_dir, f"{'jar_' if isJar else ''}{pipeline.stats_file_name}"))
+        else:
+            scheduled_results = restored_results + evaluate_issues(pending_issues, isJar, args.jobs, on_result=report.addResult, **evaluation_options)
+    except KeyboardInterrupt:
+        print(f"Interrupted. Completed issues and phases are kept in {journal_file}; run again with --resume to continue")
+        sys.exit(130)
+    scheduler.record_runtimes(get_cache_dir(), scheduled_results, isJar)
+    if not args.no_cache:
+        result_cache.evict(get_cache_dir(), args.cache_max_size, args.cache_max_age)
+
+    # report in test_data.json order, whatever order the issues were executed in
+    results_by_id = {result.name: result for result in scheduled_results}
+    evaluation_results = [results_by_id[issue["issue_id"]] for issue in issues if issue["issue_id"] in results_by_id]
+
     json_status: dict[str, str] = {} # Contains PASS/FAIL status of targets to be printed as a json file 
     preservation_status: dict[str, str] = {}
-    if parsed_data:
-        for issue in parsed_data:
-            issue_id = issue["issue_id"]
-            if debug_target and issue_id != debug_target:
-                continue
-            print(f"{issue_id} execution starts =========>")
-            try:
-                result = performEvaluation(issue, isJar)
-            except Exception as e:
-                print(f"Exception: {e}")
-                print("Aborting execution")
-                sys.exit(1)
-            evaluation_results.append(result)
+    run_time: dict[str, int] = {}
+    carried_over = {}
+    for issue in (parsed_data or []):
+        issue_id = issue["issue_id"]
+        if issue_id in results_by_id:
+            result = results_by_id[issue_id]
             json_status[issue_id] = result.status
             preservation_status[issue_id] = result.preservation_status
-            print((f"{issue_id} <========= execution Ends."))            
-
-    report_generator: TableGenerator = TableGenerator(evaluation_results)
-    report_generator.generateTable()
-
-    if isJar:
-        json_status_file = os.path.join(issue_folder_dir, "jar_target_status.json")
-        prev_status_file = os.path.join(issue_folder_dir, "jar_preservation_status.json")
-    else:
-        json_status_file = os.path.join(issue_folder_dir, json_status_file_name)
-        prev_status_file = os.path.join(issue_folder_dir, preservation_status_file_name)
+            if result.run_time is not None:
+                run_time[issue_id] = result.run_time
+        elif (args.rerun_failed or args.time_budget) and issue_id in previous_status: # not re-executed, keep its previous outcome
+            json_status[issue_id] = previous_status[issue_id]
+            preservation_status[issue_id] = previous_preservation_status.get(issue_id, "FAIL")
+            if issue_id in previous_run_time:
+                run_time[issue_id] = previous_run_time[issue_id]
+            carried_over[issue_id] = (json_status[issue_id], preservation_status[issue_id], previous_run_time.get(issue_id))
+
+    report.finish(evaluation_results)
+
+    json_status_file, prev_status_file, run_time_file = get_status_file_paths(isJar)
     # Write JSON data in a file. This can be compared from specimin to verify that the successful # of targets do not get reduced in a PR
     with open(json_status_file, "w") as json_file:
         json.dump(json_status, json_file, indent= 2)
     with open(prev_status_file, "w") as json_file:
         json.dump(preservation_status, json_file, indent= 2)
+    with open(run_time_file, "w") as json_file:
+        json.dump(run_time, json_file, indent= 2)
+
+    # open trace.json in chrome://tracing or https://ui.perfetto.dev
+    trace_file, phase_timing_file, resource_usage_file = get_trace_file_paths(isJar)
+    phase_trace.write_chrome_trace(evaluation_results, trace_file)
+    phase_trace.write_phase_summary(evaluation_results, phase_timing_file)
+    # kept out of target_status.json, whose {issue_id: status} format is compared by the Specimin CI
+    resource_usage = {}
+    for result in evaluation_results:
+        if result.resource_usage:
+            resource_usage[result.name] = {phase: usage.to_dict() for phase, usage in result.resource_usage.items()}
+            resource_usage[result.name]["total"] = result.total_resource_usage().to_dict()
+    with open(resource_usage_file, "w") as json_file:
+        json.dump(resource_usage, json_file, indent= 2)
+
+    # a --debug run, or a run keeping no outcome for the issues it skipped, is not a baseline for the next runs
+    partial = any(issue["issue_id"] not in json_status for issue in (parsed_data or []))
+    run_id = run_history.record_run(run_history.get_history_file(), evaluation_results, isJar, run_started, time.time(),
+                                    specimin_commit=get_git_head(specimin_path), harness_commit=get_git_head("."),
+                                    options=vars(args), carried_over=carried_over, partial=partial)
+    print(f"Run {run_id} recorded in {run_history.get_history_file()}")
+    journal.finish_run()
 
-    global run_time
     print(json.dumps(run_time))
-    mean_runtime = statistics.mean(list(run_time.values()))
-    mean_runtime = round(mean_runtime)
-    print(f"Avg runtime = {mean_runtime}")
+    if run_time:
+        mean_runtime = statistics.mean(list(run_time.values()))
+        mean_runtime = round(mean_runtime)
+        print(f"Avg runtime = {mean_runtime}")
 
     print("\n\n\n\n")
     print(f"issue_name    |    status    |  Fail reason  | preservation_status | preservation reason ")
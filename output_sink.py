@@ -0,0 +1,170 @@
+import codecs
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from resource_usage import ResourceUsage, read_proc_io
+
+read_chunk_size = 64 * 1024
+max_line_length = 4096 # longer lines are truncated in the in-memory head/tail, never in the log file
+max_poll_interval = 0.05 # seconds between two checks of a running child
+
+class OutputSink:
+    '''
+    Receives the output of a child process. Bytes go straight to a log file (if any); only the first
+    'head_lines' and the last 'tail_lines' lines are kept in memory, decoded incrementally.
+    '''
+    def __init__(self, log_path = None, head_lines = 5, tail_lines = 20):
+        self.log_path = log_path
+        self.bytes_written = 0
+        self._file = None
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            self._file = open(log_path, 'wb')
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._head_size = head_lines
+        self._head = []
+        self._tail = deque(maxlen=tail_lines)
+        self._partial = ""
+
+    def _add_line(self, line):
+        if len(self._head) < self._head_size:
+            self._head.append(line)
+        else:
+            self._tail.append(line)
+
+    def write(self, chunk: bytes):
+        if self._file:
+            self._file.write(chunk)
+        self.bytes_written += len(chunk)
+        text = self._partial + self._decoder.decode(chunk)
+        lines = text.split("\n")
+        self._partial = lines.pop()[:max_line_length]
+        for line in lines:
+            self._add_line(line[:max_line_length])
+
+    def close(self):
+        remaining = self._partial + self._decoder.decode(b"", final=True)
+        if remaining:
+            self._add_line(remaining[:max_line_length])
+        self._partial = ""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def head(self):
+        '''
+        first lines of the output
+        '''
+        return "\n".join(self._head)
+
+    def tail(self):
+        '''
+        last lines of the output (not overlapping with head)
+        '''
+        return "\n".join(self._tail)
+
+class StreamedRun:
+    def __init__(self, returncode, stdout: OutputSink, stderr: OutputSink, usage: ResourceUsage = None):
+        '''
+        Constructor of the class
+        Parameters:
+            returncode (int): exit status of the child
+            stdout (OutputSink): sink that received stdout, None if it was inherited
+            stderr (OutputSink): sink that received stderr, None if it was inherited
+            usage (ResourceUsage): CPU, memory and I/O used by the child and its descendants
+        '''
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.usage = usage
+
+def _pump(stream, sink):
+    fd = stream.fileno()
+    while True:
+        chunk = os.read(fd, read_chunk_size)
+        if not chunk:
+            break
+        sink.write(chunk)
+    stream.close()
+
+def _exit_code(wait_status):
+    if os.WIFSIGNALED(wait_status):
+        return -os.WTERMSIG(wait_status)
+    return os.WEXITSTATUS(wait_status)
+
+def _wait_with_usage(process, timeout):
+    '''
+    Wait for 'process' with os.wait4 to get its rusage. /proc/<pid>/io is sampled while the child
+    runs, since it is gone once the child is reaped.
+
+    Returns:
+        (returncode, ResourceUsage)
+    '''
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    interval = 0.001
+    io = None
+    while True:
+        pid, wait_status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            break
+        io = read_proc_io(process.pid) or io
+        if deadline is not None and time.monotonic() >= deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(interval)
+        interval = min(interval * 2, max_poll_interval)
+    process.returncode = _exit_code(wait_status) # reaped here, Popen must not wait again
+    return process.returncode, ResourceUsage.from_rusage(rusage, io)
+
+def _close_sinks(*sinks):
+    for sink in sinks:
+        if sink:
+            sink.close()
+
+def run_streaming(command, stdout_sink = None, stderr_sink = None, cwd = None, timeout = None, shell = False, env = None) -> StreamedRun:
+    '''
+    Run a child process, streaming stdout/stderr into sinks as it runs. A stream without a sink is
+    inherited from the harness. The child runs in its own process group so that a timeout or an interrupt kills
+    the processes it started (e.g. the JVM started by ./gradlew).
+
+    Parameters:
+        command (str or [str]): command to execute
+        stdout_sink (OutputSink): receives stdout, None to inherit
+        stderr_sink (OutputSink): receives stderr, None to inherit
+        cwd (str): working directory
+        timeout (int): seconds before the child is killed and subprocess.TimeoutExpired is raised
+        shell (bool): run 'command' through the shell
+        env ({}): environment of the child
+
+    Returns:
+        StreamedRun: exit status, sinks and resource usage of the child
+    '''
+    try:
+        process = subprocess.Popen(command, cwd=cwd, shell=shell, env=env, start_new_session=True,
+                                   stdout=subprocess.PIPE if stdout_sink else None,
+                                   stderr=subprocess.PIPE if stderr_sink else None)
+    except BaseException: # e.g. the command or cwd does not exist: the log files must still be closed
+        _close_sinks(stdout_sink, stderr_sink)
+        raise
+    pumps = []
+    try:
+        for stream, sink in ((process.stdout, stdout_sink), (process.stderr, stderr_sink)):
+            if sink:
+                pump = threading.Thread(target=_pump, args=(stream, sink), daemon=True)
+                pump.start()
+                pumps.append(pump)
+        returncode, usage = _wait_with_usage(process, timeout)
+    except BaseException: # timeout, but also Ctrl-C or any error of the harness: the child must not outlive the call
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
+        raise
+    finally:
+        for pump in pumps:
+            pump.join()
+        _close_sinks(stdout_sink, stderr_sink)
+    return StreamedRun(returncode, stdout_sink, stderr_sink, usage)
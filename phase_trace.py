@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+trace_pid = 1 # the single process of the written trace, one track (tid) per issue
+
+class PhaseTracer:
+    '''
+    Records the spans of the phases of one issue evaluation (clone, Specimin run, compile, ...).
+    Events use the Chrome trace event format, so they can be loaded in chrome://tracing or Perfetto.
+    '''
+    def __init__(self, issue_id):
+        self.issue_id = issue_id
+        self.events = []
+
+    @contextmanager
+    def span(self, name, **args):
+        '''
+        Record the duration of the with-block as phase 'name'. Extra keyword arguments are stored with the event.
+        '''
+        start = time.time()
+        try:
+            yield
+        finally:
+            end = time.time()
+            self.events.append({
+                "name": name,
+                "cat": "phase",
+                "ph": "X",
+                "ts": round(start * 1e6),
+                "dur": round((end - start) * 1e6),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": dict(args, issue=self.issue_id)
+            })
+
+def summarize(events):
+    '''
+    Total seconds spent per phase
+
+    Returns:
+        {phase: seconds}
+    '''
+    summary = {}
+    for event in events:
+        summary[event["name"]] = round(summary.get(event["name"], 0) + event["dur"] / 1e6, 3)
+    return summary
+
+def write_chrome_trace(results, trace_file):
+    '''
+    Write the phase events of all results as one Chrome trace. Each issue gets its own track. The phases
+    of an issue may run in several processes (--pipeline, --batch), so all tracks are put under one
+    trace process and the real pid and thread of an event are kept in its args.
+
+    Parameters:
+        results ([Result]): evaluated issues
+        trace_file (str): output json file
+    '''
+    trace_events = [{"name": "process_name", "ph": "M", "pid": trace_pid, "tid": 0, "args": {"name": "evaluation"}}]
+    for track, result in enumerate(results, start=1):
+        events = getattr(result, "phase_events", [])
+        if not events:
+            continue
+        trace_events.append({"name": "thread_name", "ph": "M", "pid": trace_pid, "tid": track, "args": {"name": result.name}})
+        for event in events:
+            args = dict(event.get("args", {}), pid=event["pid"], tid=event["tid"])
+            trace_events.append(dict(event, pid=trace_pid, tid=track, args=args))
+    with open(trace_file, 'w') as file:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+
+def write_phase_summary(results, summary_file):
+    '''
+    Write {issue_id: {phase: seconds}} for every result, in result order
+    '''
+    summary = {result.name: summarize(getattr(result, "phase_events", [])) for result in results}
+    with open(summary_file, 'w') as file:
+        json.dump(summary, file, indent=2)
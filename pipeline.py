@@ -0,0 +1,159 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+'''
+Staged execution of the evaluation: every item goes through a chain of stages (fetch, minimize, verify
+in main.py), each run by its own pool of worker processes with its own concurrency limit. Stages are
+connected by bounded queues: a stage does not start an item while the queue of the next stage is full,
+so a slow stage holds back the stages before it instead of piling up their outputs.
+
+A stage function takes an item and returns (finished, item). A finished item leaves the pipeline; the
+others are queued for the next stage. The item leaving the last stage is always finished.
+
+For each stage the pipeline measures the busy time of its workers and the depth of its input queue.
+The stage whose workers are busy for the largest share of the run is the bottleneck: adding workers
+to the other stages does not make the run faster.
+'''
+
+stats_file_name = "pipeline_stats.json"
+default_queue_size = 4 # items waiting in front of each stage after the first
+
+class Stage:
+    def __init__(self, name, function, jobs):
+        '''
+        Constructor of the class
+        Parameters:
+            name (str): stage name, used in the statistics
+            function (callable): picklable function of an item, returning (finished, item)
+            jobs (int): number of items the stage processes concurrently
+        '''
+        self.name = name
+        self.function = function
+        self.jobs = max(1, jobs)
+        self.queue = deque()
+        self.running = 0
+        self.tasks = 0
+        self.busy = 0.0
+        self.max_queue = 0
+        self.queue_area = 0.0 # integral of the queue depth over time
+
+    def to_dict(self, wall_time):
+        return {
+            "jobs": self.jobs,
+            "tasks": self.tasks,
+            "busy_seconds": round(self.busy, 3),
+            "utilization": round(self.busy / (self.jobs * wall_time), 3) if wall_time > 0 else 0.0,
+            "mean_queue": round(self.queue_area / wall_time, 3) if wall_time > 0 else 0.0,
+            "max_queue": self.max_queue
+        }
+
+class Pipeline:
+    def __init__(self, stages, queue_size = default_queue_size):
+        '''
+        Constructor of the class
+        Parameters:
+            stages ([Stage]): stages in execution order
+            queue_size (int): capacity of the queue between two stages
+        '''
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.wall_time = 0.0
+
+    def _has_room(self, index):
+        # items in flight in a stage land in the next queue, so they count against its capacity
+        if index == len(self.stages) - 1:
+            return True
+        return len(self.stages[index + 1].queue) + self.stages[index].running < self.queue_size
+
+    def run(self, items, on_finished, on_error):
+        '''
+        Run 'items' through the stages.
+
+        Parameters:
+            items ([]): inputs of the first stage, started in this order
+            on_finished (callable): called in this process with each finished item
+            on_error (callable): called with (stage name, item, exception) when a worker process dies
+                                 while processing the item; returns the finished item
+        '''
+        self.stages[0].queue.extend(items)
+        executors = [ProcessPoolExecutor(max_workers=stage.jobs) for stage in self.stages]
+        running = {}
+        started = time.time()
+        last_sample = started
+        try:
+            while True:
+                # downstream stages first, so they free the queues the upstream stages wait on
+                for index in reversed(range(len(self.stages))):
+                    stage = self.stages[index]
+                    while stage.queue and stage.running < stage.jobs and self._has_room(index):
+                        item = stage.queue.popleft()
+                        try:
+                            future = executors[index].submit(stage.function, item)
+                        except BrokenProcessPool: # a worker of the stage died: its running items fail, the next ones get a new pool
+                            executors[index].shutdown(wait=False)
+                            executors[index] = ProcessPoolExecutor(max_workers=stage.jobs)
+                            future = executors[index].submit(stage.function, item)
+                        running[future] = (index, item, time.time())
+                        stage.running += 1
+                for stage in self.stages:
+                    stage.max_queue = max(stage.max_queue, len(stage.queue))
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                now = time.time()
+                for stage in self.stages:
+                    stage.queue_area += len(stage.queue) * (now - last_sample)
+                last_sample = now
+                for future in done:
+                    index, item, start = running.pop(future)
+                    stage = self.stages[index]
+                    stage.running -= 1
+                    stage.tasks += 1
+                    stage.busy += now - start
+                    try:
+                        finished, output = future.result()
+                    except Exception as e: # the worker process itself died, e.g. killed by the OOM killer
+                        finished, output = True, on_error(stage.name, item, e)
+                    if finished or index == len(self.stages) - 1:
+                        on_finished(output)
+                    else:
+                        self.stages[index + 1].queue.append(output)
+        except KeyboardInterrupt: # do not start the queued items while the running ones are stopped
+            for future in running:
+                future.cancel()
+            raise
+        finally:
+            self.wall_time = time.time() - started
+            for executor in executors:
+                executor.shutdown(wait=True)
+
+    def stats(self):
+        '''
+        Statistics of the last run
+
+        Returns:
+            {"wall_seconds": ..., "bottleneck": stage name, "stages": {stage name: {jobs, tasks, busy_seconds,
+            utilization, mean_queue, max_queue}}}
+        '''
+        stages = {stage.name: stage.to_dict(self.wall_time) for stage in self.stages}
+        bottleneck = max(stages, key=lambda name: stages[name]["utilization"]) if stages else None
+        return {"wall_seconds": round(self.wall_time, 3), "bottleneck": bottleneck, "stages": stages}
+
+def format_stats(stats):
+    '''
+    Table of the pipeline statistics, one line per stage
+    '''
+    lines = [f"{'stage':<10} {'jobs':>4} {'tasks':>6} {'busy (s)':>9} {'util':>6} {'mean queue':>10} {'max queue':>9}"]
+    for name, stage in stats["stages"].items():
+        lines.append(f"{name:<10} {stage['jobs']:>4} {stage['tasks']:>6} {stage['busy_seconds']:>9.1f} {stage['utilization']:>6.0%} {stage['mean_queue']:>10.2f} {stage['max_queue']:>9}")
+    lines.append(f"bottleneck: {stats['bottleneck']} (wall time {stats['wall_seconds']:.1f}s)")
+    return "\n".join(lines)
+
+def write_stats(stats, stats_file):
+    os.makedirs(os.path.dirname(stats_file) or ".", exist_ok=True)
+    with open(stats_file, "w") as file:
+        json.dump(stats, file, indent=2)
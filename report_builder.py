@@ -1,11 +1,30 @@
 from string import Template
+import html
+import math
 import os
+import time
+import phase_trace
+import run_history
+
+report_file = os.path.join('ISSUES', 'output.html')
+page_size = 500 # rows per page; page 1 is output.html, page k is output-k.html
+refresh_interval = 2 # seconds between two refreshes of the report while issues are evaluated
+reported_phases = ["clone", "pull_dependencies", "specimin", "compile_minimized", "compare_logs"]
 
 class TableGenerator:
-    def __init__ (self, data_list):
+    def __init__ (self, data_list, baseline = None, report_path = report_file):
+        '''
+        Constructor of the class
+        Parameters:
+            data_list ([Result]): evaluated issues
+            baseline ({issue_id: (status, preservation_status, run_time_ms)}): issues of the run compared with
+            report_path (str): html file of the first page
+        '''
         self._table_data_list = data_list
+        self._baseline = baseline or {}
+        self._report_path = report_path
+
 
-    
     def _getHTMLTemplate(self):
         html_template = '''
                 <!DOCTYPE html>
@@ -13,11 +32,14 @@ class TableGenerator:
                 <head>
                     <meta charset="UTF-8">
                     <meta name="viewport" content="width=device-width, initial-scale=1.0">
+                    $refresh
                     <title>Specimin Evalutaion Result</title>
                 </head>
                 <body>
 
                 <h2>SPECIMIN Evalutaion Result</h2>
+                $summary
+                $navigation
 
                 <table border="1">
                     <thead>
@@ -25,30 +47,162 @@ class TableGenerator:
                             <th>Issue Name</th>
                             <th>Status</th>
                             <th>Reason</th>
+                            <th>Preservation</th>
+                            <th>Runtime (s)</th>
+                            <th>Delta vs baseline (ms)</th>
+                            <th>Phases (s)</th>
+                            <th>CPU user/sys (s)</th>
+                            <th>Peak RSS (MB)</th>
+                            <th>I/O read/write (MB)</th>
                         </tr>
                     </thead>
                     <tbody>
                         $body
                     </tbody>
                 </table>
+                $navigation
 
                 </body>
                 </html>
             '''
         return html_template
 
-    def generateTable(self):
-        table_rows = ''
-        for item in self._table_data_list:
-            table_rows += f'''
+    def _getUsageCells(self, item):
+        usage = item.total_resource_usage()
+        if usage is None:
+            return "<td></td><td></td><td></td>"
+        mb = 1024 * 1024
+        return (f"<td>{usage.user_cpu:.1f} / {usage.system_cpu:.1f}</td>"
+                f"<td>{usage.max_rss_kb / 1024:.0f}</td>"
+                f"<td>{usage.read_bytes / mb:.1f} / {usage.write_bytes / mb:.1f}</td>")
+
+    def _getPhaseCell(self, item):
+        phases = phase_trace.summarize(getattr(item, "phase_events", []))
+        return "<td>" + ", ".join(f"{phase} {phases[phase]:.1f}" for phase in reported_phases if phase in phases) + "</td>"
+
+    def _getDeltaCell(self, item):
+        previous = self._baseline.get(item.name)
+        run_time = run_history.run_time_ms(item)
+        if previous is None:
+            return "<td>new</td>"
+        cell = f"{run_time - previous[2]:+d}" if run_time is not None and previous[2] is not None else ""
+        if (previous[0], previous[1]) != (item.status, item.preservation_status):
+            cell += f" (was {html.escape(previous[0])}/{html.escape(previous[1])})"
+        return f"<td>{cell}</td>"
+
+    def _getRow(self, item):
+        reason = html.escape(item.reason or "")
+        preservation_reason = html.escape(item.preservation_status_reason or "")
+        run_time = "" if item.run_time is None else item.run_time
+        return f'''
                 <tr>
-                    <td>{item.name}</td>
-                    <td>{item.status}</td>
-                    <td><a href="{item.reason.replace("ISSUES/", "")}">{item.reason}</a></td>
+                    <td>{html.escape(item.name)}</td>
+                    <td>{html.escape(item.status)}</td>
+                    <td><a href="{html.escape((item.reason or "").replace("ISSUES/", ""), quote=True)}">{reason}</a></td>
+                    <td title="{preservation_reason}">{html.escape(item.preservation_status)}</td>
+                    <td>{run_time}</td>
+                    {self._getDeltaCell(item)}
+                    {self._getPhaseCell(item)}
+                    {self._getUsageCells(item)}
                 </tr>
             '''
+
+    def _getPagePath(self, page):
+        if page == 1:
+            return self._report_path
+        root, extension = os.path.splitext(self._report_path)
+        return f"{root}-{page}{extension}"
+
+    def _getNavigation(self, page, page_count):
+        if page_count <= 1:
+            return ""
+        links = []
+        if page > 1:
+            links.append(f'<a href="{os.path.basename(self._getPagePath(page - 1))}">previous</a>')
+        links.append(f"page {page} of {page_count}")
+        if page < page_count:
+            links.append(f'<a href="{os.path.basename(self._getPagePath(page + 1))}">next</a>')
+        return "<p>" + " | ".join(links) + "</p>"
+
+    def _getSummary(self, results, total = None, running = False):
+        minimized = sum(1 for item in results if item.status == "PASS")
+        preserved = sum(1 for item in results if item.preservation_status == "PASS")
+        evaluated = f"{len(results)} of {total}" if total is not None else f"{len(results)}"
+        progress = " (in progress)" if running else ""
+        return f"<p>{evaluated} issues evaluated{progress}: {minimized} minimized, {preserved} preserved</p>"
+
+    def _writePage(self, page, page_count, rows, summary = "", running = False):
+        '''
+        Write one page atomically, so that a browser never sees a partial page
+        '''
         template = Template(self._getHTMLTemplate())
-        output_html = template.safe_substitute(body=table_rows)
-        with open('ISSUES/output.html', 'w') as file:
+        output_html = template.safe_substitute(body="".join(rows), summary=summary,
+                                               navigation=self._getNavigation(page, page_count),
+                                               refresh='<meta http-equiv="refresh" content="10">' if running else "")
+        path = self._getPagePath(page)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.tmp", 'w') as file:
             file.write(output_html)
-        print("HTML generated successfully.")
\ No newline at end of file
+        os.replace(f"{path}.tmp", path)
+
+    def _removeStalePages(self, page_count):
+        # pages of a previous, larger report
+        page = page_count + 1
+        while os.path.exists(self._getPagePath(page)):
+            os.remove(self._getPagePath(page))
+            page += 1
+
+    def generateTable(self):
+        rows = [self._getRow(item) for item in self._table_data_list]
+        page_count = max(1, math.ceil(len(rows) / page_size))
+        summary = self._getSummary(self._table_data_list)
+        for page in range(1, page_count + 1):
+            self._writePage(page, page_count, rows[(page - 1) * page_size:page * page_size], summary if page == 1 else "")
+        self._removeStalePages(page_count)
+        print("HTML generated successfully.")
+
+class StreamingReport(TableGenerator):
+    '''
+    Report written while the issues are evaluated. Each result is rendered once when it completes; the
+    page it lands on (and the summary on the first page) is refreshed atomically, at most every
+    'refresh_interval' seconds, so the cost of a refresh does not grow with the number of issues.
+    '''
+    def __init__(self, total, baseline = None, report_path = report_file):
+        '''
+        Constructor of the class
+        Parameters:
+            total (int): number of issues that will be evaluated
+            baseline ({issue_id: (status, preservation_status, run_time_ms)}): issues of the run compared with
+            report_path (str): html file of the first page
+        '''
+        super().__init__([], baseline, report_path)
+        self._total = total
+        self._rows = []
+        self._dirty_pages = set()
+        self._last_refresh = 0
+
+    def _pageCount(self):
+        return max(1, math.ceil(max(self._total, len(self._rows)) / page_size))
+
+    def addResult(self, result):
+        self._table_data_list.append(result)
+        self._rows.append(self._getRow(result))
+        self._dirty_pages.update((1, (len(self._rows) - 1) // page_size + 1))
+        if time.monotonic() - self._last_refresh >= refresh_interval:
+            self.refresh()
+
+    def refresh(self):
+        page_count = self._pageCount()
+        summary = self._getSummary(self._table_data_list, self._total, running=True)
+        for page in sorted(self._dirty_pages):
+            self._writePage(page, page_count, self._rows[(page - 1) * page_size:page * page_size],
+                            summary if page == 1 else "", running=True)
+        self._dirty_pages.clear()
+        self._last_refresh = time.monotonic()
+
+    def finish(self, results):
+        '''
+        Write the final report, with the results in the given order instead of the completion order
+        '''
+        self._table_data_list = list(results)
+        self.generateTable()
@@ -0,0 +1,105 @@
+import os
+import platform
+
+class ResourceUsage:
+    def __init__(self, user_cpu = 0.0, system_cpu = 0.0, max_rss_kb = 0, read_bytes = 0, write_bytes = 0):
+        '''
+        Constructor of the class
+        Parameters:
+            user_cpu (float): seconds of user CPU time
+            system_cpu (float): seconds of system CPU time
+            max_rss_kb (int): peak resident set size in KB
+            read_bytes (int): bytes read from storage
+            write_bytes (int): bytes written to storage
+        '''
+        self.user_cpu = user_cpu
+        self.system_cpu = system_cpu
+        self.max_rss_kb = max_rss_kb
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+
+    @classmethod
+    def from_rusage(cls, rusage, io = None):
+        '''
+        Usage of a child process from the rusage returned by os.wait4. It covers the child and the
+        descendants it waited for (e.g. the JVM started by ./gradlew).
+
+        Parameters:
+            rusage (resource.struct_rusage): rusage of the child
+            io ((int, int)): (read bytes, write bytes) sampled from /proc/<pid>/io, if available
+        '''
+        max_rss_kb = rusage.ru_maxrss
+        if platform.system() == "Darwin": # bytes on macOS, KB on Linux
+            max_rss_kb = max_rss_kb // 1024
+        if io is None: # no /proc: fall back to block operations (512 byte blocks)
+            io = (rusage.ru_inblock * 512, rusage.ru_oublock * 512)
+        return cls(round(rusage.ru_utime, 3), round(rusage.ru_stime, 3), max_rss_kb, io[0], io[1])
+
+    def add(self, other):
+        '''
+        Combine the usage of two processes: times and bytes are summed, the peak RSS is the larger one
+        '''
+        return ResourceUsage(round(self.user_cpu + other.user_cpu, 3), round(self.system_cpu + other.system_cpu, 3),
+                             max(self.max_rss_kb, other.max_rss_kb), self.read_bytes + other.read_bytes, self.write_bytes + other.write_bytes)
+
+    def to_dict(self):
+        return {
+            "user_cpu": self.user_cpu,
+            "system_cpu": self.system_cpu,
+            "max_rss_kb": self.max_rss_kb,
+            "read_bytes": self.read_bytes,
+            "write_bytes": self.write_bytes
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("user_cpu", 0.0), data.get("system_cpu", 0.0), data.get("max_rss_kb", 0), data.get("read_bytes", 0), data.get("write_bytes", 0))
+
+def read_proc_io(pid):
+    '''
+    Storage I/O of a live process, including the children it already waited for
+
+    Returns:
+        (read bytes, write bytes), None if /proc/<pid>/io is unavailable (macOS, exited process, ...)
+    '''
+    try:
+        with open(f"/proc/{pid}/io", 'r') as file:
+            fields = dict(line.split(":", 1) for line in file if ":" in line)
+        return int(fields["read_bytes"]), int(fields["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def sample_process(pid):
+    '''
+    Cumulative usage of a live process from /proc. Used for long-lived processes that are never
+    waited for, such as the Specimin worker JVM.
+
+    Returns:
+        ResourceUsage, None if /proc is unavailable
+    '''
+    io = read_proc_io(pid)
+    if io is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as file:
+            stat_fields = file.read().rsplit(")", 1)[1].split()
+        max_rss_kb = 0
+        with open(f"/proc/{pid}/status", 'r') as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    max_rss_kb = int(line.split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    # fields after the command name start at field 3 (state); utime and stime are fields 14 and 15
+    return ResourceUsage(int(stat_fields[11]) / ticks, int(stat_fields[12]) / ticks, max_rss_kb, io[0], io[1])
+
+def usage_between(before, after):
+    '''
+    Usage of a process between two samples of sample_process. The peak RSS is the peak of the process
+    so far, /proc does not provide a per-interval peak.
+    '''
+    if before is None or after is None:
+        return None
+    return ResourceUsage(round(after.user_cpu - before.user_cpu, 3), round(after.system_cpu - before.system_cpu, 3),
+                         after.max_rss_kb, after.read_bytes - before.read_bytes, after.write_bytes - before.write_bytes)
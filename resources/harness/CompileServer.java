@@ -0,0 +1,150 @@
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.io.PrintWriter;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+
+/**
+ * Long-lived compile server used by the evaluation harness (compile_server.py) for the preservation
+ * check of javac and Checker Framework issues.
+ *
+ * <p>Modes:
+ *
+ * <ul>
+ *   <li>{@code CompileServer javac}: jobs are javac arguments.
+ *   <li>{@code CompileServer checker <checker.jar>}: jobs are {@code java -jar checker.jar}
+ *       arguments. The Checker Framework's CheckerMain turns them into a javac command; the javac
+ *       part is run in this JVM, which was started with the JVM options of that command.
+ *   <li>{@code CompileServer probe <checker.jar>}: print the java command CheckerMain builds,
+ *       without the java executable, one argument per line, and exit. The harness starts the
+ *       checker server with its JVM options (and javac.jar on the classpath for "-jar javac.jar").
+ * </ul>
+ *
+ * <p>The protocol is the one of SpeciminWorker: one tab separated job per line on stdin, {@code
+ * jobId, logFile, args...}; the diagnostics go to logFile and {@code jobId<TAB>status} is written
+ * to stdout, where status is the javac exit status, or 255 if the job must be run in a new JVM.
+ */
+public class CompileServer {
+  static final int FALLBACK = 255;
+  static final String JAVAC_MAIN = "com.sun.tools.javac.Main";
+  static final List<String> PROBE_ARGS = Arrays.asList("-processor", "Probe", "Probe.java");
+
+  public static void main(String[] args) throws Exception {
+    if (args.length < 1 || (!args[0].equals("javac") && args.length != 2)) {
+      System.err.println("usage: CompileServer javac | checker <checker.jar> | probe <checker.jar>");
+      System.exit(2);
+    }
+    File checkerJar = args.length > 1 ? new File(args[1]) : null;
+    if (args[0].equals("probe")) {
+      List<String> command = checkerExecArguments(checkerJar, PROBE_ARGS);
+      for (String argument : command.subList(1, command.size())) {
+        System.out.println(argument);
+      }
+      return;
+    }
+    List<String> serverJvmOptions =
+        checkerJar != null ? jvmOptions(checkerExecArguments(checkerJar, PROBE_ARGS)) : null;
+    Method compile =
+        Class.forName(JAVAC_MAIN).getMethod("compile", String[].class, PrintWriter.class);
+
+    PrintStream protocolOut = System.out;
+    PrintStream originalErr = System.err;
+    BufferedReader in =
+        new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+    String line;
+    while ((line = in.readLine()) != null) {
+      if (line.isEmpty()) {
+        continue;
+      }
+      String[] fields = line.split("\t", -1);
+      String jobId = fields[0];
+      List<String> jobArgs = Arrays.asList(Arrays.copyOfRange(fields, 2, fields.length));
+      int status = FALLBACK;
+      try (PrintStream log = new PrintStream(new FileOutputStream(fields[1]), true, "UTF-8")) {
+        List<String> javacArgs =
+            checkerJar == null ? jobArgs : checkerJavacArgs(checkerJar, jobArgs, serverJvmOptions);
+        if (javacArgs != null) {
+          printPickedUpOptions(log);
+          System.setOut(log);
+          System.setErr(log);
+          PrintWriter writer = new PrintWriter(log, true);
+          try {
+            status = (Integer) compile.invoke(null, javacArgs.toArray(new String[0]), writer);
+          } catch (InvocationTargetException e) {
+            e.getCause().printStackTrace(log);
+            status = 4; // javac's "abnormal exit"
+          } finally {
+            writer.flush();
+            System.setOut(protocolOut);
+            System.setErr(originalErr);
+          }
+        }
+      } catch (IOException | ReflectiveOperationException | RuntimeException e) {
+        e.printStackTrace(originalErr);
+        status = FALLBACK;
+      }
+      protocolOut.println(jobId + "\t" + status);
+      protocolOut.flush();
+    }
+  }
+
+  /** The line a new JVM prints to stderr when these variables are set, as in a cold run's log. */
+  static void printPickedUpOptions(PrintStream log) {
+    for (String variable : new String[] {"JAVA_TOOL_OPTIONS", "_JAVA_OPTIONS"}) {
+      String value = System.getenv(variable);
+      if (value != null) {
+        log.println("Picked up " + variable + ": " + value);
+      }
+    }
+  }
+
+  @SuppressWarnings("unchecked")
+  static List<String> checkerExecArguments(File checkerJar, List<String> args)
+      throws ReflectiveOperationException {
+    Class<?> checkerMain = Class.forName("org.checkerframework.framework.util.CheckerMain");
+    Object main =
+        checkerMain
+            .getConstructor(File.class, List.class)
+            .newInstance(checkerJar, new ArrayList<>(args));
+    return (List<String>) checkerMain.getMethod("getExecArguments").invoke(main);
+  }
+
+  /**
+   * The javac arguments of a checker job, or null if the job needs JVM options this server was not
+   * started with.
+   */
+  static List<String> checkerJavacArgs(
+      File checkerJar, List<String> jobArgs, List<String> serverJvmOptions)
+      throws ReflectiveOperationException {
+    List<String> command = checkerExecArguments(checkerJar, jobArgs);
+    if (!jvmOptions(command).equals(serverJvmOptions)) {
+      return null;
+    }
+    int main = mainIndex(command);
+    int mainLength = command.get(main).equals("-jar") ? 2 : 1;
+    return command.subList(main + mainLength, command.size());
+  }
+
+  /** Index of the javac main in a java command: the main class, or "-jar" followed by javac.jar. */
+  static int mainIndex(List<String> command) {
+    for (int i = 1; i < command.size(); i++) {
+      if (command.get(i).equals(JAVAC_MAIN) || command.get(i).equals("-jar")) {
+        return i;
+      }
+    }
+    throw new IllegalArgumentException("no javac main in " + command);
+  }
+
+  /** The options between the java executable and the javac main. */
+  static List<String> jvmOptions(List<String> command) {
+    return new ArrayList<>(command.subList(1, mainIndex(command)));
+  }
+}
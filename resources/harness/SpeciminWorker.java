@@ -0,0 +1,63 @@
+import java.io.BufferedReader;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.util.Arrays;
+
+/**
+ * Long-lived Specimin worker used by the evaluation harness (specimin_worker.py).
+ *
+ * <p>Reads one job per line from stdin. A job is a tab separated line: {@code jobId, logFile,
+ * specimin args...}. The main method of the class given as the first program argument is invoked
+ * in this JVM with the job's arguments while System.out and System.err are redirected to logFile.
+ * After each job one line {@code jobId<TAB>status} is written to the original stdout, where status
+ * is 0 on success and 1 if Specimin threw.
+ */
+public class SpeciminWorker {
+  public static void main(String[] args) throws Exception {
+    if (args.length != 1) {
+      System.err.println("usage: SpeciminWorker <specimin main class>");
+      System.exit(2);
+    }
+    Method speciminMain = Class.forName(args[0]).getMethod("main", String[].class);
+    PrintStream protocolOut = System.out;
+    PrintStream originalErr = System.err;
+    BufferedReader in =
+        new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+    String line;
+    while ((line = in.readLine()) != null) {
+      if (line.isEmpty()) {
+        continue;
+      }
+      String[] fields = line.split("\t", -1);
+      String jobId = fields[0];
+      String[] jobArgs = Arrays.copyOfRange(fields, 2, fields.length);
+      int status = 0;
+      try (PrintStream log = new PrintStream(new FileOutputStream(fields[1]), true, "UTF-8")) {
+        System.setOut(log);
+        System.setErr(log);
+        try {
+          speciminMain.invoke(null, (Object) jobArgs);
+        } catch (InvocationTargetException e) {
+          e.getCause().printStackTrace(log);
+          status = 1;
+        } catch (Throwable e) {
+          e.printStackTrace(log);
+          status = 1;
+        } finally {
+          System.setOut(protocolOut);
+          System.setErr(originalErr);
+        }
+      } catch (IOException e) {
+        e.printStackTrace(originalErr);
+        status = 1;
+      }
+      protocolOut.println(jobId + "\t" + status);
+      protocolOut.flush();
+    }
+  }
+}
@@ -0,0 +1,178 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+import time
+from Result import Result
+from file_lock import file_lock
+
+result_cache_dir_name = 'results'
+entry_file_name = 'entry.json'
+tree_dir_name = 'tree'
+error_file_name = 'error.txt'
+cache_format_version = 1
+default_max_size_mb = 2048
+default_max_age_days = 30
+# harness modules that decide a cached result: how Specimin is run and how its output is verified
+harness_modules = ["main.py", "Result.py", "specimin_distribution.py", "specimin_worker.py", "toolchain.py", "gradle_setup.py",
+                   "compile_server.py", "log_matcher.py", "crash_log_parser.py", "exception_data.py"]
+
+@functools.lru_cache(maxsize=None)
+def get_harness_version(harness_dir = os.path.dirname(os.path.abspath(__file__))):
+    '''
+    Hash of the harness modules that produce a result. A fix to the preservation check, the log matcher
+    or the crash log parser changes it, so that verdicts of the previous code are not served again.
+
+    Returns:
+        version (str): hex digest
+    '''
+    digest = hashlib.sha256()
+    for module in harness_modules:
+        digest.update(module.encode("utf-8") + b"\0")
+        module_path = os.path.join(harness_dir, module)
+        if os.path.exists(module_path):
+            with open(module_path, 'rb') as file:
+                digest.update(file.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def compute_key(specimin_version, target_commit, issue_data, isJarMode, jar_path):
+    '''
+    Content address of one evaluation. Everything Specimin and the preservation check depend on is part
+    of the key: the Specimin version, the harness code (see get_harness_version), the checked out target
+    commit, the issue definition (targets, root_dir, build system, patterns, ...), the execution mode and
+    the resolved jar path.
+
+    Parameters:
+        specimin_version (str): Specimin commit (see specimin_distribution.get_specimin_version_key)
+        target_commit (str): commit of the target repository
+        issue_data ({}): json data associated with an issue
+        isJarMode (bool): True if Specimin is executed in jar mode
+        jar_path (str): resolved --jarPath of the Specimin invocation
+
+    Returns:
+        key (str): hex digest, None if the Specimin or target version is unknown
+    '''
+    if not specimin_version or not target_commit:
+        return None
+    key_data = {
+        "format": cache_format_version,
+        "specimin": specimin_version,
+        "harness": get_harness_version(),
+        "target_commit": target_commit,
+        "issue": issue_data, # contains the targets and root_dir
+        "jar_mode": bool(isJarMode),
+        "jar_path": jar_path
+    }
+    canonical = json.dumps(key_data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _entry_dir(cache_dir, key):
+    return os.path.join(cache_dir, result_cache_dir_name, key[:2], key)
+
+def lookup(cache_dir, key, output_dir, error_file = None):
+    '''
+    Restore a cached evaluation. On a hit the minimized program tree is copied back to 'output_dir'.
+
+    Parameters:
+        cache_dir (str): root directory of the harness caches
+        key (str): key returned by compute_key
+        output_dir (str): ISSUES/<issue_id>/output or jar_output
+        error_file (str): ISSUES/<issue_id>/<issue_id>_error.txt, restored if it was cached
+
+    Returns:
+        Result: the cached result, None on a miss
+    '''
+    entry_dir = _entry_dir(cache_dir, key)
+    entry_file = os.path.join(entry_dir, entry_file_name)
+    with file_lock(f"{entry_dir}.lock"):
+        if not os.path.exists(entry_file):
+            return None
+        with open(entry_file, 'r') as file:
+            entry = json.load(file)
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        cached_tree = os.path.join(entry_dir, tree_dir_name)
+        if os.path.exists(cached_tree):
+            shutil.copytree(cached_tree, output_dir, symlinks=True)
+        cached_error = os.path.join(entry_dir, error_file_name)
+        if error_file and os.path.exists(cached_error):
+            shutil.copy2(cached_error, error_file)
+        os.utime(entry_file) # last access time used by evict
+    return Result.from_dict(entry["result"])
+
+def store(cache_dir, key, result: Result, output_dir, error_file = None):
+    '''
+    Store the result and minimized program tree of an evaluation.
+
+    Parameters:
+        cache_dir (str): root directory of the harness caches
+        key (str): key returned by compute_key
+        result (Result): result of the evaluation
+        output_dir (str): ISSUES/<issue_id>/output or jar_output
+        error_file (str): Specimin error output of a failed run, if any
+    '''
+    entry_dir = _entry_dir(cache_dir, key)
+    with file_lock(f"{entry_dir}.lock"):
+        tmp_dir = f"{entry_dir}.tmp"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        if os.path.exists(output_dir):
+            shutil.copytree(output_dir, os.path.join(tmp_dir, tree_dir_name), symlinks=True)
+        if error_file and os.path.exists(error_file):
+            shutil.copy2(error_file, os.path.join(tmp_dir, error_file_name))
+        with open(os.path.join(tmp_dir, entry_file_name), 'w') as file:
+            json.dump({"key": key, "created": time.time(), "result": result.to_dict()}, file, indent=2)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.rename(tmp_dir, entry_dir)
+
+def _dir_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(root, name)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size
+
+def evict(cache_dir, max_size_mb = default_max_size_mb, max_age_days = default_max_age_days):
+    '''
+    Remove entries not used for 'max_age_days', then the least recently used entries until the cache
+    is smaller than 'max_size_mb'.
+    '''
+    root = os.path.join(cache_dir, result_cache_dir_name)
+    if not os.path.isdir(root):
+        return
+    entries = []
+    for prefix in os.listdir(root):
+        prefix_dir = os.path.join(root, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for name in os.listdir(prefix_dir):
+            entry_file = os.path.join(prefix_dir, name, entry_file_name)
+            if os.path.exists(entry_file):
+                entries.append((os.path.getmtime(entry_file), os.path.join(prefix_dir, name)))
+    entries.sort() # least recently used first
+
+    now = time.time()
+    kept = []
+    removed = 0
+    for last_used, entry_dir in entries:
+        if now - last_used > max_age_days * 24 * 3600:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            removed += 1
+        else:
+            kept.append((entry_dir, _dir_size(entry_dir)))
+
+    total_size = sum(size for _, size in kept)
+    for entry_dir, size in kept:
+        if total_size <= max_size_mb * 1024 * 1024:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_size -= size
+        removed += 1
+    if removed:
+        print(f"Result cache: evicted {removed} entries")
@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import closing
+import phase_trace
+
+'''
+History of the evaluation runs in a SQLite database (ISSUES/run_history.sqlite by default): one row per
+run (mode, Specimin and harness commits, options) and, per run and issue, the Result fields, the phase
+timings and the resource usage. Durations are stored in milliseconds. A run that does not cover every
+issue (e.g. --debug) is partial: it is listed, but it is never the baseline of a report or of the
+default diff and check.
+
+usage:
+    python run_history.py list
+    python run_history.py diff [BASE_RUN HEAD_RUN] [--jar]
+    python run_history.py check [BASE_RUN HEAD_RUN] [--jar]   # exit 1 if fewer targets succeed in HEAD_RUN
+Without run ids, the two latest complete runs of the mode are compared.
+'''
+
+default_history_file = os.path.join("ISSUES", "run_history.sqlite")
+history_env_var = "SPECIMIN_EVAL_HISTORY"
+
+schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL NOT NULL,
+    jar_mode INTEGER NOT NULL,
+    specimin_commit TEXT NOT NULL,
+    harness_commit TEXT NOT NULL,
+    host TEXT NOT NULL,
+    options TEXT NOT NULL,
+    partial INTEGER NOT NULL DEFAULT 0 -- some issues neither evaluated nor carried over
+);
+CREATE TABLE IF NOT EXISTS issue_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    issue_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    preservation_status TEXT NOT NULL,
+    preservation_reason TEXT NOT NULL,
+    run_time_ms INTEGER,
+    from_cache INTEGER NOT NULL,
+    carried_over INTEGER NOT NULL, -- not evaluated in this run, outcome kept from the previous run
+    PRIMARY KEY (run_id, issue_id)
+);
+CREATE INDEX IF NOT EXISTS issue_results_by_issue ON issue_results (issue_id, run_id);
+CREATE TABLE IF NOT EXISTS phase_timings (
+    run_id INTEGER NOT NULL,
+    issue_id TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    PRIMARY KEY (run_id, issue_id, phase)
+);
+CREATE TABLE IF NOT EXISTS resource_usage (
+    run_id INTEGER NOT NULL,
+    issue_id TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    user_cpu REAL,
+    system_cpu REAL,
+    max_rss_kb INTEGER,
+    read_bytes INTEGER,
+    write_bytes INTEGER,
+    PRIMARY KEY (run_id, issue_id, phase)
+);
+"""
+
+def get_history_file():
+    '''
+    $SPECIMIN_EVAL_HISTORY if defined, otherwise ISSUES/run_history.sqlite
+    '''
+    return os.environ.get(history_env_var, default_history_file)
+
+def connect(history_file):
+    os.makedirs(os.path.dirname(os.path.abspath(history_file)), exist_ok=True)
+    connection = sqlite3.connect(history_file, timeout=60)
+    connection.executescript(schema)
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(runs)")]
+    if "partial" not in columns: # history written before partial runs were marked
+        connection.execute("ALTER TABLE runs ADD COLUMN partial INTEGER NOT NULL DEFAULT 0")
+    return connection
+
+def run_time_ms(result):
+    '''
+    Specimin runtime of a result in milliseconds: the "specimin" phase if it was traced, run_time otherwise
+    '''
+    phases = phase_trace.summarize(getattr(result, "phase_events", []))
+    if "specimin" in phases:
+        return round(phases["specimin"] * 1000)
+    return result.run_time * 1000 if result.run_time is not None else None
+
+def record_run(history_file, results, jar_mode, started, finished, specimin_commit = "", harness_commit = "", options = None, carried_over = None, partial = False):
+    '''
+    Store a run and the results of its issues.
+
+    Parameters:
+        history_file (str): SQLite database
+        results ([Result]): issues evaluated in the run
+        jar_mode (bool): True if Specimin was executed in jar mode
+        started, finished (float): time.time() at the start and end of the run
+        specimin_commit (str): commit of the Specimin sources
+        harness_commit (str): commit of this repository
+        options ({}): command line options of the run
+        carried_over ({issue_id: (status, preservation_status, run_time)}): issues not evaluated, whose
+            previous outcome is kept in the status files
+        partial (bool): True if some issues are neither evaluated nor carried over
+
+    Returns:
+        run_id (int)
+    '''
+    with closing(connect(history_file)) as connection, connection:
+        cursor = connection.execute(
+            "INSERT INTO runs (started, finished, jar_mode, specimin_commit, harness_commit, host, options, partial) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (started, finished, int(bool(jar_mode)), specimin_commit or "", harness_commit or "", socket.gethostname(), json.dumps(options or {}, sort_keys=True), int(bool(partial))))
+        run_id = cursor.lastrowid
+        issue_rows = []
+        phase_rows = []
+        usage_rows = []
+        for result in results:
+            issue_rows.append((run_id, result.name, result.status, result.reason or "", result.preservation_status, result.preservation_status_reason or "",
+                               run_time_ms(result), int(result.from_cache), 0))
+            for phase, seconds in phase_trace.summarize(getattr(result, "phase_events", [])).items():
+                phase_rows.append((run_id, result.name, phase, round(seconds * 1000)))
+            for phase, usage in result.resource_usage.items():
+                usage_rows.append((run_id, result.name, phase, usage.user_cpu, usage.system_cpu, usage.max_rss_kb, usage.read_bytes, usage.write_bytes))
+        for issue_id, (status, preservation_status, run_time) in (carried_over or {}).items():
+            issue_rows.append((run_id, issue_id, status, "", preservation_status, "", run_time * 1000 if run_time is not None else None, 0, 1))
+        connection.executemany("INSERT INTO issue_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", issue_rows)
+        connection.executemany("INSERT INTO phase_timings VALUES (?, ?, ?, ?)", phase_rows)
+        connection.executemany("INSERT INTO resource_usage VALUES (?, ?, ?, ?, ?, ?, ?, ?)", usage_rows)
+    return run_id
+
+def latest_runs(connection, jar_mode, count = 2):
+    '''
+    Ids of the latest complete runs of a mode, oldest first
+    '''
+    rows = connection.execute("SELECT id FROM runs WHERE jar_mode = ? AND partial = 0 ORDER BY id DESC LIMIT ?", (int(bool(jar_mode)), count)).fetchall()
+    return [row[0] for row in reversed(rows)]
+
+def issue_results(connection, run_id):
+    '''
+    Returns:
+        {issue_id: (status, preservation_status, run_time_ms)}
+    '''
+    rows = connection.execute("SELECT issue_id, status, preservation_status, run_time_ms FROM issue_results WHERE run_id = ?", (run_id,))
+    return {issue_id: (status, preservation_status, run_time) for issue_id, status, preservation_status, run_time in rows}
+
+def get_baseline(history_file, jar_mode):
+    '''
+    Issues of the latest complete run of a mode, the baseline of the next run
+
+    Returns:
+        {issue_id: (status, preservation_status, run_time_ms)}, empty if no run was recorded
+    '''
+    if not os.path.exists(history_file):
+        return {}
+    with closing(connect(history_file)) as connection:
+        runs = latest_runs(connection, jar_mode, 1)
+        return issue_results(connection, runs[0]) if runs else {}
+
+def diff_runs(connection, base_run, head_run):
+    '''
+    Compare the issues of two runs.
+
+    Returns:
+        [(issue_id, base (status, preservation_status, run_time_ms) or None, head ... or None, runtime delta in ms or None)]
+    '''
+    base = issue_results(connection, base_run)
+    head = issue_results(connection, head_run)
+    differences = []
+    for issue_id in sorted(set(base) | set(head)):
+        before = base.get(issue_id)
+        after = head.get(issue_id)
+        delta = None
+        if before and after and before[2] is not None and after[2] is not None:
+            delta = after[2] - before[2]
+        differences.append((issue_id, before, after, delta))
+    return differences
+
+def is_regression(before, after):
+    if before is None:
+        return False
+    if after is None:
+        return before[0] == "PASS" or before[1] == "PASS"
+    return (before[0] == "PASS" and after[0] != "PASS") or (before[1] == "PASS" and after[1] != "PASS")
+
+def count_passing(results):
+    return sum(1 for status, _, _ in results.values() if status == "PASS")
+
+def _resolve_runs(connection, runs, jar_mode):
+    if runs:
+        if len(runs) != 2:
+            sys.exit("Expected two run ids: BASE_RUN HEAD_RUN")
+        return runs
+    latest = latest_runs(connection, jar_mode)
+    if len(latest) < 2:
+        sys.exit(f"Fewer than two complete {'jar mode ' if jar_mode else ''}runs in the history")
+    return latest
+
+def _format_outcome(outcome):
+    return "-" if outcome is None else f"{outcome[0]}/{outcome[1]}"
+
+def print_runs(connection, limit):
+    rows = connection.execute("""SELECT runs.id, runs.started, runs.finished, runs.jar_mode, runs.partial, runs.specimin_commit,
+                                        COUNT(issue_results.issue_id), SUM(issue_results.status = 'PASS'), SUM(issue_results.preservation_status = 'PASS')
+                                 FROM runs LEFT JOIN issue_results ON issue_results.run_id = runs.id
+                                 GROUP BY runs.id ORDER BY runs.id DESC LIMIT ?""", (limit,)).fetchall()
+    print(f"{'run':>5}  {'started':<19}  {'mode':<6}{'specimin':<14}{'issues':>7}{'pass':>6}{'preserved':>11}{'duration':>10}")
+    for run_id, started, finished, jar_mode, partial, specimin_commit, issues, passing, preserved in rows:
+        started_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started))
+        mode = ('jar' if jar_mode else 'src') + ('*' if partial else '')
+        print(f"{run_id:>5}  {started_text:<19}  {mode:<6}{specimin_commit[:12]:<14}{issues:>7}{passing or 0:>6}{preserved or 0:>11}{round(finished - started):>9}s")
+    if any(row[4] for row in rows):
+        print("* partial run (e.g. --debug): not compared by default")
+
+def print_diff(connection, base_run, head_run):
+    regressions = 0
+    print(f"Run {base_run} -> run {head_run}")
+    print(f"{'issue':<24}{'base':<12}{'head':<12}{'runtime ms':>12}{'delta ms':>11}")
+    for issue_id, before, after, delta in diff_runs(connection, base_run, head_run):
+        changed = before is None or after is None or before[:2] != after[:2]
+        if not changed and not delta:
+            continue
+        regression = is_regression(before, after)
+        regressions += regression
+        runtime = after[2] if after and after[2] is not None else "-"
+        print(f"{issue_id:<24}{_format_outcome(before):<12}{_format_outcome(after):<12}{runtime:>12}{'-' if delta is None else f'{delta:+d}':>11}{'  REGRESSION' if regression else ''}")
+    print(f"{regressions} regression(s)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the history of evaluation runs")
+    parser.add_argument('--history', default=get_history_file(), help='SQLite database of the runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    list_parser = subparsers.add_parser('list', help='latest runs')
+    list_parser.add_argument('--limit', type=int, default=20)
+    for name, help_text in (('diff', 'status changes and runtime deltas between two runs'),
+                            ('check', 'exit 1 if fewer targets succeed in HEAD_RUN than in BASE_RUN')):
+        command_parser = subparsers.add_parser(name, help=help_text)
+        command_parser.add_argument('runs', nargs='*', type=int, help='BASE_RUN HEAD_RUN, the two latest runs by default')
+        command_parser.add_argument('--jar', action='store_true', help='compare jar mode runs')
+    args = parser.parse_args()
+
+    with closing(connect(args.history)) as connection:
+        if args.command == 'list':
+            print_runs(connection, args.limit)
+            return
+        base_run, head_run = _resolve_runs(connection, args.runs, args.jar)
+        if args.command == 'diff':
+            print_diff(connection, base_run, head_run)
+            return
+        base_passing = count_passing(issue_results(connection, base_run))
+        head_passing = count_passing(issue_results(connection, head_run))
+        print(f"Successful targets: run {base_run} = {base_passing}, run {head_run} = {head_passing}")
+        if head_passing < base_passing:
+            print_diff(connection, base_run, head_run)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
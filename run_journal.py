@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from Result import Result
+from file_lock import file_lock
+
+'''
+Append-only journal of a run (ISSUES/run_journal.jsonl, ISSUES/jar_run_journal.jsonl in jar mode). One
+json record per line, flushed to disk before the evaluation goes on:
+
+    {"type": "run", "started": ..., "issues": [issue ids in execution order], "options": {...}}
+    {"type": "start", "issue": ...}                        an issue is being evaluated
+    {"type": "phase", "issue": ..., "phase": ..., ...}     a phase of the issue completed (clone, pull_dependencies, specimin)
+    {"type": "result", "issue": ..., "result": {...}}      the issue completed (Result.to_dict and its phase events)
+    {"type": "resume", "resumed": ...}                     the run was resumed
+    {"type": "finished", "finished": ...}                  the status files and the report were written
+
+A run interrupted by an exception, Ctrl-C or the OOM killer leaves its journal without "finished".
+`main.py --resume` reloads the completed issues from it and evaluates the others, skipping the phases
+they completed. A truncated last line (the process died while writing it) is ignored.
+'''
+
+journal_file_name = "run_journal.jsonl"
+# results that say nothing about the issue: evaluated again on resume
+transient_reasons = ("Worker process failed", "Unhandled exception occurred")
+
+def get_journal_file(issue_folder_dir, isJarMode = False):
+    return os.path.join(issue_folder_dir, f"{'jar_' if isJarMode else ''}{journal_file_name}")
+
+def read_records(journal_file):
+    '''
+    Records of a journal, in write order. Lines that are not complete json records are skipped.
+    '''
+    records = []
+    if not os.path.exists(journal_file):
+        return records
+    with open(journal_file, 'r', errors='replace') as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+class RunJournal:
+    def __init__(self, journal_file, durable_phases = None):
+        '''
+        Constructor of the class
+        Parameters:
+            journal_file (str): jsonl file of the run
+            durable_phases ({issue_id: {phase: record}}): phases completed before the run was interrupted
+        '''
+        self.journal_file = os.path.abspath(journal_file)
+        self.durable_phases = durable_phases or {}
+
+    def append(self, record):
+        '''
+        Append a record and flush it to disk. Worker processes append to the same journal; the lock
+        keeps their lines whole. A line truncated by a killed process is ended first, so that the
+        record does not get lost with it.
+        '''
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with file_lock(f"{self.journal_file}.lock"):
+            fd = os.open(self.journal_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                if size and os.pread(fd, 1, size - 1) != b"\n":
+                    line = b"\n" + line
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def start_run(self, issue_ids, options):
+        '''
+        Start the journal of a new run, replacing the journal of the previous one
+        '''
+        os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+        with open(f"{self.journal_file}.tmp", 'w') as file:
+            file.write(json.dumps({"type": "run", "started": time.time(), "issues": list(issue_ids), "options": options}) + "\n")
+        os.replace(f"{self.journal_file}.tmp", self.journal_file)
+
+    def issue_started(self, issue_id):
+        self.append({"type": "start", "issue": issue_id})
+
+    def phase_completed(self, issue_id, phase, **data):
+        self.append(dict(data, type="phase", issue=issue_id, phase=phase))
+
+    def issue_completed(self, result: Result):
+        self.append({"type": "result", "issue": result.name, "result": result.to_dict(),
+                     "phase_events": result.phase_events, "from_cache": result.from_cache})
+
+    def finish_run(self):
+        self.append({"type": "finished", "finished": time.time()})
+
+    def get_phase(self, issue_id, phase):
+        '''
+        Record of a phase the issue completed before the run was interrupted, None if it has to be run
+        '''
+        return self.durable_phases.get(issue_id, {}).get(phase)
+
+    def was_started(self, issue_id):
+        '''
+        True if the interrupted run had started to evaluate the issue
+        '''
+        return issue_id in self.durable_phases
+
+
+class ResumeState:
+    def __init__(self, issue_ids, options, results, durable_phases):
+        '''
+        Constructor of the class
+        Parameters:
+            issue_ids ([str]): issues of the interrupted run, in execution order
+            options ({}): command line options of the interrupted run
+            results ({issue_id: Result}): issues that completed
+            durable_phases ({issue_id: {phase: record}}): phases completed by the issues that did not
+        '''
+        self.issue_ids = issue_ids
+        self.options = options
+        self.results = results
+        self.durable_phases = durable_phases
+
+def load_resume_state(journal_file):
+    '''
+    State of the interrupted run recorded in 'journal_file'
+
+    Returns:
+        ResumeState, None if there is no journal or its run finished
+    '''
+    records = read_records(journal_file)
+    if not records or records[0].get("type") != "run" or any(record.get("type") == "finished" for record in records):
+        return None
+    results = {}
+    durable_phases = {}
+    for record in records:
+        kind = record.get("type")
+        if kind == "start":
+            durable_phases.setdefault(record["issue"], {})
+        elif kind == "phase":
+            durable_phases.setdefault(record["issue"], {})[record["phase"]] = record
+        elif kind == "result":
+            result = Result.from_dict(record["result"])
+            if result.reason.startswith(transient_reasons) or result.preservation_status_reason.startswith(transient_reasons):
+                continue
+            result.set_phase_events(record.get("phase_events", []))
+            result.from_cache = record.get("from_cache", False)
+            results[record["issue"]] = result
+    for issue_id in results:
+        durable_phases.pop(issue_id, None)
+    return ResumeState(records[0]["issues"], records[0].get("options", {}), results, durable_phases)
@@ -0,0 +1,145 @@
+import json
+import math
+import os
+from file_lock import file_lock
+
+history_file_name = 'runtime_history.json'
+history_size = 20 # runtimes kept per issue
+timeout_multiplier = 3 # timeout = multiplier * p95 of the recorded runtimes
+timeout_floor = 60 # seconds
+timeout_ceiling = 1800 # seconds
+default_timeout = 300 # seconds, used when an issue has no history
+estimate_base = 10 # seconds, fixed cost of a Specimin run (JVM start, parsing the targets)
+estimate_per_file = 0.05 # seconds per .java file under root_dir, for the symbol solver
+
+def get_history_file(cache_dir):
+    return os.path.join(cache_dir, history_file_name)
+
+def history_key(issue_id, isJarMode = False):
+    return f"jar:{issue_id}" if isJarMode else issue_id
+
+def load_history(cache_dir):
+    '''
+    Runtime history of the previous runs
+
+    Returns:
+        {history_key: [seconds]}, oldest first
+    '''
+    history_file = get_history_file(cache_dir)
+    if not os.path.exists(history_file):
+        return {}
+    try:
+        with open(history_file, 'r') as file:
+            history = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return history if isinstance(history, dict) else {}
+
+def record_runtimes(cache_dir, results, isJarMode = False):
+    '''
+    Append the Specimin runtimes of 'results' to the history. A timeout is recorded at the time it was
+    killed, a lower bound of its runtime, so that the next timeout of the issue is longer. Harness errors
+    and results restored from the result cache are not runtimes of a run and are left out.
+    '''
+    history_file = get_history_file(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    with file_lock(f"{history_file}.lock"):
+        history = load_history(cache_dir)
+        for result in results:
+            if result.run_time is None or result.from_cache or result.reason.startswith("Unhandled exception"):
+                continue
+            runtimes = history.setdefault(history_key(result.name, isJarMode), [])
+            runtimes.append(result.run_time)
+            del runtimes[:-history_size]
+        with open(f"{history_file}.tmp", 'w') as file:
+            json.dump(history, file, indent=2, sort_keys=True)
+        os.replace(f"{history_file}.tmp", history_file)
+
+def percentile(values, fraction):
+    '''
+    Nearest-rank percentile of a non-empty list
+    '''
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+def count_java_files(directory):
+    count = 0
+    for _, _, files in os.walk(directory):
+        count += sum(1 for name in files if name.endswith(".java"))
+    return count
+
+def static_estimate(issue_data, issue_folder_dir):
+    '''
+    Expected runtime of an issue without history, from the number of .java files under its root_dir.
+    Targets that have never been cloned only get the fixed cost.
+    '''
+    repo_name = os.path.splitext(os.path.basename(issue_data["url"].rstrip('/')))[0]
+    root_dir = os.path.join(issue_folder_dir, issue_data["issue_id"], "input", repo_name, issue_data.get("root_dir", ""))
+    file_count = count_java_files(root_dir) if os.path.isdir(root_dir) else 0
+    return estimate_base + estimate_per_file * file_count
+
+class IssuePlan:
+    def __init__(self, issue_data, expected_runtime, timeout, has_history):
+        '''
+        Constructor of the class
+        Parameters:
+            issue_data ({}): json data associated with an issue
+            expected_runtime (float): expected Specimin runtime in seconds
+            timeout (int): Specimin timeout of the issue in seconds
+            has_history (bool): True if the expectation comes from recorded runtimes
+        '''
+        self.issue_data = issue_data
+        self.issue_id = issue_data["issue_id"]
+        self.expected_runtime = expected_runtime
+        self.timeout = timeout
+        self.has_history = has_history
+
+def plan_issue(issue_data, history, issue_folder_dir, isJarMode = False) -> IssuePlan:
+    '''
+    Expected runtime and timeout of an issue. With history the expected runtime is the p95 of the
+    recorded runtimes, or the latest one if it is longer (the issue got slower, or timed out), and the
+    timeout is timeout_multiplier * expected runtime, clamped to [timeout_floor, timeout_ceiling].
+    Without history it is never shorter than default_timeout.
+    '''
+    runtimes = history.get(history_key(issue_data["issue_id"], isJarMode), [])
+    if runtimes:
+        expected = max(percentile(runtimes, 0.95), runtimes[-1])
+        timeout = min(max(timeout_multiplier * expected, timeout_floor), timeout_ceiling)
+        return IssuePlan(issue_data, expected, int(math.ceil(timeout)), True)
+    expected = static_estimate(issue_data, issue_folder_dir)
+    timeout = min(max(timeout_multiplier * expected, default_timeout), timeout_ceiling)
+    return IssuePlan(issue_data, expected, int(math.ceil(timeout)), False)
+
+def schedule(plans, jobs = 1, time_budget = None, is_priority = None):
+    '''
+    Order the issues longest-expected-first, which keeps the slowest issue from starting last when
+    several issues run in parallel. Issues for which 'is_priority' is True (e.g. previous failures)
+    come first, each group being ordered longest-first.
+
+    With a time budget the run is simulated on 'jobs' parallel slots; issues that cannot finish
+    within the budget are skipped.
+
+    Parameters:
+        plans ([IssuePlan]): issues to run
+        jobs (int): number of issues evaluated concurrently
+        time_budget (int): seconds available for the whole run, None for no limit
+        is_priority (function): IssuePlan -> bool
+
+    Returns:
+        ([IssuePlan] to run in order, [IssuePlan] skipped)
+    '''
+    ordered = sorted(plans, key=lambda plan: (not is_priority(plan) if is_priority else False, -plan.expected_runtime))
+    if time_budget is None:
+        return ordered, []
+    slots = [0.0] * max(1, jobs)
+    scheduled = []
+    skipped = []
+    for plan in ordered:
+        slot = slots.index(min(slots))
+        if slots[slot] + plan.expected_runtime > time_budget:
+            skipped.append(plan)
+            continue
+        slots[slot] += plan.expected_runtime
+        scheduled.append(plan)
+    return scheduled, skipped
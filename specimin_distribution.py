@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+from file_lock import file_lock
+
+specimin_main_class = 'org.checkerframework.specimin.SpeciminRunner' # application.mainClass, used if the start script can not be read
+specimin_install_dir = os.path.join('build', 'install', 'specimin')
+distribution_cache_dir_name = 'specimin-dist'
+manifest_file_name = 'dist.json'
+
+def get_git_head(directory):
+    '''
+    Returns the commit hash checked out in 'directory', or an empty string if it can not be determined.
+    '''
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if result.returncode != 0:
+        return ""
+    return result.stdout.decode("utf-8").strip()
+
+def get_specimin_version_key(specimin_path):
+    '''
+    Key identifying the Specimin sources in 'specimin_path'. It is the checked out commit; if the
+    working tree has local modifications (typical for a developer's $SPECIMIN) a hash of those
+    modifications is appended so that edited sources never reuse a stale distribution.
+
+    Parameters:
+        specimin_path (str): Specimin source directory
+
+    Returns:
+        key (str): cache key of the sources, empty if 'specimin_path' is not a git repository
+    '''
+    commit = get_git_head(specimin_path)
+    if not commit:
+        return ""
+    status = subprocess.run(["git", "status", "--porcelain"], cwd=specimin_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    if not status.strip():
+        return commit
+
+    digest = hashlib.sha1()
+    digest.update(subprocess.run(["git", "diff", "HEAD", "--binary"], cwd=specimin_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout)
+    for line in status.decode("utf-8").splitlines():
+        if line.startswith("??"): # untracked file: include its size and mtime
+            untracked = os.path.join(specimin_path, line[3:].strip())
+            if os.path.isfile(untracked):
+                file_stat = os.stat(untracked)
+                digest.update(f"{line}:{file_stat.st_size}:{file_stat.st_mtime_ns}".encode("utf-8"))
+    return f"{commit}-dirty-{digest.hexdigest()[:12]}"
+
+def _read_start_script(start_script):
+    if not os.path.exists(start_script):
+        return ""
+    with open(start_script, 'r') as file:
+        return file.read()
+
+def _read_default_jvm_opts(start_script):
+    '''
+    Extract the DEFAULT_JVM_OPTS (applicationDefaultJvmArgs) from the start script generated by Gradle
+    '''
+    match = re.search(r"^DEFAULT_JVM_OPTS='(.*)'$", _read_start_script(start_script), re.MULTILINE)
+    if not match:
+        return []
+    return [opt.strip('"') for opt in shlex.split(match.group(1))]
+
+def _read_main_class(start_script):
+    '''
+    Extract the main class (application.mainClass) from the start script generated by Gradle: the
+    argument following `-classpath "$CLASSPATH"` in the java command line
+
+    Returns:
+        str: fully qualified name of the main class, None if it is not found
+    '''
+    match = re.search(r"-classpath\s+\S*\$CLASSPATH\S*\s+(?:\\\s*)?([A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)+)", _read_start_script(start_script))
+    return match.group(1) if match else None
+
+def _read_classpath(start_script):
+    '''
+    Extract the CLASSPATH of the start script generated by Gradle
+
+    Returns:
+        [str]: classpath entries relative to the distribution directory, in order. Empty if not found
+    '''
+    match = re.search(r"^CLASSPATH=(.*)$", _read_start_script(start_script), re.MULTILINE)
+    if not match:
+        return []
+    entries = []
+    for entry in match.group(1).strip().strip('"').split(":"):
+        if entry.startswith("$APP_HOME/"):
+            entries.append(entry[len("$APP_HOME/"):])
+    return entries
+
+def _read_manifest(dist_dir):
+    manifest_file = os.path.join(dist_dir, manifest_file_name)
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, 'r') as file:
+        return json.load(file)
+
+def get_classpath(dist_dir, manifest):
+    '''
+    Classpath of a prebuilt Specimin distribution, in the order of its start script
+    '''
+    entries = manifest.get("classpath") or [os.path.join("lib", "*")]
+    return os.pathsep.join(os.path.join(dist_dir, entry) for entry in entries)
+
+def build_specimin_distribution(specimin_path, cache_dir):
+    '''
+    Build Specimin once per source version with `./gradlew installDist` and keep the resulting
+    distribution in 'cache_dir'. If the distribution for the current commit already exists the
+    Gradle build is skipped entirely.
+
+    cache_dir
+    |--- specimin-dist
+    |    |--- <commit>
+    |    |    |--- lib/*.jar
+    |    |    |--- dist.json   ---> main class, classpath and default JVM args, read from bin/specimin
+
+    Parameters:
+        specimin_path (str): Specimin source directory
+        cache_dir (str): root directory of the harness caches
+
+    Returns:
+        dist_dir (str): path of the distribution, or None if it could not be built
+    '''
+    key = get_specimin_version_key(specimin_path)
+    if not key:
+        print(f"{specimin_path} is not a git repository. Prebuilt Specimin is not used")
+        return None
+
+    dist_root = os.path.join(cache_dir, distribution_cache_dir_name)
+    dist_dir = os.path.join(dist_root, key)
+    with file_lock(os.path.join(dist_root, f"{key}.lock")):
+        manifest = _read_manifest(dist_dir)
+        if manifest and "classpath" in manifest:
+            print(f"Prebuilt Specimin {key} found")
+            return dist_dir
+        if manifest: # written before the main class and classpath were read from the start script
+            shutil.rmtree(dist_dir)
+
+        print(f"Building Specimin distribution for {key}")
+        status = subprocess.run("./gradlew installDist", cwd=specimin_path, shell=True)
+        install_dir = os.path.join(specimin_path, specimin_install_dir)
+        if status.returncode != 0 or not os.path.isdir(install_dir):
+            print(f"Specimin installDist failed with status {status.returncode}")
+            return None
+
+        # copy next to the final location and rename, so a half copied distribution is never used
+        tmp_dir = f"{dist_dir}.tmp"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        shutil.copytree(install_dir, tmp_dir)
+        start_script = os.path.join(install_dir, "bin", "specimin")
+        main_class = _read_main_class(start_script)
+        if not main_class:
+            print(f"Main class not found in {start_script}. Using {specimin_main_class}")
+        manifest = {
+            "version": key,
+            "main_class": main_class or specimin_main_class,
+            "classpath": _read_classpath(start_script),
+            "jvm_args": _read_default_jvm_opts(start_script)
+        }
+        with open(os.path.join(tmp_dir, manifest_file_name), 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.rename(tmp_dir, dist_dir)
+    return dist_dir
+
+def get_java_executable():
+    '''
+    java of $JAVA_HOME if defined, otherwise the one on the PATH (the JVM Gradle would have used)
+    '''
+    java_home = os.environ.get("JAVA_HOME")
+    if java_home and os.path.exists(os.path.join(java_home, "bin", "java")):
+        return os.path.join(java_home, "bin", "java")
+    return "java"
+
+def build_specimin_java_command(dist_dir, specimin_args):
+    '''
+    Build the argv to run a prebuilt Specimin distribution directly on the JVM.
+
+    Parameters:
+        dist_dir (str): distribution returned by build_specimin_distribution
+        specimin_args ([str]): Specimin arguments (see main.build_specimin_args)
+
+    Returns:
+        command ([str]): argv list, to be executed without a shell
+    '''
+    manifest = _read_manifest(dist_dir)
+    command = [get_java_executable()]
+    command.extend(manifest.get("jvm_args", []))
+    command.extend(["-cp", get_classpath(dist_dir, manifest), manifest.get("main_class", specimin_main_class)])
+    command.extend(specimin_args)
+    return command
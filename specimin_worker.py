@@ -0,0 +1,198 @@
+import atexit
+import hashlib
+import itertools
+import json
+import os
+import queue
+import select
+import shutil
+import subprocess
+import threading
+import time
+from file_lock import file_lock
+from specimin_distribution import get_java_executable, get_classpath, manifest_file_name, specimin_main_class
+from resource_usage import sample_process, usage_between
+
+worker_source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "harness", "SpeciminWorker.java")
+worker_class_name = "SpeciminWorker"
+worker_cache_dir_name = "specimin-worker"
+
+class WorkerTimeout(Exception):
+    '''
+    Raised when a job does not finish within its timeout. The worker JVM is killed.
+    '''
+    pass
+
+def compile_worker(cache_dir):
+    '''
+    Compile SpeciminWorker.java once per source version into 'cache_dir'.
+
+    Returns:
+        classes_dir (str): directory containing SpeciminWorker.class
+    '''
+    with open(worker_source, 'rb') as file:
+        source_hash = hashlib.sha1(file.read()).hexdigest()[:12]
+    classes_dir = os.path.join(cache_dir, worker_cache_dir_name, source_hash)
+    with file_lock(f"{classes_dir}.lock"):
+        if os.path.exists(os.path.join(classes_dir, f"{worker_class_name}.class")):
+            return classes_dir
+        tmp_dir = f"{classes_dir}.tmp"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        javac = os.path.join(os.path.dirname(get_java_executable()), "javac") # javac next to the java running Specimin
+        subprocess.run([javac, "-d", tmp_dir, worker_source], check=True)
+        os.rename(tmp_dir, classes_dir)
+    return classes_dir
+
+class SpeciminWorker:
+    '''
+    One long-lived JVM running SpeciminWorker with the prebuilt Specimin distribution on its classpath.
+    JavaParser and the symbol solver stay loaded and JIT-compiled across jobs.
+    '''
+    def __init__(self, dist_dir, classes_dir, log_file):
+        self._dist_dir = dist_dir
+        self._classes_dir = classes_dir
+        self._log_file = log_file
+        self._process = None
+        self._buffer = b""
+        self._job_ids = itertools.count()
+        self.last_usage = None
+
+    def _start(self):
+        with open(os.path.join(self._dist_dir, manifest_file_name), 'r') as file:
+            manifest = json.load(file)
+        classpath = os.pathsep.join([self._classes_dir, get_classpath(self._dist_dir, manifest)])
+        command = [get_java_executable()]
+        command.extend(manifest.get("jvm_args", []))
+        command.extend(["-cp", classpath, worker_class_name, manifest.get("main_class", specimin_main_class)])
+        with open(self._log_file, 'a') as log:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=log)
+        self._buffer = b""
+
+    def is_alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def _read_line(self, deadline):
+        '''
+        Read one protocol line from the worker. Returns None if the worker exited.
+        '''
+        fd = self._process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic() if deadline else None
+            if remaining is not None and remaining <= 0:
+                raise WorkerTimeout()
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                raise WorkerTimeout()
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode("utf-8")
+
+    def run(self, args, log_path, timeout=None):
+        '''
+        Run one Specimin job in the worker.
+
+        Parameters:
+            args ([str]): Specimin arguments (see main.build_specimin_args)
+            log_path (str): file receiving the job's stdout and stderr
+            timeout (int): seconds after which the worker is killed
+
+        Returns:
+            returncode (int): 0 if Specimin succeeded, non-zero otherwise. The job's CPU and I/O are
+            left in 'last_usage' (None where /proc is unavailable).
+        '''
+        if not self.is_alive():
+            self._start()
+        self.last_usage = None
+        usage_before = sample_process(self._process.pid)
+        job_id = str(next(self._job_ids))
+        if any("\t" in arg or "\n" in arg for arg in args):
+            raise ValueError("Specimin arguments must not contain tabs or newlines in batch mode")
+        request = "\t".join([job_id, log_path, *args]) + "\n"
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            self._process.stdin.write(request.encode("utf-8"))
+            self._process.stdin.flush()
+            line = self._read_line(deadline)
+        except WorkerTimeout:
+            self.close(force=True)
+            raise
+        except BrokenPipeError:
+            line = None
+
+        if line is None: # the JVM died during the job, e.g. System.exit or OutOfMemoryError
+            returncode = self._process.wait()
+            self._process = None
+            return returncode if returncode != 0 else 1
+        response_id, status = line.split("\t")
+        if response_id != job_id:
+            self.close(force=True)
+            raise RuntimeError(f"Specimin worker protocol error: expected job {job_id}, got {response_id}")
+        self.last_usage = usage_between(usage_before, sample_process(self._process.pid))
+        return int(status)
+
+    def close(self, force=False):
+        if self._process is None:
+            return
+        if force:
+            self._process.kill()
+        else:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=10)
+            except (subprocess.TimeoutExpired, BrokenPipeError):
+                self._process.kill()
+        self._process.wait()
+        self._process = None
+
+class SpeciminWorkerPool:
+    '''
+    A small pool of warm Specimin workers. A job borrows a worker for its duration; workers are started lazily.
+    '''
+    def __init__(self, dist_dir, cache_dir, size=1):
+        classes_dir = compile_worker(cache_dir)
+        self._workers = queue.Queue()
+        for index in range(size):
+            log_file = os.path.join(cache_dir, worker_cache_dir_name, f"worker-{os.getpid()}-{index}.log")
+            self._workers.put(SpeciminWorker(dist_dir, classes_dir, log_file))
+        self._all = list(self._workers.queue)
+
+    def run(self, args, log_path, timeout=None):
+        '''
+        Returns:
+            (returncode, ResourceUsage of the job or None)
+        '''
+        worker = self._workers.get()
+        try:
+            returncode = worker.run(args, log_path, timeout)
+            return returncode, worker.last_usage
+        finally:
+            self._workers.put(worker)
+
+    def close(self):
+        for worker in self._all:
+            worker.close()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_worker_pool(dist_dir, cache_dir, size=1):
+    '''
+    Worker pool of the current process for 'dist_dir'. Each process of a --jobs run gets its own
+    pool, so N processes keep N warm JVMs. Pools are closed when the process exits.
+    '''
+    with _pools_lock:
+        pool = _pools.get(dist_dir)
+        if pool is None:
+            pool = SpeciminWorkerPool(dist_dir, cache_dir, size)
+            _pools[dist_dir] = pool
+        return pool
+
+@atexit.register
+def _close_pools():
+    for pool in _pools.values():
+        pool.close()
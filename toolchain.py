@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import platform
+import shutil
+import stat
+import tarfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from file_lock import file_lock
+
+toolchain_cache_dir_name = 'toolchains'
+checksum_file_name = 'checksums.json'
+mirror_env_var = 'SPECIMIN_TOOLCHAIN_MIRROR'
+download_attempts = 3
+download_chunk_size = 1024 * 1024
+default_cf_version = "1.9.13"
+default_java_version = "11"
+
+oracle_jdk_template_url = "https://download.oracle.com/java/17/archive/jdk-{version}_{os}-{arch}_bin.tar.gz"
+corretto_jdk_template_url = "https://corretto.aws/downloads/latest/amazon-corretto-{version}-{arch}-{os}-jdk.tar.gz"
+corretto_checksum_template_url = "https://corretto.aws/downloads/latest_sha256/amazon-corretto-{version}-{arch}-{os}-jdk.tar.gz"
+
+class ToolchainSpec:
+    def __init__(self, kind, name, url, checksum_url = ""):
+        '''
+        Constructor of the class
+        Parameters:
+            kind (string): "jdk" or "cf"
+            name (string): name of the extracted toolchain directory, e.g. amazon-corretto-8, checker-framework-3.40.0
+            url (string): download url of the archive
+            checksum_url (string): url of the published sha256 of the archive, if any
+        '''
+        self.kind = kind
+        self.name = name
+        self.url = url
+        self.checksum_url = checksum_url
+        self.archive_name = os.path.basename(urllib.parse.urlparse(url).path)
+
+    def key(self):
+        return (self.kind, self.name, self.url)
+
+def get_platform():
+    '''
+    Returns:
+        (os, arch) as used in the JDK download urls
+    '''
+    arch = "x64"
+    if platform.machine() == "arm64": #ignoring x86
+        arch = "aarch64"
+    platform_system = platform.system()
+    if platform_system == "Linux":
+        return "linux", arch
+    if platform_system == "Darwin":
+        return "macos", arch
+    raise Exception(f"{platform_system} not supported")
+
+def jdk_spec(java_version, build_system) -> ToolchainSpec:
+    '''
+    JDK used for the preservation check: an Oracle JDK for javac issues, Amazon Corretto otherwise
+    '''
+    op, arch = get_platform()
+    if build_system == "javac":
+        return ToolchainSpec("jdk", f"jdk-{java_version}", oracle_jdk_template_url.format(version=java_version, arch=arch, os=op))
+    url = corretto_jdk_template_url.format(version=java_version, arch=arch, os=op)
+    checksum_url = corretto_checksum_template_url.format(version=java_version, arch=arch, os=op)
+    return ToolchainSpec("jdk", f"amazon-corretto-{java_version}", url, checksum_url)
+
+def cf_spec(cf_release_url, cf_version) -> ToolchainSpec:
+    '''
+    Checker Framework release zip
+    '''
+    cf_name = f"checker-framework-{cf_version}"
+    return ToolchainSpec("cf", cf_name, cf_release_url + "/" + cf_name + "/" + cf_name + ".zip")
+
+def get_issue_requirements(issue_data):
+    '''
+    Toolchains needed by the preservation check of an issue. Gradle issues bring their own.
+
+    Returns:
+        [ToolchainSpec]
+    '''
+    build_system = issue_data.get("build_system", "gradle")
+    if build_system == "gradle":
+        return []
+    specs = []
+    if build_system != "javac":
+        specs.append(cf_spec(issue_data.get("cf_release_url", ""), issue_data.get("cf_version", default_cf_version)))
+    specs.append(jdk_spec(issue_data.get("java_version", default_java_version), build_system))
+    return specs
+
+def collect_requirements(issues):
+    '''
+    Distinct toolchains needed by a list of issues, in first use order
+    '''
+    specs = {}
+    for issue in issues:
+        for spec in get_issue_requirements(issue):
+            specs.setdefault(spec.key(), spec)
+    return list(specs.values())
+
+def get_toolchain_dir(cache_dir):
+    return os.path.join(cache_dir, toolchain_cache_dir_name)
+
+def get_mirror():
+    '''
+    Local mirror (directory or file:// url) containing toolchain archives, from $SPECIMIN_TOOLCHAIN_MIRROR
+    '''
+    mirror = os.environ.get(mirror_env_var, "")
+    if mirror.startswith("file://"):
+        return urllib.parse.unquote(urllib.parse.urlparse(mirror).path)
+    return mirror
+
+def _find_in_mirror(spec, mirror):
+    if not mirror:
+        return None
+    for candidate in (spec.archive_name, spec.name + (".zip" if spec.kind == "cf" else ".tar.gz")):
+        path = os.path.join(mirror, candidate)
+        if os.path.exists(path):
+            return path
+    return None
+
+def _http_download(url, archive_path):
+    '''
+    Download 'url' to 'archive_path' through a .part file. An interrupted download is resumed with
+    a Range request; the archive only appears under its final name once complete.
+    '''
+    part_path = f"{archive_path}.part"
+    for attempt in range(1, download_attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request = urllib.request.Request(url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                if offset and response.status != 206: # server ignored the range, start over
+                    offset = 0
+                expected_length = response.headers.get("Content-Length")
+                with open(part_path, 'ab' if offset else 'wb') as file:
+                    shutil.copyfileobj(response, file, download_chunk_size)
+            if expected_length is not None and os.path.getsize(part_path) != offset + int(expected_length):
+                raise IOError(f"incomplete download of {url}")
+            os.rename(part_path, archive_path)
+            return
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset: # the .part file is already complete
+                os.rename(part_path, archive_path)
+                return
+            print(f"Download attempt {attempt} of {url} failed: {e}")
+        except (urllib.error.URLError, IOError) as e:
+            print(f"Download attempt {attempt} of {url} failed: {e}")
+        time.sleep(attempt)
+    raise IOError(f"Failed to download {url}")
+
+def _fetch_archive(spec, archive_path, mirror):
+    local_copy = _find_in_mirror(spec, mirror)
+    if not local_copy and spec.url.startswith("file://"):
+        local_copy = urllib.parse.unquote(urllib.parse.urlparse(spec.url).path)
+    if local_copy:
+        print(f"Copying {spec.name} from {local_copy}")
+        shutil.copyfile(local_copy, f"{archive_path}.part")
+        os.rename(f"{archive_path}.part", archive_path)
+        return
+    print(f"Downloading {spec.name} from {spec.url}")
+    _http_download(spec.url, archive_path)
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(download_chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _expected_checksum(spec, mirror):
+    '''
+    Published sha256 of the archive: a <archive>.sha256 file in the mirror, or the vendor checksum url
+    '''
+    sidecar = _find_in_mirror(spec, mirror)
+    if sidecar and os.path.exists(f"{sidecar}.sha256"):
+        with open(f"{sidecar}.sha256", 'r') as file:
+            return file.read().split()[0].lower()
+    if sidecar or not spec.checksum_url: # archive taken from the mirror: no network access
+        return None
+    try:
+        with urllib.request.urlopen(spec.checksum_url, timeout=30) as response:
+            return response.read().decode("utf-8").split()[0].lower()
+    except (urllib.error.URLError, IndexError) as e:
+        print(f"Checksum of {spec.name} unavailable: {e}")
+        return None
+
+def _verify_archive(spec, archive_path, toolchain_dir, mirror):
+    '''
+    Verify the archive against its published checksum. Archives without a published checksum are
+    pinned to the checksum seen on first download (recorded in checksums.json) and must be readable.
+    '''
+    actual = _sha256(archive_path)
+    expected = _expected_checksum(spec, mirror)
+    checksum_file = os.path.join(toolchain_dir, checksum_file_name)
+    with file_lock(f"{checksum_file}.lock"):
+        known = {}
+        if os.path.exists(checksum_file):
+            with open(checksum_file, 'r') as file:
+                known = json.load(file)
+        expected = expected or known.get(spec.archive_name)
+        if expected and expected != actual:
+            raise IOError(f"Checksum mismatch for {spec.archive_name}: expected {expected}, got {actual}")
+        if spec.archive_name not in known:
+            known[spec.archive_name] = actual
+            with open(checksum_file, 'w') as file:
+                json.dump(known, file, indent=2, sort_keys=True)
+
+def _extract(archive_path, destination):
+    if archive_path.endswith(".zip"):
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            zip_ref.extractall(destination)
+    else:
+        with tarfile.open(archive_path, "r:gz") as tar:
+            tar.extractall(destination)
+
+def ensure_toolchain(spec: ToolchainSpec, cache_dir, mirror = None):
+    '''
+    Return the extracted toolchain, downloading, verifying and extracting it first if needed.
+    The archive is extracted next to the final location and renamed into place, so a toolchain
+    directory only exists once it is complete.
+
+    cache_dir
+    |--- toolchains
+    |    |--- archives/amazon-corretto-17-x64-linux-jdk.tar.gz
+    |    |--- jdk/amazon-corretto-17
+    |    |--- cf/checker-framework-3.40.0
+
+    Parameters:
+        spec (ToolchainSpec): toolchain to provide
+        cache_dir (str): root directory of the harness caches
+        mirror (str): local mirror directory, defaults to $SPECIMIN_TOOLCHAIN_MIRROR
+
+    Returns:
+        path (str): directory of the extracted toolchain
+    '''
+    if mirror is None:
+        mirror = get_mirror()
+    toolchain_dir = get_toolchain_dir(cache_dir)
+    final_dir = os.path.join(toolchain_dir, spec.kind, spec.name)
+    if os.path.isdir(final_dir):
+        return final_dir
+
+    archive_dir = os.path.join(toolchain_dir, "archives")
+    os.makedirs(archive_dir, exist_ok=True)
+    archive_path = os.path.join(archive_dir, spec.archive_name)
+    with file_lock(f"{final_dir}.lock"):
+        if os.path.isdir(final_dir):
+            return final_dir
+        if not os.path.exists(archive_path):
+            _fetch_archive(spec, archive_path, mirror)
+        try:
+            _verify_archive(spec, archive_path, toolchain_dir, mirror)
+        except IOError:
+            os.remove(archive_path) # never keep a corrupt archive as a cache entry
+            raise
+
+        tmp_dir = f"{final_dir}.tmp"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        _extract(archive_path, tmp_dir)
+        entries = os.listdir(tmp_dir)
+        extracted_root = os.path.join(tmp_dir, entries[0]) if len(entries) == 1 else tmp_dir
+        if extracted_root == tmp_dir:
+            os.rename(tmp_dir, final_dir)
+        else:
+            os.rename(extracted_root, final_dir)
+            shutil.rmtree(tmp_dir)
+    return final_dir
+
+def prefetch(issues, cache_dir, jobs = 4, mirror = None):
+    '''
+    Provide every toolchain needed by 'issues' up front, fetching missing ones concurrently.
+    Failures are reported and left to the issues needing the toolchain.
+
+    Returns:
+        {name: path}: toolchains that are available
+    '''
+    specs = collect_requirements(issues)
+    if not specs:
+        return {}
+    available = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = {spec.name: executor.submit(ensure_toolchain, spec, cache_dir, mirror) for spec in specs}
+        for name, future in futures.items():
+            try:
+                available[name] = future.result()
+            except Exception as e:
+                print(f"Toolchain {name} unavailable: {e}")
+    return available
+
+def get_jdk_executable(jdk_dir, executable = "java"):
+    '''
+    Path of bin/java or bin/javac of an extracted JDK. The executable bit is restored if needed.
+    '''
+    if platform.system() == "Darwin":
+        path = os.path.join(jdk_dir, "Contents", "Home", "bin", executable)
+    else:
+        path = os.path.join(jdk_dir, "bin", executable)
+    if os.path.exists(path):
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+def get_checker_jar(cf_dir):
+    return os.path.join(cf_dir, "checker", "dist", "checker.jar")